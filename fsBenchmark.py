@@ -0,0 +1,335 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# End-to-end timing of fsCapture.py against the simulated ETL in
+# fsSimETL.py. Times startup (main() up to the first menu), Capture Screen
+# Shots and Measure Log, so performance changes can be measured and
+# regressions caught without a truck-mounted analyzer.
+
+# This script is:
+# C:\Shared\batch_files\fsBenchmark.py
+
+# Examples:
+#   python fsBenchmark.py
+#   python fsBenchmark.py --repeat 3 --latency 0.02 --lock-delay 2
+#   python fsBenchmark.py --only startup capture --json results.json
+#   python fsBenchmark.py --only startup capture --record
+#   python fsBenchmark.py --only startup capture --replay fsCapture_20200413_101500.fst
+
+'''
+MIT License
+
+Copyright (c) 2020 John Neuhaus, jneuhausATosborn-engDOTcom
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import fsSimETL
+
+BENCHMARKS = ['startup', 'capture', 'measurelog', 'job', 'dual', 'sample',
+    'track']
+
+INI_TEMPLATE = """[DEFAULT]
+ipaddr = {resource}
+
+[UserEntered]
+_callsign = WBEN
+_channel = 8
+_radial = 90
+_dist = 10
+_testposition = A
+_channel_table = TV-USA-ATSC
+
+[Measurement_Results_Folder]
+_meas_results_folder = Z:\\Measurement_results
+
+[Hardcopy]
+_hardcopy_dest = {hardcopy_dest}
+_host_results_folder = {host_folder}
+
+[Metrics]
+_metrics = {metrics}
+
+[Trace]
+_trace = {trace}
+"""
+
+JOB_TEMPLATE = """[Job]
+_callsign = WBEN
+_channel = 8
+_radial = 90
+_dist = 10
+_testposition = B
+measure_log_seconds = {seconds}
+"""
+
+# Two simulated analyzers, each run by its own fsCapture process
+DUAL_JOB_TEMPLATE = """[Job]
+_callsign = WBEN
+_radial = 90
+_dist = 10
+measure_log_seconds = {seconds}
+
+[Analyzer ETL1]
+ipaddr = {resource1}
+_channel = 8
+_testposition = A
+
+[Analyzer ETL2]
+ipaddr = {resource2}
+_channel = 8
+_testposition = B
+"""
+
+class ReachedMenu(Exception) :
+    pass
+
+
+# ———————————————————————————————————————————————————
+#              SET UP fsCapture AGAINST THE SIMULATOR
+# ———————————————————————————————————————————————————
+
+def load_fscapture(ini_file, level) :
+    # Import fsCapture with the command line it would see when launched as
+    #   python fsCapture.py <level> <ini_file>
+    sys.argv = ['fsCapture.py', level, ini_file]
+    import fsCapture
+    return fsCapture
+
+def reset_logging() :
+    # start_logging() adds handlers every time main() runs
+    log = logging.getLogger('fsCapture')
+    for handler in list(log.handlers) :
+        log.removeHandler(handler)
+        handler.close()
+
+def run_startup(fs) :
+    # main() up to the point where the first menu would be shown
+    def stop_at_menu() :
+        fs.startup_report()
+        raise ReachedMenu()
+    reset_logging()
+    fs.DEVICE.disconnect()  # Cold start: no link yet
+    fs.menu = stop_at_menu
+    t0 = time.perf_counter()
+    # Time to menu is measured from here, not from the import
+    fs.STARTUP_T0 = t0
+    fs.startup_phases.clear()
+    fs.startup_reported = False
+    try:
+        fs.main()
+    except ReachedMenu:
+        pass
+    return time.perf_counter() - t0
+
+def run_capture(fs) :
+    t0 = time.perf_counter()
+    fs.CaptureScreenShots()
+    return time.perf_counter() - t0
+
+def run_measurelog(fs, seconds) :
+    # Answer MeasureLog()'s question of how many seconds to capture, the
+    # way a job file does
+    fs._mlog_seconds = seconds
+    t0 = time.perf_counter()
+    try:
+        fs.MeasureLog()
+    finally:
+        fs._mlog_seconds = None
+    return time.perf_counter() - t0
+
+def run_sample(fs, seconds, rate) :
+    # Sample the DTV results straight to a file on the host
+    t0 = time.perf_counter()
+    fs.sample_results(seconds, rate)
+    return time.perf_counter() - t0
+
+def run_track(fs, rate) :
+    # Capture Screen Shots while the GPS track records in the background
+    t0 = time.perf_counter()
+    fs.GPS_TRACK.start(rate)
+    try:
+        fs.CaptureScreenShots()
+    finally:
+        fs.GPS_TRACK.stop()
+    elapsed = time.perf_counter() - t0
+    print('GPS track: %d fixes in %.1f s, %d failed reads' % \
+        (fs.GPS_TRACK.fixes, elapsed, fs.GPS_TRACK.errors))
+    return elapsed
+
+def run_job(fs, job_file) :
+    # Headless job: connect, all screen shots and a Measure Log.
+    # fsCapture exits after a job, so run_job() does not restore what
+    # setvars() reset; a job with [Analyzer] sections leaves the IP
+    # address blank. Put it back for the benchmarks that follow.
+    ipaddr = fs.ipaddr
+    t0 = time.perf_counter()
+    try:
+        status = fs.run_job(job_file)
+    finally:
+        fs.ipaddr = ipaddr
+    elapsed = time.perf_counter() - t0
+    if status :
+        print('Job failed; see ' + os.path.splitext(job_file)[0] + '.json')
+    return elapsed
+
+
+# ———————————————————————————————————————————————————
+#              REPORT
+# ———————————————————————————————————————————————————
+
+def summarize(times) :
+    return {'runs': len(times),
+        'min': min(times),
+        'median': statistics.median(times),
+        'max': max(times)}
+
+def print_report(results, instrument, fs) :
+    print()
+    print('%-12s %5s %10s %10s %10s' % \
+        ('benchmark', 'runs', 'min s', 'median s', 'max s'))
+    for name, r in results.items() :
+        print('%-12s %5d %10.3f %10.3f %10.3f' % \
+            (name, r['runs'], r['min'], r['median'], r['max']))
+    print()
+    print('Link setups: ' + fs.DEVICE.stats())
+    total = sum(instrument.commands.values())
+    print('SCPI commands handled by simulator: ' + str(total))
+    busiest = sorted(instrument.commands.items(), key=lambda kv : -kv[1])
+    for header, count in busiest[:10] :
+        print('   %6d  %s' % (count, header))
+
+
+# ———————————————————————————————————————————————————
+#              MAIN
+# ———————————————————————————————————————————————————
+
+def main() :
+    parser = fsSimETL.arg_parser()
+    parser.description = 'Benchmark fsCapture.py against a simulated ETL'
+    parser.set_defaults(port=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS,
+        default=BENCHMARKS)
+    parser.add_argument('--mlog-seconds', type=int, default=10,
+        help='capture duration typed into Measure Log; the export starts '
+            '4 s in, so shorter runs export no rows')
+    parser.add_argument('--level', default='info',
+        help='fsCapture log level (debug, info, warning)')
+    parser.add_argument('--json', help='write timings to this file')
+    parser.add_argument('--host-transfer', action='store_true',
+        help='set _hardcopy_dest = HOST; results go to the work folder')
+    parser.add_argument('--sample-seconds', type=int, default=5,
+        help='duration of the sample benchmark')
+    parser.add_argument('--sample-rate', type=float, default=10,
+        help='samples per second in the sample benchmark')
+    parser.add_argument('--track-rate', type=float, default=5,
+        help='GPS fixes per second in the track benchmark')
+    parser.add_argument('--metrics', action='store_true',
+        help='turn on fsCapture\'s SCPI metrics and write them to the '
+            'work folder')
+    parser.add_argument('--record', action='store_true',
+        help='record the SCPI trace to the work folder')
+    parser.add_argument('--replay', metavar='TRACE',
+        help='replay this SCPI trace instead of running the simulator')
+    parser.add_argument('--replay-speed', type=float, default=0,
+        help='replay speed: 1 = as recorded, 0 = no waiting (default)')
+    args = parser.parse_args()
+
+    instrument = fsSimETL.instrument_from_args(args)
+    server = fsSimETL.start_server(instrument, args.host, args.port)
+    resource = server.resource_name
+    if args.replay :
+        resource = 'REPLAY::' + os.path.abspath(args.replay) + '::' + \
+            str(args.replay_speed)
+    workdir = tempfile.mkdtemp(prefix='fsBenchmark_')
+    ini_file = os.path.join(workdir, 'fsCapture.INI')
+    with open(ini_file, 'w') as f :
+        f.write(INI_TEMPLATE.format(resource=resource,
+            hardcopy_dest='HOST' if args.host_transfer else 'MMEM',
+            host_folder=os.path.join(workdir, 'Measurement_results'),
+            metrics='on' if args.metrics else 'off',
+            trace='on' if args.record else 'off'))
+    if args.replay :
+        print('Replaying ' + args.replay)
+    else:
+        print('Simulated ETL at ' + server.resource_name)
+    print('INI file and logs in ' + workdir)
+    job_file = os.path.join(workdir, 'benchmark.job')
+    with open(job_file, 'w') as f :
+        f.write(JOB_TEMPLATE.format(seconds=args.mlog_seconds))
+    if 'dual' in args.only :
+        second = fsSimETL.instrument_from_args(args)
+        second_server = fsSimETL.start_server(second, args.host, 0)
+        dual_job_file = os.path.join(workdir, 'dual.job')
+        with open(dual_job_file, 'w') as f :
+            f.write(DUAL_JOB_TEMPLATE.format(seconds=args.mlog_seconds,
+                resource1=server.resource_name,
+                resource2=second_server.resource_name))
+
+    t0 = time.perf_counter()
+    fs = load_fscapture(ini_file, args.level)
+    print('Imported fsCapture in %.0f ms' % ((time.perf_counter() - t0) * 1000))
+    times = {name : [] for name in args.only}
+    # Startup always runs first: it reads the INI file and connects
+    for i in range(args.repeat) :
+        t = run_startup(fs)
+        if 'startup' in times :
+            times['startup'].append(t)
+        if 'capture' in times :
+            times['capture'].append(run_capture(fs))
+        if 'measurelog' in times :
+            times['measurelog'].append(run_measurelog(fs, args.mlog_seconds))
+        if 'job' in times :
+            times['job'].append(run_job(fs, job_file))
+        if 'dual' in times :
+            times['dual'].append(run_job(fs, dual_job_file))
+        if 'sample' in times :
+            times['sample'].append(run_sample(fs, args.sample_seconds,
+                args.sample_rate))
+        if 'track' in times :
+            times['track'].append(run_track(fs, args.track_rate))
+
+    results = {name : summarize(t) for name, t in times.items()}
+    print_report(results, instrument, fs)
+    if args.metrics :
+        print('Phases: ' + fs.METRICS.report())
+        print('Metrics: ' + ', '.join(fs.METRICS.export(workdir)))
+    for trace in fs.replay_traces.values() :
+        print('Replay: ' + trace.stats())
+    if args.json :
+        with open(args.json, 'w') as f :
+            json.dump({'results': results,
+                'link_setups': fs.DEVICE.connect_count,
+                'commands': instrument.commands}, f, indent=2)
+    fs.DEVICE.disconnect()
+    fs.RECORDER.stop()
+    server.shutdown()
+    if 'dual' in args.only :
+        second_server.shutdown()
+
+if __name__ == '__main__' :
+    main()
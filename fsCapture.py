@@ -47,6 +47,16 @@ import re
 import os
 import sys
 import configparser
+import threading
+import atexit
+import json
+import array
+import math
+import bisect
+import contextlib
+import functools
+
+STARTUP_T0 = time.perf_counter()  # For the time-to-menu report
 
 FMT = '%Y-%m-%d %X ' # Time stamp format for CONSOLE messages
 
@@ -81,7 +91,7 @@ def setvars():
               Q — Quit
               """ + _entryError + """
               Type a choice and press ENTER""")
-                choice = input (inputPrompt + ' >> ')
+                choice = ask (inputPrompt + ' >> ')
                 _entryError = ''
                 if choice == 'q':
                     done()
@@ -90,7 +100,7 @@ def setvars():
                 elif choice == '1':
                     INI_FILENAME = ini_file_spec
                 elif choice == '2':
-                    inibasename = input ('Enter new file name >> ')
+                    inibasename = ask ('Enter new file name >> ')
                     ini_file_spec = os.path.join(LOG_PATH, inibasename)
                     if not os.path.exists(ini_file_spec):
                         choice = '0' 
@@ -143,6 +153,15 @@ def setvars():
     _default_meas_results_folder = 'Z:\\Measurement_results'
     global _meas_results_folder
     _meas_results_folder = _default_meas_results_folder
+    # Where hardcopies and measure logs go:
+    #   MMEM — written by the ETL to _meas_results_folder (its own drive
+    #          or a network share such as Z:)
+    #   HOST — read back over the VISA link and written by this script
+    #          to _host_results_folder
+    global _hardcopy_dest
+    _hardcopy_dest = 'MMEM'
+    global _host_results_folder
+    _host_results_folder = 'C:\\Shared\\Measurement_results'
     global _default_channel_table
     _default_channel_table = "TV-USA-ATSC"
     global _channel_table
@@ -153,7 +172,7 @@ def setvars():
         logger.debug('INI file ' + INI_FILENAME + ' does not exist.')
     else:
         logger.debug('Reading from ' + \
-            str(config.read(INI_FILENAME)).replace('\\\\','\\'))
+            str(SETTINGS.load(INI_FILENAME)).replace('\\\\','\\'))
         logger.debug('Sections in INI_FILENAME: '+ str(config.sections()))
         section = 'UserEntered'
         if section in config: # If section exists in INI file
@@ -229,6 +248,25 @@ def setvars():
         except:
             logger.debug('Did not read _meas_results_folder from INI file')
             pass
+        try:
+            _hardcopy_dest = config.get('Hardcopy','_hardcopy_dest').upper()
+        except:
+            pass
+        try:
+            _host_results_folder = config.get('Hardcopy',\
+                '_host_results_folder')
+        except:
+            pass
+        try:
+            METRICS.enabled = config.get('Metrics','_metrics').lower() in \
+                ('on', 'yes', 'true', '1')
+        except:
+            pass
+        try:
+            RECORDER.enabled = config.get('Trace','_trace').lower() in \
+                ('on', 'yes', 'true', '1')
+        except:
+            pass
 
         logger.debug('After reading INI file, _callsign is ' + _callsign)
         logger.debug('After reading INI file, _testposition is ' + \
@@ -249,6 +287,10 @@ def setvars():
     _file = 'SetByUser'
     global _ext
     _ext = 'PNG'
+    global _mlog_seconds
+    _mlog_seconds = None  # Measure Log duration; None = ask the user
+    global last_saved
+    last_saved = None
     global _lat
     _lat = ''
     global _lon
@@ -285,7 +327,7 @@ def request_path(inipath,inibasename):
         Q — Quit
         """ + _entryError + """
         Type a choice and press ENTER""")
-        choice = input (inputPrompt + ' >> ')
+        choice = ask (inputPrompt + ' >> ')
         _entryError = ''
         if choice == 'q':
             sys.exit(0)
@@ -300,7 +342,7 @@ def request_path(inipath,inibasename):
                 choice = '0'
                 pass
         elif choice == '2':
-            inipath = os.path.expandvars(input ('Enter new path >> ') )
+            inipath = os.path.expandvars(ask ('Enter new path >> ') )
             if not os.path.exists(inipath):
                 choice = '0' 
             else:
@@ -397,17 +439,102 @@ def start_logging():
 # ———————————————————————————————————————————————————
 #               INI (or config) file
 # ———————————————————————————————————————————————————
+# The INI file is read once into config and all reads are served from
+# memory. Changes are written back SETTINGS_FLUSH_DELAY seconds after the
+# last edit (but no later than SETTINGS_FLUSH_MAX seconds after the first
+# unsaved one), so a run of checklist entries is saved in one write. The
+# file is written to <INI file>.tmp, synced and renamed over the INI file,
+# so a crash mid-write leaves the old file intact. Anything still unsaved
+# is written on exit.
 config = configparser.ConfigParser()
 
+SETTINGS_FLUSH_DELAY = 2   # seconds
+SETTINGS_FLUSH_MAX = 10    # seconds
+
+class SettingsStore :
+
+    def __init__(self, parser) :
+        self.config = parser
+        self.path = None
+        self.lock = threading.RLock()
+        self.timer = None
+        self.dirty_since = None  # time.monotonic() of first unsaved change
+        self.flush_count = 0
+        self.change_count = 0
+
+    def load(self, path) :
+        # Read path unless it is already loaded. Returns the files read.
+        with self.lock :
+            if path == self.path :
+                return [path]
+            self.flush()
+            for section in self.config.sections() :
+                self.config.remove_section(section)
+            self.config[configparser.DEFAULTSECT].clear()
+            self.path = path
+            return self.config.read(path)
+
+    def get(self, section, keyword) :
+        with self.lock :
+            return self.config.get(section, keyword)
+
+    def set(self, section, keyword, keyvalue) :
+        with self.lock :
+            if section != configparser.DEFAULTSECT and \
+                not self.config.has_section(section) :
+                self.config.add_section(section)
+            self.config.set(section, keyword, keyvalue)
+            self.change_count += 1
+            now = time.monotonic()
+            if self.dirty_since is None :
+                self.dirty_since = now
+            delay = min(SETTINGS_FLUSH_DELAY, \
+                self.dirty_since + SETTINGS_FLUSH_MAX - now)
+            if self.timer is not None :
+                self.timer.cancel()
+            self.timer = threading.Timer(max(delay, 0), self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self) :
+        # Write unsaved changes now
+        with self.lock :
+            if self.timer is not None :
+                self.timer.cancel()
+                self.timer = None
+            if self.dirty_since is None or self.path is None :
+                return
+            tmp = self.path + '.tmp'
+            try:
+                with open(tmp, 'w') as cfgfile :
+                    self.config.write(cfgfile)
+                    cfgfile.flush()
+                    os.fsync(cfgfile.fileno())
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning('!!! Could not save ' + self.path + ': ' + \
+                    str(e) + ' !!!')
+                return
+            self.dirty_since = None
+            self.flush_count += 1
+            logger.debug('Saved ' + self.path)
+
+    def stats(self) :
+        return str(self.change_count) + ' change(s) saved in ' + \
+            str(self.flush_count) + ' write(s)'
+
+SETTINGS = SettingsStore(config)
+atexit.register(SETTINGS.flush)
+
 def recall_setting(INI_FILENAME,section,keyword):
-    if not os.path.exists(INI_FILENAME):
+    if SETTINGS.path != INI_FILENAME and not os.path.exists(INI_FILENAME):
         logger.info(INI_FILENAME + ' does not exist.')
         raise
     else:
-        config.read(INI_FILENAME)
+        SETTINGS.load(INI_FILENAME)
         # Check if INI file has section and keyword
         try:
-            keyvalue = config.get(section, keyword)
+            keyvalue = SETTINGS.get(section, keyword)
             return keyvalue
         # If it doesn't i.e. An exception was raised
         except configparser.NoOptionError:
@@ -416,23 +543,14 @@ def recall_setting(INI_FILENAME,section,keyword):
             raise
 
 def update_config_file(INI_FILENAME, section, keyword, keyvalue):
-    config.read(INI_FILENAME)
-    try:
-        config.get(section, keyword)
-    except configparser.NoSectionError:
-        config.add_section(section)
-    except configparser.NoOptionError:
-        pass
-    cfgfile = open(INI_FILENAME, 'w')
-    config.set(section, keyword, keyvalue)
-    config.write(cfgfile)
-    #cfgfile.close()
+    SETTINGS.load(INI_FILENAME)
+    SETTINGS.set(section, keyword, keyvalue)
 
 def request_ipaddr():
     # Prompt user to type IP address and store it in INI file
     global ipaddr
     inputPrompt = 'Enter the IP address of the ETL analyzer'
-    ipaddr = input (inputPrompt + ' >> ')
+    ipaddr = ask (inputPrompt + ' >> ')
     import ipaddress
     try:
         ip = ipaddress.ip_address(ipaddr)
@@ -466,22 +584,916 @@ def recall_ipaddr():
 # ———————————————————————————————————————————————————————————————
 # 
 
-#Bring in the VISA library
-import pyvisa as visa
-#visa.log_to_screen()  # debug: show details of all operations
+#Bring in the VISA library. Importing pyvisa and creating the resource
+# manager (which scans the PyVISA-py backends) takes a noticeable part of
+# a cold start, so both wait until the first connection to the ETL;
+# offline checklist edits never load them.
+visa = None
+rm = None
 
 #Create a resource manager
-rm = visa.ResourceManager('@py')  #select the PyVISA-py backend using @py 
-#rm = visa.ResourceManager()    # use default NI-VISA backend
+def resource_manager() :
+    global visa, rm
+    if rm is None :
+        t0 = time.perf_counter()
+        import pyvisa as visa
+        #visa.log_to_screen()  # debug: show details of all operations
+        rm = visa.ResourceManager('@py')  #select the PyVISA-py backend using @py 
+        #rm = visa.ResourceManager()    # use default NI-VISA backend
+        startup_mark('VISA')
+        logger.debug('VISA loaded in ' + \
+            str(round((time.perf_counter() - t0) * 1000)) + ' ms')
+    return rm
+
+def resource_name(host):
+    # VISA resource string for the ETL. A plain IP address uses the
+    # VXI-11 link; a full resource string (anything containing '::', e.g.
+    # 'TCPIP::192.168.1.50::5025::SOCKET') is passed through unchanged.
+    host = str(host).replace('\n','').strip()
+    if '::' in host :
+        return host
+    return 'TCPIP::' + host + '::INSTR'
 
-def ping(host):
-    global DEVICE
+
+# ———————————————————————————————————————————————————
+#              SESSION MANAGER
+# ———————————————————————————————————————————————————
+# Every measurement used to call ping(), which opened and closed a new
+# link, and then DEVICE.open() / DEVICE.close() around each block of
+# commands. Each of those is a VXI-11 link setup. ETLSession keeps one
+# link open for the whole run:
+#   open()  — connect if there is no link (lazy), otherwise nothing
+#   close() — nothing; the link stays up until disconnect() in done()
+#   ping()  — health check; re-opens the link if it has gone away
+# Connection setups are counted and timed so they show up in the log.
+# Every command, connect and health check holds the session's RLock, so
+# a background thread (the GPS poller) can share the link. A thread that
+# needs several commands in a row holds DEVICE.lock around all of them.
+
+HEALTH_CHECK_IDLE = 30  # Seconds of idle link before ping() sends *OPC?
+
+class ETLSession :
+
+    def __init__(self) :
+        self.resource = None        # pyvisa resource; None = no link
+        self.resource_name = ''
+        self.connect_count = 0      # Number of link setups
+        self.connect_time = 0.0     # Total seconds spent in link setups
+        self.last_io = 0.0          # time.monotonic() of last good I/O
+        self.suspect = False        # Last I/O failed, check link on ping()
+        self._write_termination = '\n'
+        self._read_termination = '\n'
+        self._timeout = None        # ms; None = the resource's default
+        self.lock = threading.RLock()
+
+    def __str__(self) :
+        return 'ETLSession(' + (self.resource_name or ipaddr) + ')'
+
+    # Terminations and the VISA timeout are kept here so they survive a
+    # reconnect
+    @property
+    def write_termination(self) :
+        return self._write_termination
+
+    @write_termination.setter
+    def write_termination(self, value) :
+        self._write_termination = value
+        if self.resource is not None :
+            self.resource.write_termination = value
+
+    @property
+    def read_termination(self) :
+        return self._read_termination
+
+    @read_termination.setter
+    def read_termination(self, value) :
+        self._read_termination = value
+        if self.resource is not None :
+            self.resource.read_termination = value
+
+    @property
+    def timeout(self) :
+        with self.lock :
+            if self._timeout is None :
+                self.connect()
+                return self.resource.timeout
+            return self._timeout
+
+    @timeout.setter
+    def timeout(self, value) :
+        with self.lock :
+            self._timeout = value
+            if self.resource is not None :
+                self.resource.timeout = value
+
+    def connect(self) :
+        name = resource_name(ipaddr)
+        with self.lock :
+            if self.resource is not None and name == self.resource_name :
+                return
+            self.disconnect()  # IP address changed since the last connect
+            t0 = time.perf_counter()
+            if name.upper().startswith(REPLAY_PREFIX) :
+                resource_manager()  # Replayed errors are pyvisa's
+                self.resource = replay_resource(name)
+            else:
+                self.resource = resource_manager().open_resource(name)
+            elapsed = time.perf_counter() - t0
+            self.resource.write_termination = self._write_termination
+            self.resource.read_termination = self._read_termination
+            if self._timeout is not None :
+                self.resource.timeout = self._timeout
+            self.resource_name = name
+            RECORDER.start()
+            self.connect_count += 1
+            self.connect_time += elapsed
+            self.last_io = time.monotonic()
+            self.suspect = False
+        logger.debug('Opened link to ' + name + ' in ' + \
+            str(round(elapsed * 1000)) + ' ms (setup no. ' + \
+            str(self.connect_count) + ')')
+
+    def disconnect(self) :
+        with self.lock :
+            if self.resource is not None :
+                try:
+                    self.resource.close()
+                except:
+                    pass
+                logger.debug('Closed link to ' + self.resource_name)
+            self.resource = None
+
+    def open(self) :
+        self.connect()
+
+    def close(self) :
+        pass  # Keep the link open; see disconnect()
+
+    def ping(self) :
+        # True if the ETL answers. Only sends a query if the link has been
+        # idle for HEALTH_CHECK_IDLE seconds or the last command failed.
+        with self.lock :
+            for attempt in (1, 2) :
+                try:
+                    self.connect()
+                    if self.suspect or \
+                        time.monotonic() - self.last_io > HEALTH_CHECK_IDLE :
+                        self._io(self.resource.query, '*OPC?')
+                    return True
+                except:
+                    logger.debug('Health check of ' + str(self) + \
+                        ' failed, attempt ' + str(attempt))
+                    self.disconnect()
+            return False
+
+    def _io(self, method, *args, **kwargs) :
+        try:
+            if RECORDER.writer is not None :
+                result = RECORDER.call(method, *args, **kwargs)
+            else:
+                result = method(*args, **kwargs)
+        except visa.errors.VisaIOError as e:  # visa is loaded by connect()
+            self.suspect = True
+            if e.error_code != visa.constants.StatusCode.error_timeout :
+                self.disconnect()  # Link is gone; reconnect on next use
+            raise
+        except (OSError, EOFError) :
+            self.suspect = True
+            self.disconnect()
+            raise
+        self.last_io = time.monotonic()
+        self.suspect = False
+        return result
+
+    def _call(self, name, *args, **kwargs) :
+        if METRICS.enabled :
+            return METRICS.measure(self._send, name, *args, **kwargs)
+        return self._send(name, *args, **kwargs)
+
+    def _send(self, name, *args, **kwargs) :
+        # Run a resource method; if the link dropped, reconnect once and
+        # repeat the command.
+        with self.lock :
+            self.connect()
+            try:
+                return self._io(getattr(self.resource, name), *args, \
+                    **kwargs)
+            except:
+                if self.resource is not None :
+                    raise  # Timeout or instrument error, link is still up
+                logger.debug('Link to ' + self.resource_name + \
+                    ' dropped, reconnecting')
+                self.connect()
+                return self._io(getattr(self.resource, name), *args, \
+                    **kwargs)
+
+    def write(self, command, *args, **kwargs) :
+        return self._call('write', command, *args, **kwargs)
+
+    def query(self, command, *args, **kwargs) :
+        return self._call('query', command, *args, **kwargs)
+
+    def read(self, *args, **kwargs) :
+        return self._call('read', *args, **kwargs)
+
+    def read_bytes(self, count, *args, **kwargs) :
+        return self._call('read_bytes', count, *args, **kwargs)
+
+    def clear(self) :
+        return self._call('clear')
+
+    def __getattr__(self, name) :
+        # Anything else (read_raw, ...) goes to the resource
+        if name.startswith('_') :
+            raise AttributeError(name)
+        self.connect()
+        return getattr(self.resource, name)
+
+    def stats(self) :
+        if self.connect_count == 0 :
+            return 'no link setups'
+        return str(self.connect_count) + ' link setup(s), ' + \
+            str(round(self.connect_time * 1000)) + ' ms total, ' + \
+            str(round(self.connect_time * 1000 / self.connect_count)) + \
+            ' ms average'
+
+DEVICE = ETLSession()
+
+
+# ———————————————————————————————————————————————————
+#              METRICS
+# ———————————————————————————————————————————————————
+# With
+#   [Metrics]
+#   _metrics = on
+# in the INI file every command sent through DEVICE is timed: a latency
+# histogram (SCPI_BUCKETS), timeouts, other errors and bytes sent and
+# received, per command. The key is the message's headers without their
+# parameters, e.g. '*CLS;FREQ:CHAN;*OPC'; reads are keyed by the command
+# sent before them in the same thread, e.g. 'MMEM:DATA? (read_bytes)'. Functions decorated with
+# @timed() and blocks in METRICS.phase() are timed as phases, with the
+# time the same thread spent in SCPI commands meanwhile. What is left of
+# a phase is the script's own waiting and work, so a slow site can be
+# put down to the network or the ETL (SCPI time) or to this script.
+# done() writes the metrics of the session to LOG_PATH as JSON
+# (METRICS_JSON) and in the Prometheus text format (METRICS_PROM, for
+# node_exporter's textfile collector). Switched off, a command costs one
+# attribute check more.
+
+METRICS_JSON = 'fsCapture_metrics.json'
+METRICS_PROM = 'fsCapture_metrics.prom'
+SCPI_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, \
+    2, 5, 10, 30)  # s
+PHASE_BUCKETS = (0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)  # s
+
+class Histogram :
+
+    def __init__(self, buckets) :
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value) :
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) :
+        return {'count': self.count, 'seconds': self.sum, 'max': self.max,
+            'buckets': self.counts}
+
+class SessionMetrics :
+
+    def __init__(self) :
+        self.enabled = False
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.commands = {}  # key -> {'latency': Histogram, 'timeouts', ...}
+        self.phases = {}    # name -> {'time': Histogram, 'scpi', ...}
+        self.keys = {}      # message -> key
+        self.local = threading.local()  # SCPI time and last key per thread
+
+    def key(self, method, args) :
+        if method in ('read', 'read_bytes') :
+            return (getattr(self.local, 'last', '') + ' (' + method + \
+                ')').lstrip()
+        if method not in ('write', 'query') :
+            return '(' + method + ')'
+        message = args[0]
+        key = self.keys.get(message)
+        if key is None :
+            key = ';'.join(c.strip().lstrip(':').split(' ')[0] \
+                for c in split_reply(message) if c.strip())
+            if len(self.keys) > 1000 :
+                self.keys.clear()
+            self.keys[message] = key
+        self.local.last = key
+        return key
+
+    def measure(self, send, method, *args, **kwargs) :
+        # DEVICE._send(method, *args, **kwargs), timed
+        key = self.key(method, args)
+        sent = len(args[0]) + len(DEVICE.write_termination) \
+            if method in ('write', 'query') else 0
+        t0 = time.perf_counter()
+        try:
+            result = send(method, *args, **kwargs)
+        except Exception as e:
+            timeout = visa is not None and isinstance(e, \
+                visa.errors.VisaIOError) and \
+                e.error_code == visa.constants.StatusCode.error_timeout
+            self.record(key, time.perf_counter() - t0, sent, 0, \
+                'timeouts' if timeout else 'errors')
+            raise
+        received = 0
+        if isinstance(result, (str, bytes)) :
+            received = len(result)
+            if isinstance(result, str) :
+                received += len(DEVICE.read_termination)
+        self.record(key, time.perf_counter() - t0, sent, received)
+        return result
+
+    def record(self, key, seconds, sent, received, failure=None) :
+        with self.lock :
+            command = self.commands.get(key)
+            if command is None :
+                command = self.commands[key] = {'latency': \
+                    Histogram(SCPI_BUCKETS), 'timeouts': 0, 'errors': 0, \
+                    'bytes_sent': 0, 'bytes_received': 0}
+            command['latency'].add(seconds)
+            command['bytes_sent'] += sent
+            command['bytes_received'] += received
+            if failure :
+                command[failure] += 1
+        self.local.scpi = getattr(self.local, 'scpi', 0.0) + seconds
+        self.local.count = getattr(self.local, 'count', 0) + 1
+
+    @contextlib.contextmanager
+    def phase(self, name) :
+        # Time a block: with METRICS.phase('MeasureLog.export') : ...
+        if not self.enabled :
+            yield
+            return
+        scpi = getattr(self.local, 'scpi', 0.0)
+        count = getattr(self.local, 'count', 0)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self.lock :
+                phase = self.phases.get(name)
+                if phase is None :
+                    phase = self.phases[name] = {'time': \
+                        Histogram(PHASE_BUCKETS), 'scpi_seconds': 0.0, \
+                        'scpi_commands': 0}
+                phase['time'].add(elapsed)
+                phase['scpi_seconds'] += getattr(self.local, 'scpi', 0.0) - \
+                    scpi
+                phase['scpi_commands'] += getattr(self.local, 'count', 0) - \
+                    count
+
+    def as_dict(self) :
+        with self.lock :
+            return {'session': {'start': datetime.datetime.fromtimestamp(\
+                    self.started).isoformat(' ', 'seconds'),
+                    'seconds': time.time() - self.started,
+                    'etl': _etlIDN.strip() if '_etlIDN' in globals() \
+                        else '',
+                    'link_setups': DEVICE.connect_count,
+                    'link_setup_seconds': DEVICE.connect_time},
+                'scpi_buckets': list(SCPI_BUCKETS),
+                'phase_buckets': list(PHASE_BUCKETS),
+                'commands': {key : dict(c, latency=c['latency'].as_dict()) \
+                    for key, c in self.commands.items()},
+                'phases': {name : dict(p, time=p['time'].as_dict()) \
+                    for name, p in self.phases.items()}}
+
+    def prometheus(self) :
+        # The metrics in the Prometheus text exposition format
+        data = self.as_dict()
+        lines = []
+        def label(value) :
+            return value.replace('\\', '\\\\').replace('"', '\\"').\
+                replace('\n', '\\n')
+        def histogram(name, help, labelname, items, buckets) :
+            lines.append('# HELP ' + name + ' ' + help)
+            lines.append('# TYPE ' + name + ' histogram')
+            for key, h in items :
+                labels = labelname + '="' + label(key) + '"'
+                total = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], \
+                    h['buckets']) :
+                    total += count
+                    lines.append(name + '_bucket{' + labels + ',le="' + \
+                        str(bound) + '"} ' + str(total))
+                lines.append(name + '_sum{' + labels + '} ' + \
+                    repr(h['seconds']))
+                lines.append(name + '_count{' + labels + '} ' + \
+                    str(h['count']))
+        def counter(name, help, labelname, items) :
+            lines.append('# HELP ' + name + ' ' + help)
+            lines.append('# TYPE ' + name + ' counter')
+            for key, value in items :
+                lines.append(name + '{' + labelname + '="' + label(key) + \
+                    '"} ' + repr(value))
+        commands = sorted(data['commands'].items())
+        phases = sorted(data['phases'].items())
+        histogram('fscapture_scpi_seconds', 'SCPI command latency', \
+            'command', [(k, c['latency']) for k, c in commands], SCPI_BUCKETS)
+        for field, help in (('timeouts', 'SCPI command timeouts'), \
+            ('errors', 'SCPI commands failed other than by timeout'), \
+            ('bytes_sent', 'Bytes sent to the ETL'), \
+            ('bytes_received', 'Bytes received from the ETL')) :
+            counter('fscapture_scpi_' + field + '_total', help, 'command', \
+                [(k, c[field]) for k, c in commands])
+        histogram('fscapture_phase_seconds', 'Duration of a phase', \
+            'phase', [(k, p['time']) for k, p in phases], PHASE_BUCKETS)
+        counter('fscapture_phase_scpi_seconds_total', \
+            'Time spent in SCPI commands during a phase', 'phase', \
+            [(k, p['scpi_seconds']) for k, p in phases])
+        counter('fscapture_phase_scpi_commands_total', \
+            'SCPI commands sent during a phase', 'phase', \
+            [(k, p['scpi_commands']) for k, p in phases])
+        session = data['session']
+        lines.append('# TYPE fscapture_link_setups_total counter')
+        lines.append('fscapture_link_setups_total ' + \
+            str(session['link_setups']))
+        lines.append('# TYPE fscapture_link_setup_seconds_total counter')
+        lines.append('fscapture_link_setup_seconds_total ' + \
+            repr(session['link_setup_seconds']))
+        lines.append('# TYPE fscapture_session_seconds gauge')
+        lines.append('fscapture_session_seconds ' + \
+            repr(session['seconds']))
+        return '\n'.join(lines) + '\n'
+
+    def export(self, folder) :
+        # Write METRICS_JSON and METRICS_PROM to folder; returns their
+        # paths
+        paths = []
+        for name, text in ((METRICS_JSON, json.dumps(self.as_dict(), \
+            indent=2)), (METRICS_PROM, self.prometheus())) :
+            path = os.path.join(folder, name)
+            with open(path + '.tmp', 'w', newline='\n') as f :
+                f.write(text)
+            os.replace(path + '.tmp', path)
+            paths.append(path)
+        return paths
+
+    def report(self) :
+        # Phases: count, total and the part spent in SCPI commands
+        lines = []
+        for name, phase in self.phases.items() :
+            t = phase['time']
+            lines.append(name + ': ' + str(t.count) + ' x, ' + \
+                str(round(t.sum, 2)) + ' s, SCPI ' + \
+                str(round(phase['scpi_seconds'], 2)) + ' s (' + \
+                str(phase['scpi_commands']) + ' commands)')
+        return '; '.join(lines) if lines else 'no phases'
+
+METRICS = SessionMetrics()
+
+def timed(name) :
+    # Decorator: time every call of the function as the phase name
+    def decorate(function) :
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs) :
+            if not METRICS.enabled :
+                return function(*args, **kwargs)
+            with METRICS.phase(name) :
+                return function(*args, **kwargs)
+        return timed_function
+    return decorate
+
+
+# ———————————————————————————————————————————————————
+#              SCPI TRACE AND REPLAY
+# ———————————————————————————————————————————————————
+# With
+#   [Trace]
+#   _trace = on
+# in the INI file, every call on the link (command, reply or error,
+# timing and thread) is recorded to fsCapture_<YYYYMMDD>_<HHMMSS>.fst in
+# LOG_PATH (format: see fsData.py; "python fsData.py trace <file>"
+# shows where the session spent its time).
+# An IP address of
+#   REPLAY::<trace file>            at the recorded speed
+#   REPLAY::<trace file>::<speed>   <speed> times faster, 0 = no waiting
+# plays a trace back instead of connecting to an ETL, so the menus,
+# Capture Screen Shots etc. can be run and profiled in the office. Each
+# thread gets the replies recorded for the thread of the same name, in
+# order. A command that is not next is looked for REPLAY_LOOKAHEAD calls
+# ahead (calls in between are skipped), first as sent and then with its
+# digits ignored (times and file names differ from the recording); if it
+# is not there, the next recording of the same command anywhere in the
+# trace is used. A query that was never recorded times out; a write that
+# was never recorded is accepted.
+
+REPLAY_PREFIX = 'REPLAY::'
+REPLAY_LOOKAHEAD = 50
+
+class TraceRecorder :
+
+    def __init__(self) :
+        self.enabled = False
+        self.writer = None    # fsData.TraceWriter while recording
+        self.started = 0.0
+
+    def start(self) :
+        # Called at each connect; opens the trace file the first time
+        if not self.enabled or self.writer is not None :
+            return
+        import fsData
+        self.started = time.perf_counter()
+        now = datetime.datetime.now()
+        path = os.path.join(LOG_PATH, 'fsCapture_' + \
+            now.strftime('%Y%m%d_%H%M%S') + fsData.TRACE_EXT)
+        try:
+            self.writer = fsData.TraceWriter(path, {'resource': \
+                DEVICE.resource_name, 'start': now.isoformat(' '), \
+                'callsign': _callsign, 'measpt': _MEASPT})
+        except OSError as e:
+            self.enabled = False
+            logger.warning('!!! Could not record the SCPI trace to ' + \
+                path + ': ' + str(e) + ' !!!')
+            return
+        logger.info('Recording the SCPI trace to ' + path)
+
+    def call(self, method, *args, **kwargs) :
+        # method(*args, **kwargs), recorded
+        import fsData
+        record = {'t': 0.0, 'd': 0.0, \
+            'th': threading.current_thread().name, 'm': method.__name__, \
+            'a': args[0] if args else None}
+        t0 = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            if visa is not None and isinstance(e, visa.errors.VisaIOError) :
+                record['e'] = 'timeout' if e.error_code == \
+                    visa.constants.StatusCode.error_timeout else \
+                    'visa:' + str(int(e.error_code))
+            else:
+                record['e'] = 'link:' + str(e)
+            raise
+        else:
+            record['r'] = fsData.trace_reply(result)
+        finally:
+            t1 = time.perf_counter()
+            record['t'], record['d'] = t0 - self.started, t1 - t0
+            self.writer.write(record)
+        return result
+
+    def stop(self) :
+        if self.writer is not None :
+            self.writer.close()
+            logger.info('SCPI trace: ' + str(self.writer.count) + \
+                ' calls recorded to ' + self.writer.path)
+            self.writer = None
+
+RECORDER = TraceRecorder()
+
+def command_pattern(argument) :
+    # A command with its digits ignored
+    return re.sub(r'\d+', '#', argument) if isinstance(argument, str) \
+        else argument
+
+class ReplayTrace :
+
+    def __init__(self, path) :
+        import fsData
+        self.path = path
+        self.header, records = fsData.read_trace(path)
+        self.streams = {}   # thread name -> records in order
+        self.cursors = {}   # thread name -> index of the next record
+        self.calls = {}     # (method, argument) -> records
+        self.patterns = {}  # (method, command pattern) -> records
+        self.reused = {}    # key of calls / patterns -> times used
+        for record in records :
+            self.streams.setdefault(record['th'], []).append(record)
+            self.calls.setdefault((record['m'], record['a']), []).\
+                append(record)
+            self.patterns.setdefault((record['m'], \
+                command_pattern(record['a'])), []).append(record)
+        self.lock = threading.Lock()
+        self.served = self.skipped = self.elsewhere = self.missing = 0
+
+    def find(self, thread, method, argument) :
+        # The record that answers this call, or None
+        with self.lock :
+            stream = self.streams.get(thread, [])
+            start = self.cursors.get(thread, 0)
+            ahead = stream[start:start + REPLAY_LOOKAHEAD]
+            pattern = command_pattern(argument)
+            for match in (lambda r : r['a'] == argument, \
+                lambda r : command_pattern(r['a']) == pattern) :
+                for i, record in enumerate(ahead) :
+                    if record['m'] == method and match(record) :
+                        self.cursors[thread] = start + i + 1
+                        self.skipped += i
+                        self.served += 1
+                        return record
+            for table, key in ((self.calls, (method, argument)), \
+                (self.patterns, (method, pattern))) :
+                records = table.get(key)
+                if records :
+                    used = self.reused.get(key, 0)
+                    self.reused[key] = used + 1
+                    self.elsewhere += 1
+                    return records[used % len(records)]
+            self.missing += 1
+            return None
+
+    def stats(self) :
+        return str(self.served) + ' calls replayed in order, ' + \
+            str(self.skipped) + ' recorded calls skipped, ' + \
+            str(self.elsewhere) + ' answered from elsewhere in the trace, ' + \
+            str(self.missing) + ' not in the trace'
+
+class ReplayResource :
+    # Stands in for the pyvisa resource of a REPLAY:: IP address
+
+    def __init__(self, trace, speed) :
+        self.trace = trace
+        self.speed = speed
+        self.write_termination = '\n'
+        self.read_termination = '\n'
+        self.timeout = 2000
+
+    def replay(self, method, argument) :
+        import fsData
+        record = self.trace.find(threading.current_thread().name, method, \
+            argument)
+        if record is None :
+            if method == 'write' :
+                return len(argument) + len(self.write_termination)
+            if method == 'clear' :
+                return None
+            raise visa.errors.VisaIOError(\
+                visa.constants.StatusCode.error_timeout)
+        if self.speed :
+            time.sleep(record['d'] / self.speed)
+        error = record.get('e')
+        if error == 'timeout' :
+            raise visa.errors.VisaIOError(\
+                visa.constants.StatusCode.error_timeout)
+        if error and error.startswith('visa:') :
+            raise visa.errors.VisaIOError(int(error[5:]))
+        if error :
+            raise ConnectionResetError(error[5:])
+        return fsData.trace_value(record.get('r'))
+
+    def write(self, command, *args, **kwargs) :
+        return self.replay('write', command)
+
+    def query(self, command, *args, **kwargs) :
+        return self.replay('query', command)
+
+    def read(self, *args, **kwargs) :
+        return self.replay('read', None)
+
+    def read_bytes(self, count, *args, **kwargs) :
+        return self.replay('read_bytes', count)
+
+    def clear(self) :
+        return self.replay('clear', None)
+
+    def close(self) :
+        pass
+
+replay_traces = {}  # Trace file -> ReplayTrace, kept over reconnects
+
+def replay_resource(name) :
+    # ReplayResource for 'REPLAY::<trace file>[::<speed>]'
+    path, _, speed = name[len(REPLAY_PREFIX):].partition('::')
+    if path not in replay_traces :
+        t0 = time.perf_counter()
+        replay_traces[path] = ReplayTrace(path)
+        logger.info('Replaying ' + path + ' (' + \
+            str(sum(len(s) for s in replay_traces[path].streams.values())) + \
+            ' calls, recorded ' + \
+            str(replay_traces[path].header.get('start', '')) + ') at ' + \
+            ('full speed' if speed and float(speed) == 0 else \
+            (speed or '1') + 'x') + ', loaded in ' + \
+            str(round((time.perf_counter() - t0) * 1000)) + ' ms')
+    return ReplayResource(replay_traces[path], float(speed or 1))
+
+
+# ———————————————————————————————————————————————————
+#              OPERATION COMPLETE
+# ———————————————————————————————————————————————————
+# A blocking *OPC? after every write holds the link until the ETL has
+# settled, and when it timed out the old code slept another 2 seconds.
+# Instead the command is sent as '*CLS;<command>;*OPC'. *OPC sets bit 0
+# (Operation Complete) of the Event Status Register when the pending
+# operations finish; complete() polls *ESR? with a short, growing
+# interval until the bit is set or the deadline passes. Between
+# start_operation() and complete() the host is free to do other work.
+# (*ESE 1 plus a service request would avoid the polling, but PyVISA-py
+# does not deliver SRQ over TCPIP.)
+
+OPC_TIMEOUT = 5         # Default seconds to wait for an operation
+OPC_POLL_FIRST = 0.01   # First *ESR? poll interval in seconds
+OPC_POLL_MAX = 0.1      # Longest *ESR? poll interval in seconds
+
+# Operation label -> [count, total seconds, longest seconds]. Running
+# totals rather than every time: the GPS track adds one a second for as
+# long as it runs.
+opc_times = {}
+_pending = None  # The PendingOperation not yet completed, if any
+
+def record_opc_time(label, seconds) :
+    times = opc_times.setdefault(label, [0, 0.0, 0.0])
+    times[0] += 1
+    times[1] += seconds
+    times[2] = max(times[2], seconds)
+
+class PendingOperation :
+
+    def __init__(self, label, timeout) :
+        self.label = label
+        self.started = time.perf_counter()
+        self.deadline = self.started + timeout
+        self.done = False
+        self.elapsed = None
+
+    def poll(self) :
+        # One *ESR? query. Reading the register clears it.
+        if not self.done :
+            if int(DEVICE.query('*ESR?',)) & 1 :
+                self.done = True
+                self.elapsed = time.perf_counter() - self.started
+                record_opc_time(self.label, self.elapsed)
+        return self.done
+
+    def complete(self) :
+        # Wait until the operation is complete or the deadline passes.
+        # Returns True if it completed.
+        global _pending
+        interval = OPC_POLL_FIRST
+        while True :
+            try:
+                if self.poll() :
+                    break
+            except:
+                logger.debug(self.label + ' — *ESR? query failed')
+            remaining = self.deadline - time.perf_counter()
+            if remaining <= 0 :
+                logger.info(self.label + ' — Operation Complete not seen ' +\
+                    'after ' + str(round(self.deadline - self.started, 1)) +\
+                    ' s')
+                break
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, OPC_POLL_MAX)
+        if _pending is self :
+            _pending = None
+        if self.done :
+            logger.debug(self.label + ' — complete in ' + \
+                str(round(self.elapsed * 1000)) + ' ms')
+        return self.done
+
+def start_operation(command, label, timeout=OPC_TIMEOUT) :
+    # Send a command followed by *OPC and return without waiting. Only
+    # one operation is tracked at a time, so an earlier one is completed
+    # first.
+    global _pending
+    if _pending is not None :
+        _pending.complete()
+    operation = PendingOperation(label, timeout)
+    DEVICE.write('*CLS;' + command + ';*OPC',)
+    _pending = operation
+    return operation
+
+def opc_write(command, label, timeout=OPC_TIMEOUT) :
+    # Send a command and wait for it to complete. Returns True if the ETL
+    # reported Operation Complete before the timeout.
     try:
-        DEVICE = rm.open_resource('TCPIP::' + ipaddr + '::INSTR')
-        logger.debug("Connect to ("+ipaddr+") — True")
-        DEVICE.close()
-        return True
+        operation = start_operation(command, label, timeout)
     except:
+        logger.info(label + ' — write failed')
+        return False
+    return operation.complete()
+
+
+# ———————————————————————————————————————————————————
+#              COMMAND BATCHES
+# ———————————————————————————————————————————————————
+# Each write or query is a network round trip. SCPIBatch collects
+# commands and sends them as one program message joined with ';'
+#   INST CATV;*WAI;:CONF:TV:CTAB:SEL "TV-USA-ATSC";:FREQ:CHAN 8
+# The ':' in front of each header after the first starts it again from
+# the root of the command tree. If the batch contains queries, the ETL
+# answers them all in one reply, also separated by ';'. Put '*WAI' in
+# the batch where a command must not start before the previous ones
+# have finished.
+
+SCPI_MAX_MESSAGE = 1000  # Longest program message sent in one write
+
+def split_reply(reply) :
+    # Split a reply on ';' outside of quoted strings
+    parts, current, quote = [], '', ''
+    for ch in reply :
+        if quote :
+            if ch == quote :
+                quote = ''
+        elif ch in '"\'' :
+            quote = ch
+        elif ch == ';' :
+            parts.append(current)
+            current = ''
+            continue
+        current += ch
+    parts.append(current)
+    return parts
+
+class SCPIBatch :
+
+    def __init__(self, label='Batch') :
+        self.label = label
+        self.commands = []
+        self.complete = None  # After send(): False if an operation timed out
+
+    def write(self, command) :
+        self.commands.append(command)
+        return self
+
+    def query(self, command) :
+        self.commands.append(command)
+        return self
+
+    def messages(self) :
+        # Program messages of at most SCPI_MAX_MESSAGE characters
+        messages, current = [], ''
+        for command in self.commands :
+            if current and not command.startswith(('*', ':')) :
+                command = ':' + command
+            if current and \
+                len(current) + len(command) + 1 > SCPI_MAX_MESSAGE :
+                messages.append(current)
+                current = command.lstrip(':')
+            else:
+                current = current + ';' + command if current else command
+        if current :
+            messages.append(current)
+        return messages
+
+    def send(self, timeout=OPC_TIMEOUT) :
+        # Send the batch. A batch with queries returns their replies as a
+        # list, in order. A batch without queries ends with *OPC and waits
+        # for Operation Complete; it returns an empty list.
+        replies = []
+        messages = self.messages()
+        self.complete = True
+        t0 = time.perf_counter()
+        for message in messages :
+            queries = sum(1 for c in split_reply(message) \
+                if c.split(' ')[0].endswith('?'))
+            if queries == 0 :
+                if not start_operation(message, self.label, timeout).\
+                    complete() :
+                    self.complete = False
+                    logger.info(self.label + ' — not complete: ' + message)
+                continue
+            # The reply can be held back by *WAI, so allow the same time
+            # as an operation instead of the usual VISA timeout. The lock
+            # keeps another thread (the GPS track) from saving or
+            # restoring the timeout in between.
+            t1 = time.perf_counter()
+            with DEVICE.lock :
+                visa_timeout = DEVICE.timeout
+                DEVICE.timeout = max(visa_timeout or 0, timeout * 1000)
+                try:
+                    reply = DEVICE.query(message,)
+                finally:
+                    DEVICE.timeout = visa_timeout
+            record_opc_time(self.label, time.perf_counter() - t1)
+            parts = [p.strip() for p in split_reply(reply)]
+            if len(parts) != queries :
+                logger.info(self.label + ' — expected ' + str(queries) + \
+                    ' replies, got ' + str(len(parts)) + ': ' + reply)
+            replies.extend(parts)
+        logger.debug(self.label + ' — ' + str(len(self.commands)) + \
+            ' commands in ' + str(len(messages)) + ' message(s), ' + \
+            str(round((time.perf_counter() - t0) * 1000)) + ' ms')
+        return replies
+
+def opc_report() :
+    # Completion time per operation: count, average and longest
+    lines = []
+    for label, (count, total, longest) in opc_times.items() :
+        lines.append(label + ': ' + str(count) + ' x, avg ' + \
+            str(round(1000 * total / count)) + ' ms, max ' + \
+            str(round(1000 * longest)) + ' ms')
+    return '; '.join(lines) if lines else 'no operations'
+
+def ping(host):
+    if DEVICE.ping() :
+        logger.debug("Connect to ("+str(host).replace('\n','')+") — True")
+        return True
+    else:
         logger.debug('Could not connect to ' + str(DEVICE) )
         return False
 
@@ -615,7 +1627,7 @@ def ip_ok() :
             
             Type choice and ENTER or just ENTER to Quit"""
             logger.debug(inputPrompt)
-            choice = input (inputPrompt + ' >> ')
+            choice = ask (inputPrompt + ' >> ')
             
             if choice == "1":
                 logger.warning\
@@ -642,72 +1654,375 @@ def ip_ok() :
         
 
 
-def gps(): 
-    
-    global _gps
+def gps() :
+    # Set _gps, _lat, _lon, _altitude and _gpsValid from the last fix of
+    # the GPS poller, reading the position first if there is none yet.
+    # Returns the age of the fix in seconds, or None.
+    global _gps, _lat, _lon, _altitude, _gpsValid, _entryError
     _gps = 0
-    global _entryError
-    
-    _triedCount = 0
-    _tryToConnect = 0
-   
-    if (ping(ipaddr)) :
-        # currently connected to the GPS receiver?
-        DEVICE.open()
-        # when Radio/TV analyzer is not selected on ETL,
-        # following throws VI_ERROR_TMO.
-        try:
-            _gps = int(DEVICE.query('SYST:POS:GPS:CONN?',))
-            
-            logger.debug('_gps is ' + str(_gps) )
-        
-            if _gps == 1 :
-                # Displays GPS data in the Overview measurement.
-                DEVICE.write('DISP:MEAS:OVER:GPS:STAT ON',)
-                # Latitude:
-                global _lat
-                _lat = DEVICE.query('SYST:POS:LAT?',)
-                # Longitude:
-                global _lon
-                _lon = DEVICE.query('SYST:POS:LONG?',)
-                # Altitude in meters:
-                global _altitude
-                _altitude = DEVICE.query('SYST:POS:ALT?',)
-                # Query GPS number of satellites:
-                global _gpsValid
-                _gpsValid = DEVICE.query('SYSTem:POSition:GPS:SATellites?',)
-                
-                # Operation complete query. Returns an ASCII "+1" 
-                # when all pending overlapped operations have been 
-                # completed
-                _null = DEVICE.query('*OPC?',)
-                DEVICE.close()
-                
-                logger.debug('Lat, Long: '+_lat.replace('\n','') + \
-                    ','+_lon.replace('\n','') +\
-                    ', Altitude: '+_altitude.replace('\n','') +\
-                    ', GPS: ' + _gpsValid.replace('\n','') + \
-                    ' (no. of satellites)'      )
+    fix, age = GPS_POLLER.latest()
+    if fix is None :
+        fix, age = GPS_POLLER.poll(), 0.0
+    if fix is None :
+        _entryError = GPS_POLLER.error
+        logger.info(_entryError)
+        return None
+    _gps = fix['connected']
+    if _gps == 1 :
+        _lat, _lon = fix['lat'], fix['lon']
+        _altitude, _gpsValid = fix['altitude'], fix['satellites']
+    else:
+        logger.warning(' ———— GPS is NOT CONNECTED! ————')
+    return age
+
 
+# ———————————————————————————————————————————————————
+#              GPS POLLER
+# ———————————————————————————————————————————————————
+# menu() used to call gps() on every redraw: a health check and six
+# queries before the prompt appeared. GPS_POLLER reads the position
+# every GPS_POLL_INTERVAL seconds in a background thread and keeps the
+# last fix with its time, and the menu is drawn from that at once. The
+# poller only talks to the ETL while the script waits for the operator
+# (operator_idle, set by ask()) and holds DEVICE.lock for the whole
+# poll, so it never lands between the commands of a measurement.
+
+GPS_POLL_INTERVAL = 5  # seconds
+GPS_QUERIES = ('SYST:POS:LAT?', 'SYST:POS:LONG?', 'SYST:POS:ALT?',
+    'SYSTem:POSition:GPS:SATellites?')
+
+operator_idle = threading.Event()  # Set while ask() waits
+
+class GpsPoller :
+
+    def __init__(self) :
+        self.lock = threading.Lock()
+        self.fix = None    # {'connected', 'lat', 'lon', 'altitude',
+                           #  'satellites', 'time'}
+        self.error = ''    # Why the last poll failed
+        self.polls = 0
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self) :
+        if self.thread is not None and self.thread.is_alive() :
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name='gps', \
+            daemon=True)
+        self.thread.start()
+
+    def stop(self) :
+        self.stopping.set()
+        if self.thread is not None :
+            self.thread.join(GPS_POLL_INTERVAL)
+            self.thread = None
+
+    def run(self) :
+        while not self.stopping.wait(GPS_POLL_INTERVAL) :
+            with DEVICE.lock :
+                # The GPS track, if running, keeps the fix up to date
+                if operator_idle.is_set() and not GPS_TRACK.running() :
+                    self.poll()
+
+    def poll(self) :
+        # Read the position now. Returns the new fix, or None.
+        fix = None
+        with DEVICE.lock :
+            try:
+                if not DEVICE.ping() :
+                    raise OSError('FAILED to connect to ' + ipaddr)
+                fix = read_gps()
+            except OSError as e:
+                error = str(e)
+            except Exception:
+                # when Radio/TV analyzer is not selected on ETL, the
+                # queries time out
+                error = 'Did not get GPS status. ETL may not be in ' + \
+                    '"TV/Radio Analyzer" mode.'
             else:
-                logger.warning(' ———— GPS is NOT CONNECTED! ————')
-                DEVICE.close()
-        except :
-            _entryError = \
-                'Did not get GPS status. ETL may not be in \
-"TV/Radio Analyzer" mode.'
-            logger.info(_entryError)    
-            DEVICE.close()
-            pass
-        
-    else:
+                error = ''
+        return self.update(fix, error)
+
+    def update(self, fix, error='') :
+        # Keep fix as the last one (also used by the GPS track)
+        with self.lock :
+            self.error = error
+            if error :
+                logger.debug('GPS poll: ' + error)
+                return None
+            self.fix = fix
+            self.polls += 1
+        return fix
+
+    def latest(self) :
+        # (last fix, its age in seconds), or (None, None)
+        with self.lock :
+            fix = self.fix
+        if fix is None :
+            return None, None
+        return fix, time.time() - fix['time']
+
+def read_gps() :
+    # {'connected', 'time'} plus, if connected, 'lat', 'lon', 'altitude'
+    # and 'satellites' as the ETL replied. Raises if it cannot be read.
+    with DEVICE.lock :
+        fix = {'connected': int(DEVICE.query('SYST:POS:GPS:CONN?')),
+            'time': time.time()}
+        if fix['connected'] == 1 :
+            batch = SCPIBatch('GPS')
+            for query in GPS_QUERIES :
+                batch.query(query)
+            fix['lat'], fix['lon'], fix['altitude'], fix['satellites'] = \
+                batch.send()
+    return fix
+
+GPS_POLLER = GpsPoller()
 
-        _entryError = 'FAILED to connect to ' + ipaddr + ''
-        logger.info(_entryError)    
 
-    
-    return
+# ———————————————————————————————————————————————————
+#              GPS TRACK
+# ———————————————————————————————————————————————————
+# Menu choice 17 starts and stops the GPS track: a background thread
+# reads the position TRACK_RATE times a second (read_gps()) and appends
+# the fixes to <_host_results_folder>\GPS_track\<YYYYMMDD>.fsd every
+# TRACK_FLUSH seconds, one column store per day with a geohash cell for
+# each fix (see fsData.py; "python fsData.py near" finds the fixes
+# around a point). Each fix is also the GPS poller's last fix.
+# Unlike the GPS poller, the track keeps running during measurements, so
+# its reads do land between the commands of a measurement. Each read
+# holds DEVICE.lock and only queries the position. That changes no
+# measurement setting and does not touch the Operation Complete bit that
+# PendingOperation polls. A sequence that must not be split (a command
+# and its binary reply, a timeout change) holds DEVICE.lock around it.
+
+TRACK_RATE = 1     # fixes per second
+TRACK_FLUSH = 10   # seconds
+TRACK_FOLDER = 'GPS_track'
+
+class GpsTrack :
+
+    def __init__(self) :
+        self.thread = None
+        self.stopping = threading.Event()
+        self.fixes = 0     # Fixes recorded since start()
+        self.errors = 0    # Reads that failed since start()
+        self.store = None
+
+    def running(self) :
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, rate=TRACK_RATE) :
+        if self.running() :
+            return
+        self.stopping.clear()
+        self.fixes = self.errors = 0
+        self.thread = threading.Thread(target=self.run, args=(rate,), \
+            name='gps-track', daemon=True)
+        self.thread.start()
+        logger.warning('GPS track started, ' + str(rate) + \
+            ' fix(es) a second')
+
+    def stop(self) :
+        if not self.running() :
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        logger.warning('GPS track stopped: ' + str(self.fixes) + \
+            ' fixes, ' + str(self.errors) + ' failed reads' + \
+            (', saved to ' + self.store.path if self.store else ''))
+
+    def open_store(self, fsData, name) :
+        folder = os.path.join(_host_results_folder, TRACK_FOLDER)
+        os.makedirs(folder, exist_ok=True)
+        return fsData.open_track(os.path.join(folder, name), \
+            {'etl': _etlIDN.strip()})
+
+    def empty_rows(self, fsData) :
+        return {name : array.array(fsData.DTYPES[dtype]) \
+            for name, dtype in fsData.TRACK_COLUMNS}
+
+    def flush(self, fsData, rows) :
+        # Append rows to the store of the day; returns empty rows
+        if len(rows['Time']) :
+            day = datetime.datetime.fromtimestamp(rows['Time'][0]).\
+                strftime('%Y%m%d') + fsData.STORE_EXT
+            try:
+                if self.store is None or \
+                    os.path.basename(self.store.path) != day :
+                    self.store = self.open_store(fsData, day)
+                self.store.append(rows)
+            except OSError as e:
+                logger.warning('!!! Could not save the GPS track: ' + \
+                    str(e) + ' !!!')
+        return self.empty_rows(fsData)
+
+    def run(self, rate) :
+        import fsData
+        rows = self.empty_rows(fsData)
+        interval = 1.0 / rate
+        next_fix = last_flush = time.monotonic()
+        while not self.stopping.is_set() :
+            try:
+                fix = read_gps()
+                if fix['connected'] == 1 :
+                    lat, lon = float(fix['lat']), float(fix['lon'])
+                    rows['Time'].append(fix['time'])
+                    rows['Latitude'].append(lat)
+                    rows['Longitude'].append(lon)
+                    rows['Altitude'].append(float(fix['altitude']))
+                    rows['Satellites'].append(int(float(fix['satellites'])))
+                    rows['Cell'].append(fsData.geohash_cell(lat, lon))
+                    self.fixes += 1
+                GPS_POLLER.update(fix)
+            except Exception as e:
+                self.errors += 1
+                logger.debug('GPS track: ' + str(e))
+            if time.monotonic() - last_flush >= TRACK_FLUSH :
+                rows = self.flush(fsData, rows)
+                last_flush = time.monotonic()
+            next_fix += interval
+            delay = next_fix - time.monotonic()
+            if delay <= 0 :
+                next_fix = time.monotonic()  # Behind; don't catch up
+            elif self.stopping.wait(delay) :
+                break
+        self.flush(fsData, rows)
+
+    def status(self) :
+        if not self.running() :
+            return 'not recording'
+        return 'recording, ' + str(self.fixes) + ' fixes'
 
+GPS_TRACK = GpsTrack()
+
+def GpsTrackMenu() :
+    # Menu choice 17: start or stop the GPS track
+    try:
+        import fsData
+    except ImportError:
+        logger.warning('!!! The GPS track needs fsData.py !!!')
+        return
+    if GPS_TRACK.running() :
+        GPS_TRACK.stop()
+    else:
+        GPS_TRACK.start()
+
+# ———————————————————————————————————————————————————
+#             VALIDATION CACHE
+# ———————————————————————————————————————————————————
+# At every launch meas_results_folder() and channel_table() asked the
+# ETL with MMEM:CAT? whether the results folder and the channel table
+# exist. A path the ETL has confirmed is now remembered in
+# VALIDATION_FILE in LOG_PATH, under the ETL's *IDN? reply, for
+# VALIDATION_TTL seconds. Within that time the startup check is skipped
+# and the path is checked again in the background, over a link of its
+# own, VALIDATION_REFRESH_DELAY seconds later. A path the ETL no longer
+# reports is dropped from the cache (and checked at the next launch).
+
+VALIDATION_FILE = 'fsCapture_validated.json'
+VALIDATION_TTL = 7 * 24 * 3600      # seconds
+VALIDATION_REFRESH_DELAY = 2        # seconds
+VALIDATION_TIMEOUT = 3000           # ms, VISA timeout of the refresh link
+
+_validated = None       # {IDN: {path: time confirmed}}, loaded on first use
+_validation_lock = threading.Lock()
+_refresh_paths = []     # Paths to check in the background
+_refresh_timer = None
+
+def validation_file() :
+    return os.path.join(LOG_PATH, VALIDATION_FILE)
+
+def validation_cache() :
+    # {path: time confirmed} of the connected ETL
+    global _validated
+    if _validated is None :
+        try:
+            with open(validation_file()) as f :
+                _validated = json.load(f)
+        except (OSError, ValueError):
+            _validated = {}
+    return _validated.setdefault(_etlIDN.strip(), {})
+
+def save_validation_cache() :
+    tmp = validation_file() + '.tmp'
+    try:
+        with open(tmp, 'w') as f :
+            json.dump(_validated, f, indent=2)
+        os.replace(tmp, validation_file())
+    except OSError as e:
+        logger.debug('Could not save ' + validation_file() + ': ' + str(e))
+
+def validated(path) :
+    # True if the ETL confirmed path within VALIDATION_TTL; a background
+    # check is then queued
+    global _refresh_timer
+    if withoutConnection != 0 or not _etlIDN.strip() :
+        return False
+    with _validation_lock :
+        confirmed = validation_cache().get(path)
+        if confirmed is None or time.time() - confirmed > VALIDATION_TTL :
+            return False
+        if path not in _refresh_paths :
+            _refresh_paths.append(path)
+        if _refresh_timer is None :
+            _refresh_timer = threading.Timer(VALIDATION_REFRESH_DELAY, \
+                refresh_validations)
+            _refresh_timer.daemon = True
+            _refresh_timer.start()
+    logger.debug('\'' + path + '\' confirmed by the ETL ' + \
+        str(round((time.time() - confirmed) / 3600, 1)) + ' h ago (cached)')
+    return True
+
+def remember_valid(path, valid=True) :
+    with _validation_lock :
+        cache = validation_cache()
+        if valid :
+            cache[path] = time.time()
+        elif cache.pop(path, None) is None :
+            return
+        save_validation_cache()
+
+def catalog_confirms(path, dir_list) :
+    # True if dir_list, the reply to MMEM:CAT? path, shows that path
+    # exists. Any reply will do for a folder; for a file (a channel table)
+    # the reply must be its name, as in channel_table().
+    if dir_list is None :
+        return False
+    if path.upper().endswith('.CHT') :
+        return dir_list == '\'' + path.rsplit('\\', 1)[-1] + '\''
+    return True
+
+def refresh_validations() :
+    # Background thread: MMEM:CAT? for each queued path
+    global _refresh_timer
+    with _validation_lock :
+        paths = list(_refresh_paths)
+        _refresh_paths.clear()
+        _refresh_timer = None
+    try:
+        link = resource_manager().open_resource(resource_name(ipaddr))
+    except Exception as e:
+        logger.debug('Validation refresh: no link: ' + str(e))
+        return
+    try:
+        link.timeout = VALIDATION_TIMEOUT
+        link.write_termination = DEVICE.write_termination
+        link.read_termination = DEVICE.read_termination
+        for path in paths :
+            try:
+                dir_list = link.query("MMEM:CAT? \'" + path + "\'")
+            except visa.errors.VisaIOError :
+                dir_list = None
+            if catalog_confirms(path, dir_list) :
+                remember_valid(path)
+            else:
+                remember_valid(path, False)
+                logger.warning('!!! ETL no longer reports \'' + path + \
+                    '\'; it will be checked at the next launch !!!')
+    finally:
+        link.close()
 
 # ———————————————————————————————————————————————————
 #             MEASUREMENT RESULTS FOLDER
@@ -716,6 +2031,8 @@ def meas_results_folder() :
     global withoutConnection
     global _default_meas_results_folder
     global _meas_results_folder
+    if validated(_meas_results_folder) :
+        return
     if withoutConnection == 0 :  # If not connected (1), skip this
         # Test if _meas_results_folder exists
         logger.debug('Test if measurement results folder exists: ' + \
@@ -731,6 +2048,7 @@ def meas_results_folder() :
                 DEVICE.close()
                 choice = '1'
                 _meas_results_folder = new_meas_results_folder
+                remember_valid(_meas_results_folder)
                 logger.debug\
                     ('ETL reported that Measurement Results Folder \'' + \
                         new_meas_results_folder + '\' exists')
@@ -754,7 +2072,7 @@ exist
                 """ + _entryError + """
                 Type a choice and press ENTER or ENTER alone to try again"""
                 logger.debug(inputPrompt)
-                choice = input (inputPrompt + ' >> ')
+                choice = ask (inputPrompt + ' >> ')
                 _entryError = ''
 
                 if choice == "q":
@@ -772,7 +2090,7 @@ Measurement Results Folder that does not exist.')
                         ('User chose 2 to enter a new Measurement Results \
 Folder.')
                     inputPrompt = 'New folder'
-                    new_meas_results_folder = input (inputPrompt + ' >> ')
+                    new_meas_results_folder = ask (inputPrompt + ' >> ')
                     # Delete characters that are not legal in path names
                     new_meas_results_folder = re.sub(r'[*?<>|]',"",\
                         new_meas_results_folder)
@@ -796,11 +2114,97 @@ Folder.')
 # ———————————————————————————————————————————————————
 #             CHANNEL TABLE
 # ———————————————————————————————————————————————————
+# The channels of _channel_table are read from a host copy of the .CHT
+# file (fsData.read_cht()), in LOG_PATH or next to this script. If there
+# is none, the ETL's file is read over the link once and saved in
+# LOG_PATH. With the table, channel numbers are checked against it, the
+# menu shows the frequency, and commonsettings() takes the centre
+# frequency from it instead of asking the ETL with FREQ:CENT?.
+# Without it (or without fsData.py) channels 2-36 are accepted and the
+# frequency is asked for, as before.
+
+CHANNEL_TABLE_FOLDER = 'C:\\R_S\\instr\\catv\\channel_tables'
+DEFAULT_CHANNELS = (2, 36)  # First and last channel without a table
+
+channels = None  # fsData.ChannelTable of _channel_table, or None
+
+def channel_table_file(name) :
+    # Host copy of <name>.CHT, or None
+    for folder in (LOG_PATH, os.path.dirname(os.path.abspath(__file__))) :
+        path = os.path.join(folder, name + '.CHT')
+        if os.path.exists(path) :
+            return path
+    return None
+
+def load_channel_table() :
+    # Set channels to the table of _channel_table; None if it cannot be
+    # read
+    global channels
+    channels = None
+    try:
+        import fsData
+    except ImportError:
+        return None
+    path = channel_table_file(_channel_table)
+    if path is None and withoutConnection == 0 :
+        path = os.path.join(LOG_PATH, _channel_table + '.CHT')
+        try:
+            DEVICE.open()
+            fetch_file(CHANNEL_TABLE_FOLDER + '\\' + _channel_table + \
+                '.CHT', path, 'CHT').result()
+        except Exception as e:
+            logger.debug('Could not read ' + _channel_table + \
+                '.CHT from the ETL: ' + str(e))
+        DEVICE.close()
+    try:
+        channels = fsData.read_cht(path)
+    except (TypeError, OSError, ValueError) as e:
+        logger.info('Channel table ' + _channel_table + \
+            ' not read on the host: ' + str(e))
+        return None
+    logger.info('Channel table ' + channels.name + ': ' + \
+        str(len(channels)) + ' channels, ' + channels.describe())
+    return channels
+
+def channel_frequency(channel) :
+    # Centre frequency of channel in Hz from the channel table, or None
+    if channels is None or channel not in channels :
+        return None
+    return channels.frequency(channel)
+
+def channel_label(channel) :
+    # '8, 183.000 MHz' for the menu
+    frequency = channel_frequency(channel)
+    if frequency is None :
+        return str(channel)
+    return str(channel) + ', ' + '%.3f' % (frequency / 1e6) + ' MHz'
+
+def check_channel(channel) :
+    # Returns '' if channel can be used, otherwise why not
+    if channels is not None :
+        if channel in channels :
+            return ''
+        return 'NOT IN CHANNEL TABLE ' + channels.name + ' (' + \
+            channels.describe() + ')'
+    try:
+        channel = int(channel)
+    except ValueError:
+        return 'MUST BE AN INTEGER'
+    first, last = DEFAULT_CHANNELS
+    if channel > last :
+        return 'MUST BE LESS THAN ' + str(last + 1)
+    if channel < first :
+        return 'MUST BE GREATER THAN ' + str(first - 1)
+    return ''
+
 def channel_table() :
     global withoutConnection
     global _default_channel_table
     global _channel_table
     
+    if validated(CHANNEL_TABLE_FOLDER + '\\' + _channel_table + '.CHT') :
+        load_channel_table()
+        return
     if withoutConnection == 0 :  # If not connected (1), skip this
         # Test if _channel_table exists
 
@@ -826,6 +2230,8 @@ def channel_table() :
                 if (dir_list == '\''+new_channel_table + '.CHT\'') :
                     choice = '4'
                     _channel_table = new_channel_table
+                    remember_valid(CHANNEL_TABLE_FOLDER + '\\' + \
+                        _channel_table + '.CHT')
                     logger.debug\
                         ('ETL reported that Channel Table \'' + \
                         new_channel_table + '\' exists')
@@ -849,7 +2255,7 @@ def channel_table() :
                 """ + _entryError + """
                 Type a choice and press ENTER or ENTER alone to try again"""
                 logger.debug(inputPrompt)
-                choice = input (inputPrompt + ' >> ')
+                choice = ask (inputPrompt + ' >> ')
                 _entryError = ''
 
                 if choice == "q":
@@ -864,7 +2270,7 @@ Channel Table that does not exist.')
                 elif choice == "2":
                     
                     inputPrompt = 'New Channel Table name'
-                    new_channel_table = input (inputPrompt + ' >> ')
+                    new_channel_table = ask (inputPrompt + ' >> ')
                     logger.debug\
                         ('User chose 2 to enter new Channel Table: \''+\
                             new_channel_table + '\'' )
@@ -885,6 +2291,7 @@ Channel Table that does not exist.')
                         '" is not a valid choice'
                     choice = '0' 
                 pass  # Keep going
+    load_channel_table()
     return
 # ———————————————————————————————————————————————————
 #              MENU
@@ -904,9 +2311,10 @@ def menu():
     choice ='0'
     while choice =='0':    
         if withoutConnection == 0 :
-            gps()
+            GPS_POLLER.start()
+            age = gps()
             if _gps == 1 :
-                GpsMsg = ('''       GPS  
+                GpsMsg = ('''       GPS  (''' + str(round(age)) + ''' s ago)
                           Lat, Lon: ''' + _lat.replace("\n","") + ''', '''\
                                + _lon.replace("\n","") + '''
                           Altitude: ''' + _altitude.replace("\n","") +\
@@ -922,7 +2330,7 @@ def menu():
     Control Script for Rohde & Schwarz ETL Analyzer"""
  + timedatewarning + """
               2 — enter Call Sign ["""+_callsign+"""] and Channel ["""+\
-                  _channel+"""]
+                  channel_label(_channel)+"""]
               3 — enter Measuring Location ["""+_MEASPT+"""]
               4 — enter Test position ["""+_testposition+"""]
               5 — enter Truck Heading ["""+str(_truckheading)+"""]
@@ -937,6 +2345,8 @@ def menu():
              13 — Measure Log — START CAPTURE
              14 — Site Checklist
              15 — Screen Shot of current screen
+             16 — Sample DTV results to host
+             17 — GPS track — START/STOP ["""+GPS_TRACK.status()+"""]
              
               Q — Quit
               
@@ -945,9 +2355,10 @@ def menu():
               """ + _entryError + """
              Type a choice and press ENTER""") 
           
-
+        if not startup_reported :
+            startup_report()
           
-        choice = input (inputPrompt + ' >> ')
+        choice = ask (inputPrompt + ' >> ')
           
         _entryError = ''
 
@@ -955,6 +2366,14 @@ def menu():
             done()
         elif choice == "Q":
             done()
+        elif choice == "17":
+            if withoutConnection == 0 :
+                GpsTrackMenu()
+            choice = '0' 
+        elif choice == "16":
+            if withoutConnection == 0 :
+                SampleResults()
+            choice = '0' 
         elif choice == "15":
             if withoutConnection == 0 :
                 _file = 'SetByUser'
@@ -1028,7 +2447,7 @@ def menu():
 
 def requestCallChan():
     global _callsign
-    _input = input("Call sign? ("+_callsign+") >> ")
+    _input = ask("Call sign? ("+_callsign+") >> ")
     if _input != "" :
         # Replace space, convert to upper case
         _callsign =  _input.replace(" ","").upper()
@@ -1044,7 +2463,7 @@ def requestCallChan():
     message = "Channel number? ("+_channel+") >> "
     chanEntered = 0
     while chanEntered == 0 :
-        _input = input(message)
+        _input = ask(message)
         chanEntered = 1
         message = "Channel number? ("+_channel+") >> "
         if _input == "" :
@@ -1060,13 +2479,10 @@ def requestCallChan():
                 continue
                
             else:
-                if  _input > 36 :
-                    message = message + """
-                    MUST BE LESS THAN 37 >> """
-                    chanEntered = 0
-                elif _input < 2 :
+                problem = check_channel(_input)
+                if problem :
                     message = message + """
-                    MUST BE GREATER THAN 1 >> """
+                    """ + problem + """ >> """
                     chanEntered = 0
                 else:
                     _channel = str(_input)
@@ -1074,6 +2490,7 @@ def requestCallChan():
                     section , keyword , keyvalue = 'UserEntered' , '_channel' \
                         , _channel
                     update_config_file(INI_FILENAME, section, keyword, keyvalue)
+                    logger.debug('Channel is ' + channel_label(_channel))
                     return _channel
                     #break
     return
@@ -1085,7 +2502,7 @@ def requestradial() :
     message = "Radial? (" + str(_radial)+ ") >> "
     while True:
         try:
-            _input = int(input(message))
+            _input = int(ask(message))
             message = "Radial? (" + str(_radial)+ ") >> "
         except ValueError:
             message = message + """
@@ -1117,7 +2534,7 @@ def requestdist() :
     '''
     while True:
         try:
-            _input = int(input(message))
+            _input = int(ask(message))
             message = "Distance? (" + str(_dist)+ ")"
         except ValueError:
             message = message + """
@@ -1140,7 +2557,7 @@ def requestdist() :
                 return _dist
                 break
     '''
-    _input = input(message)
+    _input = ask(message)
     if _input != "" :
         # Replace space, convert to upper case
         _dist =  _input.replace(" ","").upper()
@@ -1165,7 +2582,7 @@ def requestmonpoint():
      
 def requesttest():
     global _testposition
-    _input = input("Test? ("+_testposition+") >> ")
+    _input = ask("Test? ("+_testposition+") >> ")
     if _input != "" :
         _testposition = _input.replace(" ","").upper()
         # Eliminate illegal characters in file names, limit length to first
@@ -1181,25 +2598,24 @@ def requesttest():
 #              COMMON SETTINGS FOR ALL MEASUREMENTS
 # ———————————————————————————————————————————————————
 
-def commonsettings() :
+@timed('commonsettings')
+def commonsettings(*measurement) :
+    # Settings for all measurements, followed by the commands in
+    # `measurement` (e.g. 'CONF:DTV:MEAS OVER'). Sent as two batches:
+    # mode, channel table and tuning, then attenuation, the measurement
+    # and FREQ:CENT?. Returns the replies to any queries in
+    # `measurement`.
 
+    replies = []
     if (ping(ipaddr)) :    
         logger.debug("Common settings for all measurements")
         DEVICE.open()
         DEVICE.clear()
     
+        setup = SCPIBatch('Select mode and tune')
         # select the measurement mode "TV/Radio Analyzer/Receiver"
-        DEVICE.write('INST CATV',)
-        
-        # Operation complete query. Returns an ASCII "+1"
-        # when all pending overlapped operations have been completed
-        _null = '0'
-        try:
-            _null = DEVICE.query('*OPC?',)
-        except:
-            logger.info("Select TV/Radio Analyzer mode — \
-Operation Complete exception: " + _null.replace('\n','') )
-            pass
+        # and let it finish before the channel table is selected
+        setup.write('INST CATV').write('*WAI')
 
         # Sets the TV standard
         #DEVICE.write('SET:TV:SpTAN ATSC')
@@ -1209,69 +2625,46 @@ Operation Complete exception: " + _null.replace('\n','') )
         #   MSymbol/s.
         #DEVICE.write('DDEM:SRAT 10.7622378MA')
         # Selects and activates channel table; 
-        try:
-            DEVICE.write('CONF:TV:CTAB:SEL \"' + _channel_table + '\"',)
-        except:
-            logger.debug('Failed to select channel table \'' + \
-                _channel_table +'\"',)
-            pass
+        setup.write('CONF:TV:CTAB:SEL \"' + _channel_table + '\"')
         #Specifies the pilot carrier frequency as reference frequency.
         #DEVICE.write('FREQ:PIL:STAT ON')
-        # Tune to channel:
-        DEVICE.write('FREQ:CHAN '+ _channel,)
-
-        
-        # Operation complete query. Returns an ASCII "+1"
-        # when all pending overlapped operations have been completed
-        _null = '0'
-        try:
-            _null = DEVICE.query('*OPC?',)
-        except:
-            logger.info("Tune to channel — Operation Complete failed: " \
-                + _null.replace('\n','') )
-            time.sleep(2)
-            pass
-        
+        # Tune to channel and wait for Operation Complete.
         # Following step (RF Attenuator) produced screwy results
         # if we didn't wait for operation complete. 
-        
-        # Configures the RF attenuation mode to continuous
-        # control of the attenuator.:
-        logger.debug\
-            ('Write to DEVICE: "SENS:POW:ACH:PRES:RLEV:AUTO SLA"')
+        setup.write('FREQ:CHAN '+ _channel)
         try:
-            DEVICE.write('SENS:POW:ACH:PRES:RLEV:AUTO SLA',)
+            with METRICS.phase('commonsettings.tune') :
+                setup.send()
         except:
-            logger.info("Set RF attenuation mode failed")
-            pass
-        try:
-            _null = '0'
-            _null = DEVICE.query('*OPC?',)
-        except:
-            logger.info\
-                ("Set RF attenuation mode — Operation Complete failed: "\
-                     + _null.replace('\n','') )
-            time.sleep(2)
-            pass
+            logger.info('Select mode and tune to channel failed')
         
+        measure = SCPIBatch('Measurement setup')
+        # Configures the RF attenuation mode to continuous
+        # control of the attenuator. *WAI holds the measurement
+        # commands until it has finished.
+        measure.write('SENS:POW:ACH:PRES:RLEV:AUTO SLA').write('*WAI')
+        for command in measurement :
+            measure.write(command)
+        # The reply to the last query comes only after all the commands
+        # before it have finished. The frequency is only asked for if it
+        # is not in the channel table.
         global _frequency
+        frequency = channel_frequency(_channel)
+        measure.write('*WAI')
+        if frequency is None :
+            measure.query('FREQ:CENT?')
         try:
-            _frequency = DEVICE.query('FREQ:CENT?',) # in Hz
-            logger.debug("Frequency reported by ETL: " + \
-                _frequency.replace('\n','') + " Hz" )
+            with METRICS.phase('commonsettings.measurement') :
+                replies = measure.send()
+            if frequency is None :
+                _frequency = replies.pop() # in Hz
+                logger.debug("Frequency reported by ETL: " + \
+                    _frequency.replace('\n','') + " Hz" )
+            else:
+                _frequency = '%.0f' % frequency
         except:
-            logger.info("Frequency query failed" )
-            time.sleep(2)
+            logger.info("Measurement setup or frequency query failed" )
             pass
-        
-        
-        # Operation complete query. Returns an ASCII "+1" 
-        # when all pending overlapped operations have been completed
-        try:
-            _null = DEVICE.query('*OPC?',) 
-        except:
-            logger.debug('Operation Complete query timeout')
-            pass   
 
     else:
         logger.warning("No response from " + ipaddr.replace("\n","") )
@@ -1279,7 +2672,7 @@ Operation Complete exception: " + _null.replace('\n','') )
     DEVICE.close()
 
 
-    return
+    return replies
 
 # ———————————————————————————————————————————————————
 #              OVERVIEW
@@ -1292,16 +2685,15 @@ def overview():
     _file = 'Overview'
     _ext = 'PNG'
     
-    commonsettings()
+    # Define the Digital TV Overview measurement type and ask if the
+    # ETL is currently connected to the GPS receiver, in the same batch
+    # as the common settings.
+    replies = commonsettings('CONF:DTV:MEAS OVER', 'SYST:POS:GPS:CONN?')
     DEVICE.open()
-
-    # Define the Digital TV Overview measurement type:
-    DEVICE.write('CONF:DTV:MEAS OVER',)
     logger.debug('Requested Overview')
    
-    # currently connected to the GPS receiver?
     try:
-        _gps = int(DEVICE.query('SYST:POS:GPS:CONN?',))
+        _gps = int(replies[0])
         if _gps == 1 :    
             # Displays GPS data in the Overview measurement.
             DEVICE.write('DISP:MEAS:OVER:GPS:STAT ON',)
@@ -1314,15 +2706,6 @@ ETL may not be in "TV/Radio Analyzer" mode.'
         logger.debug(_entryError)
         pass
 
-
-    # Operation complete query. Returns an ASCII "+1" 
-    # when all pending overlapped operations have been completed
-    try:
-        _null = DEVICE.query('*OPC?',) 
-    except:
-        logger.debug('Operation Complete query timeout')
-        pass   
-    
     DEVICE.close()
     
     return
@@ -1338,42 +2721,18 @@ def spectrum() :
     _file = 'Spectrum'
     _ext = 'PNG'
 
-    commonsettings()
+    # Define the Digital TV Spectrum measurement type and activate
+    # shoulder attenuation measurement in Spectrum measurement, in the
+    # same batch as the common settings:
     
-    DEVICE.open()
-
-    # Define the Digital TV Spectrum measurement type:
+    commonsettings('CONF:DTV:MEAS DSP', 'CONF:DTV:MEAS:SATT ON')
     
-    DEVICE.write('CONF:DTV:MEAS DSP',)
+    DEVICE.open()
     logger.debug('Requested Spectrum')  
-    # Operation complete query. Returns an ASCII "+1"
-    # when all pending overlapped operations have been completed
-    try:
-        _null = DEVICE.query('*OPC?',)
-    except:
-        logger.debug\
-            ('Operation Complete Query for setting Spectrum failed')
-        DEVICE.close()
-        time.sleep(1)
-        DEVICE.open()
-        pass
+    logger.debug('Requested shoulder attenuation measurement')  
     # span  
     #DEVICE.write('FREQ:SPAN 10MHz')   
-    # Operation complete query. Returns an ASCII "+1"
-    # when all pending overlapped operations have been completed
-    #_null = DEVICE.query('*OPC?',) 
-    
-    # Activates shoulder attenuation measurement in Spectrum measurement.
-    DEVICE.write('CONF:DTV:MEAS:SATT ON',)
-    logger.debug('Requested shoulder attenuation measurement')  
     #DEVICE.write('CONF:DTV:MEAS:SATT *RST')
-    try:
-        _null = DEVICE.query('*OPC?',)
-    except:
-        logger.debug\
-            ('Operation Complete Query for setting shoulder attenuation \
-measurement failed')
-        pass
     
     # Returns the number of defined ranges.
     #NoOfRanges = DEVICE.query('ESP:RANG:COUNt?')
@@ -1406,21 +2765,11 @@ def ConstDiagram() :
     _file = 'Constellation'
     _ext = 'PNG'
     
-    commonsettings()
+    # Define the Digital TV measurement type, in the same batch as the
+    # common settings:
+    commonsettings('CONF:DTV:MEAS CONS')
     DEVICE.open()
-
-    # Define the Digital TV measurement type:
-    DEVICE.write('CONF:DTV:MEAS CONS',)
     logger.debug('Requested Constellation Diagram')
-    
-    # Operation complete query. Returns an ASCII "+1" when all pending
-    # overlapped operations have been completed
-    try:
-        _null = DEVICE.query('*OPC?',)
-    except:
-        logger.debug('Operation Complete Query for Constellation failed')
-        pass
- 
 
     DEVICE.close()
     
@@ -1437,22 +2786,11 @@ def ModulationErrors() :
     _file = 'MER'
     _ext = 'PNG'
     
-    commonsettings()
+    # Define the Digital TV measurement type, in the same batch as the
+    # common settings:
+    commonsettings('CONF:DTV:MEAS MERR')
     DEVICE.open()
-
-    # Define the Digital TV Modulation Errors measurement type:
-    DEVICE.write('CONF:DTV:MEAS MERR',)
     logger.debug('Requested Modulation Errors')
-    
-    # Operation complete query. Returns an ASCII "+1" when all pending 
-    # overlapped operations have been completed
-    try:
-        _null = DEVICE.query('*OPC?',)
-    except:
-        logger.debug\
-            ('Operation Complete Query for Modulation Errors failed')
-        pass
-
 
     DEVICE.close()
     
@@ -1469,20 +2807,11 @@ def EyeDiagram() :
     _file = 'Eye'
     _ext = 'PNG'
     
-    commonsettings()
+    # Define the Digital TV measurement type, in the same batch as the
+    # common settings:
+    commonsettings('CONF:DTV:MEAS EYED')
     DEVICE.open()
-
-    # Define the Digital TV measurement type:
-    DEVICE.write('CONF:DTV:MEAS EYED',)
     logger.debug('Requested Eye Diagram')
-    
-    # Operation complete query. Returns an ASCII "+1" when all pending 
-    # overlapped operations have been completed
-    try:
-        _null = DEVICE.query('*OPC?',) 
-    except:
-        logger.debug('Operation Complete query timeout')
-        pass    
 
     DEVICE.close()
     
@@ -1499,21 +2828,11 @@ def EchoPattern() :
     _file = 'Echo'
     _ext = 'PNG'
     
-    commonsettings()
+    # Define the Digital TV measurement type, in the same batch as the
+    # common settings:
+    commonsettings('CONF:DTV:MEAS EPATtern')
     DEVICE.open()
-
-    # Define the Digital TV measurement type:
-    DEVICE.write('CONF:DTV:MEAS EPATtern',)
     logger.debug('Requested Echo Pattern')
-    
-    # Operation complete query. Returns an ASCII "+1" when all
-    # pending overlapped operations have been completed
-    try:
-        _null = DEVICE.query('*OPC?',)
-    except:
-        logger.debug('Operation Complete Query for Echo Pattern failed')
-        pass
- 
 
     DEVICE.close()
     
@@ -1523,51 +2842,391 @@ def EchoPattern() :
 #              WAIT FOR DEMOD TO LOCK
 # ———————————————————————————————————————————————————
 
-def waitforlock() :
-    logger.debug('Wait for demod to lock')
+# Seconds to wait for the demodulator to lock. The INI file can set it
+# per measurement (the _file name), for example:
+#   [LockTimeouts]
+#   Overview = 15
+#   Constellation = 8
+# fsCapture_locktimes.csv (below) shows how long each one takes.
+LOCK_TIMEOUT_DEFAULT = 10
+LOCK_POLL_FIRST = 0.05  # First SYNC? poll interval in seconds
+LOCK_POLL_MAX = 0.5     # Longest SYNC? poll interval in seconds
+LOCK_STATS_FILE = 'fsCapture_locktimes.csv'  # In LOG_PATH
+
+# Site (callsign_MEASPT) -> list of (measurement, seconds to lock or None
+# if it timed out)
+lock_stats = {}
+
+def lock_timeout(measurement) :
+    try:
+        return float(config.get('LockTimeouts', measurement))
+    except:
+        return LOCK_TIMEOUT_DEFAULT
+
+def record_lock_time(measurement, seconds, polls) :
+    # Keep time-to-lock per site and append it to LOCK_STATS_FILE, so
+    # weak-signal sites (timeouts) can be told apart from slow
+    # acquisition (long lock times) across many visits.
+    site = _callsign + '_' + _MEASPT
+    lock_stats.setdefault(site, []).append((measurement, seconds))
+    try:
+        stats_file = os.path.join(LOG_PATH, LOCK_STATS_FILE)
+        new_file = not os.path.exists(stats_file)
+        with open(stats_file, 'a') as f :
+            if new_file :
+                f.write('Time,Callsign,MeasPt,Test,Channel,Measurement,'\
+                    'Locked,Seconds,Polls\n')
+            f.write(','.join([datetime.datetime.now().strftime(\
+                '%Y-%m-%d %H:%M:%S'), _callsign, _MEASPT, _testposition, \
+                str(_channel), measurement, '0' if seconds is None else '1', \
+                '' if seconds is None else '%.3f' % seconds, str(polls)]) + \
+                '\n')
+    except OSError:
+        logger.debug('Could not write ' + LOCK_STATS_FILE)
+
+def lock_report() :
+    # Time-to-lock summary for the current site
+    site = _callsign + '_' + _MEASPT
+    results = lock_stats.get(site, [])
+    if not results :
+        return site + ': no lock attempts'
+    times = sorted(t for m, t in results if t is not None)
+    report = site + ': ' + str(len(results)) + ' lock attempt(s), ' + \
+        str(len(results) - len(times)) + ' timed out'
+    if times :
+        report += ', median ' + str(round(times[len(times) // 2], 2)) + \
+            ' s, max ' + str(round(times[-1], 2)) + ' s'
+    return report
+
+@timed('waitforlock')
+def waitforlock(timeout=None) :
+    # Poll CALC:DTV:RES:DEM:SYNC? until the demodulator is synchronized
+    # or the timeout for this measurement passes. The poll interval
+    # starts short and grows, so a quick lock is seen quickly without
+    # flooding the ETL while it is still acquiring.
+    #  0 = not synchronized
+    #  1 = synchronized
+    global lockTimeOut
+    measurement = _file
+    if timeout is None :
+        timeout = lock_timeout(measurement)
+    logger.debug('Wait for demod to lock (' + measurement + ', up to ' + \
+        str(timeout) + ' s)')
     DEVICE.open()
     _locked = 0
     _lockedcount = 0
-    while _locked == 0 :
-    # Queries if TV signal is available and locked.
-    #  0 = not synchronized
-    #  1 = synchronized
+    interval = LOCK_POLL_FIRST
+    started = time.perf_counter()
+    deadline = started + timeout
+    while True :
         try:
             _locked = int( DEVICE.query('CALC:DTV:RES:DEM:SYNC?',) )
         except:
             logger.debug('Locked query failed')
             pass
+        _lockedcount += 1  # Increment by 1 after each query
+        if _locked == 1 :
+            break
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 :
+            break
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 1.5, LOCK_POLL_MAX)
+    elapsed = time.perf_counter() - started
+    DEVICE.close()
+
+    if _locked == 1 :
+        lockTimeOut = 0  # Did not time out
+        record_lock_time(measurement, elapsed, _lockedcount)
+        logger.debug("Locked after " + str(round(elapsed, 2)) + " s, " + \
+            str(_lockedcount) + " queries")
+    else:
+        lockTimeOut = 1  # Time out
+        record_lock_time(measurement, None, _lockedcount)
+        logger.info('No lock after ' + str(round(elapsed, 1)) + ' s (' + \
+            measurement + ')')
+# ———————————————————————————————————————————————————
+#              WAIT FOR DISPLAY TO SETTLE
+# ———————————————————————————————————————————————————
+# Capture Screen Shots used to wait a fixed 5 seconds before every
+# hardcopy. waitforsettle() reads the DTV results instead and returns as
+# soon as the last SETTLE_COUNT readings of each agree within
+# SETTLE_TOLERANCE, after at least SETTLE_MIN seconds (one display
+# update). It never waits longer than the maximum for the measurement,
+# which defaults to the old 5 seconds and can be overridden in the INI
+# file, for example:
+#   [SettleTimeouts]
+#   Spectrum = 3
+
+# DTV result queries of the TV/Radio Analyzer
+DTV_RESULTS = {
+    'Level': 'CALC:DTV:RES:LEV?',       # RF level, dBuV
+    'MER': 'CALC:DTV:RES:MERR:RMS?',    # Modulation error ratio, dB
+    'MERPeak': 'CALC:DTV:RES:MERR:PEAK?',
+    'EVM': 'CALC:DTV:RES:EVM:RMS?',     # Error vector magnitude, %
+    'EVMPeak': 'CALC:DTV:RES:EVM:PEAK?',
+    'Pilot': 'CALC:DTV:RES:PIL?',       # Pilot level, dB
+    'Sync': 'CALC:DTV:RES:DEM:SYNC?',   # 1 = demodulator synchronized
+    }
+
+# Readings watched per measurement (_file name)
+SETTLE_READINGS = {'Spectrum': ('Level',)}
+SETTLE_READINGS_DEFAULT = ('Level', 'MER')
+SETTLE_TOLERANCE = {'Level': 0.5, 'MER': 0.5}  # dB
+SETTLE_COUNT = 3        # Readings that must agree
+SETTLE_MIN = 1.0        # Seconds before the display can count as settled
+SETTLE_MAX_DEFAULT = 5  # Seconds; the old fixed wait
+SETTLE_INTERVAL = 0.25  # Seconds between readings
+
+settle_times = {}  # Measurement -> list of seconds waited
+
+def settle_timeout(measurement) :
+    try:
+        return float(config.get('SettleTimeouts', measurement))
+    except:
+        return SETTLE_MAX_DEFAULT
+
+def read_results(names) :
+    # Query DTV results in one message. Returns {name: float}; a reading
+    # that could not be read is left out.
+    batch = SCPIBatch('Read results')
+    for name in names :
+        batch.query(DTV_RESULTS[name])
+    results = {}
+    try:
+        for name, reply in zip(names, batch.send()) :
+            try:
+                results[name] = float(reply)
+            except ValueError:
+                pass
+    except:
+        logger.debug('Query for ' + ', '.join(names) + ' failed')
+    return results
+
+def waitforsettle(max_wait=None) :
+    # Returns True if the readings settled, False if the maximum wait
+    # passed first.
+    measurement = _file
+    names = SETTLE_READINGS.get(measurement, SETTLE_READINGS_DEFAULT)
+    if max_wait is None :
+        max_wait = settle_timeout(measurement)
+    started = time.perf_counter()
+    deadline = started + max_wait
+    history = {name : [] for name in names}
+    settled = False
+    DEVICE.open()
+    while True :
+        for name, value in read_results(names).items() :
+            history[name] = (history[name] + [value])[-SETTLE_COUNT:]
+        elapsed = time.perf_counter() - started
+        settled = elapsed >= SETTLE_MIN and all( \
+            len(values) == SETTLE_COUNT and \
+            max(values) - min(values) <= SETTLE_TOLERANCE.get(name, 0.5) \
+            for name, values in history.items())
+        remaining = deadline - time.perf_counter()
+        if settled or remaining <= 0 :
+            break
+        time.sleep(min(SETTLE_INTERVAL, remaining))
+    DEVICE.close()
+    elapsed = time.perf_counter() - started
+    settle_times.setdefault(measurement, []).append(elapsed)
+    if settled :
+        logger.debug(measurement + ' settled after ' + \
+            str(round(elapsed, 2)) + ' s')
+    else:
+        logger.debug(measurement + ' did not settle in ' + \
+            str(max_wait) + ' s; capturing anyway')
+    return settled
 
-        #logger.debug('Locked status ' + str(_locked) )
-        # Operation complete query. Returns an ASCII "+1" when all
-        # pending overlapped operations have been completed        
+def settle_report() :
+    return '; '.join(m + ' ' + str(round(sum(t) / len(t), 1)) + ' s' \
+        for m, t in settle_times.items()) or 'none'
+
+# ———————————————————————————————————————————————————
+#              HOST FILE TRANSFER
+# ———————————————————————————————————————————————————
+# With _hardcopy_dest = HOST the ETL renders the hardcopy (or exports
+# the measure log) to a scratch file on its own drive, and
+# MMEM:DATA? '<file>' returns it as an IEEE 488.2 definite-length block:
+#   #<n><length, n digits><length bytes of data>
+# The block is read in TRANSFER_CHUNK pieces and each piece is handed,
+# as read, to a background thread that writes it to the host-side
+# results tree and then checks the size. The next measurement can start
+# while the file is still being written. No network share is needed.
+
+HOST_SCRATCH = 'C:\\R_S\\instr\\user\\fsCapture_transfer'  # + .<ext>
+TRANSFER_CHUNK = 65536
+FILE_SIGNATURES = {'PNG': b'\x89PNG\r\n\x1a\n'}
+
+_transfer_pool = None  # ThreadPoolExecutor, created on first transfer
+_transfers = []        # Futures of transfers not yet checked
+
+def host_result_path(filename) :
+    # Host-side copy of <callsign>\<date>_<callsign>_<MEASPT>\<test>\
+    _YYYYMMDD = datetime.datetime.now().strftime('%Y%m%d')
+    folder = os.path.join(_host_results_folder, _callsign, \
+        _YYYYMMDD+"_"+_callsign+"_"+_MEASPT, _testposition)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, filename)
+
+def read_block_length() :
+    # Read '#<n><length>' and return length
+    head = DEVICE.read_bytes(2)
+    if head[:1] != b'#' or not head[1:2].isdigit() :
+        raise ValueError('Not a binary block: ' + repr(head))
+    digits = int(head[1:2])
+    if digits == 0 :
+        raise ValueError('Indefinite-length blocks are not supported')
+    return int(DEVICE.read_bytes(digits))
+
+def read_block_end() :
+    # The ETL ends the reply with a newline after the block. Only wait
+    # briefly for it; the lock keeps other threads from sending a command
+    # with the short timeout.
+    with DEVICE.lock :
+        visa_timeout = DEVICE.timeout
+        DEVICE.timeout = 200
         try:
-            _null = DEVICE.query('*OPC?',)
+            DEVICE.read_bytes(1)
         except:
-            logger.debug\
-                ('Operation Complete Query for Locked Query failed')
-            pass 
+            pass
+        finally:
+            DEVICE.timeout = visa_timeout
+
+def _write_transfer(chunks, host_file, length, ext) :
+    # Background thread: write chunks from the queue until None, then
+    # check the file. Returns True if it is complete.
+    written = 0
+    with open(host_file + '.part', 'wb') as f :
+        while True :
+            chunk = chunks.get()
+            if chunk is None :
+                break
+            written += f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    if written != length :
+        logger.warning('!!! Transfer of ' + os.path.basename(host_file) + \
+            ' incomplete: ' + str(written) + ' of ' + str(length) + \
+            ' bytes !!!')
+        return False
+    with open(host_file + '.part', 'rb') as f :
+        signature = FILE_SIGNATURES.get(ext.upper(), b'')
+        if f.read(len(signature)) != signature :
+            logger.warning('!!! ' + os.path.basename(host_file) + \
+                ' is not a valid ' + ext + ' file !!!')
+            return False
+    os.replace(host_file + '.part', host_file)
+    logger.warning('Exported to host ' + host_file + ' (' + \
+        str(length) + ' bytes)')
+    return True
+
+def fetch_file(instrument_file, host_file, ext) :
+    # Read instrument_file over the link and write it to host_file in the
+    # background. Returns the Future of the background write.
+    import concurrent.futures
+    import queue
+    global _transfer_pool
+    if _transfer_pool is None :
+        _transfer_pool = concurrent.futures.ThreadPoolExecutor(\
+            max_workers=2, thread_name_prefix='transfer')
+    with DEVICE.lock :  # The command and its whole reply
+        DEVICE.write("MMEM:DATA? \'" + instrument_file + "\'")
+        length = read_block_length()
+        chunks = queue.Queue()
+        future = _transfer_pool.submit(_write_transfer, chunks, host_file, \
+            length, ext)
+        remaining = length
+        try:
+            while remaining > 0 :
+                chunk = DEVICE.read_bytes(min(TRANSFER_CHUNK, remaining), \
+                    break_on_termchar=False)
+                chunks.put(chunk)
+                remaining -= len(chunk)
+        finally:
+            chunks.put(None)  # Let the writer finish, even after an error
+        read_block_end()
+    _transfers.append(future)
+    return future
+
+def wait_for_transfers() :
+    # Wait for background writes; returns the number that failed
+    failed = 0
+    while _transfers :
+        try:
+            if not _transfers.pop(0).result() :
+                failed += 1
+        except Exception as e:
+            logger.warning('!!! Transfer failed: ' + str(e) + ' !!!')
+            failed += 1
+    return failed
+
+# ———————————————————————————————————————————————————
+#              DIRECTORY CACHE
+# ———————————————————————————————————————————————————
+# Every saved file needs the callsign, date/site and test-position folders
+# on the ETL, but they only change when the callsign, measuring point or
+# test position does. Folders are remembered once the batch that created
+# them has been sent, and MMEM:MDIR is only sent for folders not seen
+# before. The cache is cleared when the callsign, _MEASPT, _testposition
+# or the ETL address changes.
+
+_known_dirs = set()
+_known_dirs_key = None
+dir_cache_hits = 0
+dir_cache_misses = 0
+
+def result_dirs(_YYYYMMDD) :
+    # The three folders holding a result file, outermost first
+    return [_meas_results_folder + "\\" + _callsign,
+        _meas_results_folder + "\\" + _callsign + "\\" + _YYYYMMDD + "_" + \
+            _callsign + "_" + _MEASPT,
+        _meas_results_folder + "\\" + _callsign + "\\" + _YYYYMMDD + "_" + \
+            _callsign + "_" + _MEASPT + "\\" + _testposition]
+
+def make_dirs(batch, folders) :
+    # Add MMEM:MDIR to batch for each folder not already created.
+    # Returns the new folders; pass them to dirs_created() once the batch
+    # has been sent.
+    global _known_dirs_key, dir_cache_hits, dir_cache_misses
+    key = (ipaddr, _callsign, _MEASPT, _testposition)
+    if key != _known_dirs_key :
+        if _known_dirs :
+            logger.debug('Directory cache cleared')
+        _known_dirs.clear()
+        _known_dirs_key = key
+    new = []
+    for folder in folders :
+        if folder.upper() in _known_dirs :
+            dir_cache_hits += 1
+        else:
+            dir_cache_misses += 1
+            batch.write("MMEM:MDIR \'" + folder + "\'")
+            new.append(folder)
+    return new
+
+def dirs_created(folders) :
+    _known_dirs.update(folder.upper() for folder in folders)
+
+def dir_cache_report() :
+    lookups = dir_cache_hits + dir_cache_misses
+    if not lookups :
+        return 'none'
+    return str(dir_cache_hits) + ' of ' + str(lookups) + \
+        ' MMEM:MDIR skipped (' + str(round(100 * dir_cache_hits / lookups)) +\
+        '% hit rate)'
 
-        _lockedcount += 1  # Increment by 1 after each query
-        #logger.debug("Locked count ="+ str(_lockedcount))
-        global lockTimeOut
-        lockTimeOut = 0  # Did not time out
-        if _lockedcount >= 1200 : 
-            #Fail to lock after 300 queries (approx 3 sec.)
-            lockTimeOut = 1  # Time out
-            DEVICE.close()
-            return      
-    DEVICE.close()
-    logger.debug("Locked count ="+ str(_lockedcount) +\
-        " (approx 10 msec/count)")       
 # ———————————————————————————————————————————————————
 #              PRINT TO FILE
 # ———————————————————————————————————————————————————
     
+@timed('PrintToFile')
 def PrintToFile() :
     global _file
     global _ext
     global _meas_results_folder
+    global last_saved
+    last_saved = None  # File name once saved (or its transfer started)
 
     logger.debug('Print ' + _file + ' to file')
 # Typical file name:
@@ -1591,12 +3250,16 @@ def PrintToFile() :
 
     if (ping(ipaddr)) :
         DEVICE.open()
-        # Create directories
-        DEVICE.write("MMEM:MDIR \'" + _meas_results_folder + "\\"+\
-            _callsign+"\'",)
-        DEVICE.write("MMEM:MDIR \'" + _meas_results_folder + "\\"+\
-            _callsign+"\\"+_YYYYMMDD+"_"+_callsign+"_"+_MEASPT+"\'",)
-        DEVICE.write("MMEM:MDIR \'"+_FILEPATH+"\'",)
+        # Everything below goes to the ETL as one program message
+        hardcopy = SCPIBatch('Hardcopy')
+        if _hardcopy_dest == 'HOST' :
+            # Render to a scratch file, then read it back (see
+            # fetch_file())
+            _INSTFILE = HOST_SCRATCH + "." + _ext
+        else:
+            _INSTFILE = _FILEPATH+"\\"+_FILENAME
+            # Create directories
+            new_dirs = make_dirs(hardcopy, result_dirs(_YYYYMMDD))
 
         logger.debug(_FILEPATH+"\\"+_FILENAME)
         
@@ -1607,49 +3270,60 @@ def PrintToFile() :
         #  2 — optimized color set
         #  3 — user defined color set
         #  4 — current screen colors without any changes
-        DEVICE.write('HCOP:CMAP:DEF4',)
+        hardcopy.write('HCOP:CMAP:DEF4')
 
         # Set the data format of the printout to PNG.
-        DEVICE.write('HCOP:DEV:LANG '+_ext,)
+        hardcopy.write('HCOP:DEV:LANG '+_ext)
         
         # color (not monochrome) hardcopy of the screen.
-        DEVICE.write('HCOP:DEV:COL ON',)
+        hardcopy.write('HCOP:DEV:COL ON')
         
         # Directs the hardcopy to a file.
-        DEVICE.write("HCOP:DEST 'MMEM'",)
+        hardcopy.write("HCOP:DEST 'MMEM'")
         
+        if _hardcopy_dest == 'HOST' :
+            # Delete the last screen shot, so that a hardcopy that fails
+            # cannot leave it to be read back under the new name
+            hardcopy.write("MMEM:DEL \'"+_INSTFILE+"\'")
+
         #Selects the file name.
-        DEVICE.write("MMEM:NAME \'"+_FILEPATH+"\\"+_FILENAME+"\'",)
+        hardcopy.write("MMEM:NAME \'"+_INSTFILE+"\'")
         
         # comment text for the printout.
-        DEVICE.write("HCOP:ITEM:WIND:TEXT \'" + _callsign + \
+        hardcopy.write("HCOP:ITEM:WIND:TEXT \'" + _callsign + \
             "   Measuring Location: " + _MEASPT + "   Test: " +\
-                 _testposition + "\'",)
+                 _testposition + "\'")
         
-        # Operation complete query. Returns an ASCII "+1" when all
-        # pending overlapped operations have been completed
-        try:
-            _null = DEVICE.query('*OPC?',)
-        except:
-            logger.debug\
-                ('Operation Complete Query for creating directories failed')
-            pass
-        
-        # Saves the hardcopy output into the file
+        # Saves the hardcopy output into the file once the settings are
+        # complete.
+        hardcopy.write('*WAI').write('HCOP')
+        if _hardcopy_dest == 'HOST' :
+            try:
+                logger.debug('Exporting ' + _file +' to host')
+                with METRICS.phase('PrintToFile.hardcopy') :
+                    hardcopy.send()
+                if not hardcopy.complete :
+                    raise IOError('Hardcopy not complete')
+                fetch_file(_INSTFILE, host_result_path(_FILENAME), _ext)
+                last_saved = _FILENAME
+            except:
+                logger.warning('!!! Failed to transfer ' + _file + ' to ' +\
+                    _FILENAME + ' !!!')
+            DEVICE.close()
+            _file = 'SetByUser'
+            _ext = 'PNG'
+            return
+        # List the file. The ETL does not answer MMEM:CAT? for a file
+        # that does not exist, so a timeout here means the hardcopy was
+        # not saved.
+        hardcopy.write('*WAI')
+        hardcopy.query("MMEM:CAT? \'"+_FILEPATH+"\\"+_FILENAME+"\'")
         try:
             logger.debug('Exporting ' + _file +' to ' + _FILENAME )
-            DEVICE.write('HCOP',)
-        except:
-            logger.warning('Save to file failed')
-        try:
-            _null = DEVICE.query('*OPC?',)
-        except:
-            logger.debug\
-                ('Operation Complete Query for saving hardcopy to file failed')
-            pass
-        try:
-            dir_list = DEVICE.query("MMEM:CAT? \'"+_FILEPATH+"\\"+_FILENAME+\
-                "\'")
+            with METRICS.phase('PrintToFile.hardcopy') :
+                dir_list = hardcopy.send()[0]
+            dirs_created(new_dirs)  # The file was listed, so they exist
+            last_saved = _FILENAME
             logger.warning('Exported ' + _file +' to ' + \
                 dir_list.replace('\n',''))
         except:
@@ -1670,66 +3344,69 @@ def PrintToFile() :
 # ———————————————————————————————————————————————————
 
 
-def CaptureScreenShots() :
-    
-    
-    overview()
-    waitforlock()
-    # Wait for 5 seconds
-    time.sleep(5)
-    PrintToFile()  # Even if there is no lock, capture
-    
-    spectrum()
-    # Wait for 5 seconds
-    time.sleep(5)
-    PrintToFile()
-    
-    ConstDiagram()
-    waitforlock()
-    if lockTimeOut == 0 : # 0 means demod is locked
-        # Wait for 5 seconds
-        time.sleep(5)
-        PrintToFile()
-    else:
-        logger.warning("No Lock. Did NOT capture "+_file+".")
-    
-    ModulationErrors()
-    waitforlock()
-    if lockTimeOut == 0 : # 0 means demod is locked
-        # Wait for 5 seconds
-        time.sleep(5)
-        PrintToFile()
-    else:
-        logger.warning("No Lock. Did NOT capture "+_file+".")
-    
-    EyeDiagram()
-    waitforlock()
-    if lockTimeOut == 0 : # 0 means demod is locked
-        # Wait for 5 seconds
-        time.sleep(5)
-        PrintToFile()
+# The measurements in capture order:
+#   (name, function, wait for lock, capture only if locked)
+CAPTURE_SEQUENCE = [
+    ('Overview', overview, True, False),
+    ('Spectrum', spectrum, False, False),
+    ('Constellation', ConstDiagram, True, True),
+    ('MER', ModulationErrors, True, True),
+    ('Eye', EyeDiagram, True, True),
+    ('Echo', EchoPattern, True, True)]
+
+def capture(name) :
+    # Set up one measurement of CAPTURE_SEQUENCE and save a screen shot.
+    # Returns the file name, or None if nothing was saved.
+    global last_saved
+    last_saved = None
+    for measurement, function, lock, lock_required in CAPTURE_SEQUENCE :
+        if measurement == name :
+            break
     else:
-        logger.warning("No Lock. Did NOT capture "+_file+".")
+        raise ValueError('Unknown measurement ' + name)
+    function()
+    if lock :
+        waitforlock()
+        if lock_required and lockTimeOut != 0 : # 0 means demod is locked
+            logger.warning("No Lock. Did NOT capture "+_file+".")
+            return None
+    # Wait for the display to settle
+    waitforsettle()
+    PrintToFile()  # Overview is captured even if there is no lock
+    saved = last_saved
+    if name in CAPTURE_DATA :
+        CAPTURE_DATA[name](saved)
+    last_saved = saved
+    return last_saved
+
+def CaptureScreenShots() :
     
-    EchoPattern()
-    waitforlock()
-    if lockTimeOut == 0 : # 0 means demod is locked
-        # Wait for 5 seconds
-        time.sleep(5)
-        PrintToFile()
-    else:
-        logger.warning("No Lock. Did NOT capture "+_file+".")
+    setups = DEVICE.connect_count
+    for measurement in CAPTURE_SEQUENCE :
+        capture(measurement[0])
     
+    if wait_for_transfers() :
+        logger.warning('!!! Some screen shots were not transferred !!!')
+    logger.info('Capture Screen Shots: ' + \
+        str(DEVICE.connect_count - setups) + ' link setup(s). Session: ' + \
+        DEVICE.stats())
+    logger.info('Operation complete times: ' + opc_report())
+    logger.info('Time to lock: ' + lock_report())
+    logger.info('Average wait for display to settle: ' + settle_report())
+    logger.info('Directory cache: ' + dir_cache_report())
     return 
 
 # ———————————————————————————————————————————————————
 #              MEASURE LOG
 # ———————————————————————————————————————————————————
 
+@timed('MeasureLog')
 def MeasureLog() :
     
     logger.debug('Begin MeasureLog')
     global tdelta
+    global last_saved
+    last_saved = None
     try:
         DEVICE.open()
         try:
@@ -1746,8 +3423,10 @@ def MeasureLog() :
             pass
     
         try:
-            ETLdatetime = str(datetime.datetime.strptime(ETLdate + ' ' + \
-                ETLtime,'%Y,%m,%d\n %H,%M,%S\n'))
+            # The session keeps read_termination '\n', so replies no
+            # longer carry a trailing newline.
+            ETLdatetime = str(datetime.datetime.strptime(ETLdate.strip() + \
+                ' ' + ETLtime.strip(),'%Y,%m,%d %H,%M,%S'))
             logger.debug('ETL date time is '+ ETLdatetime)
             tdelta = datetime.datetime.strptime(ETLdatetime,'%Y-%m-%d %X').\
                 timestamp() - datetime.datetime.now().timestamp()
@@ -1775,20 +3454,10 @@ def MeasureLog() :
             DEVICE.write('DISP:MEAS:OVER:GPS:STAT ON',)
             # Activate measurement log. The overall performance of R&S
             # DEVICE is slightly affected if the measurement log is 
-            # activated.
-            DEVICE.write('CONF:MLOG ON',)
-            
-            # Operation complete query. Returns an ASCII "+1" when all
-            # pending overlapped operations have been completed
-            _null = '0'
-            try:
-                _null = DEVICE.query('*OPC?',)
-            except:
-                logger.debug\
-                    ('Operation Complete Query for Measure Log failed')
-                pass
+            # activated. Wait for Operation Complete.
+            _complete = opc_write('CONF:MLOG ON', 'Measure log on')
             logger.debug('Measure log activated — operation complete? ' + \
-                _null.replace('\n','') )
+                str(_complete) )
             DEVICE.close()  
             
             # Switch to Overview 
@@ -1813,7 +3482,10 @@ def MeasureLog() :
             How many seconds?
             Strike ENTER key to end now.""")
             mTimer = 0
-            choice = input(inputPrompt + ' >> ')
+            if _mlog_seconds is not None :  # Set by a job file
+                choice = str(_mlog_seconds)
+            else:
+                choice = ask(inputPrompt + ' >> ')
             logger.debug('User entered capture duration of \'' + choice +\
                  '\'')
             if choice == "":
@@ -1825,15 +3497,16 @@ def MeasureLog() :
                 except ValueError:  # choice is not an integer
                     mTimer = 0
             
-            while mTimer > 0 :
+            with METRICS.phase('MeasureLog.capture') :
+                while mTimer > 0 :
 
-                mins, secs = divmod(mTimer, 60)
-                timeformat = '{:02d}:{:02d}'.format(mins, secs)
-                print(datetime.datetime.now().strftime(FMT) + \
-                    " Capture will end in "+ timeformat, end='\r', )
+                    mins, secs = divmod(mTimer, 60)
+                    timeformat = '{:02d}:{:02d}'.format(mins, secs)
+                    print(datetime.datetime.now().strftime(FMT) + \
+                        " Capture will end in "+ timeformat, end='\r', )
 
-                time.sleep(1) # Wait for 1 secondw
-                mTimer -= 1  # Decrement by 1 
+                    time.sleep(1) # Wait for 1 secondw
+                    mTimer -= 1  # Decrement by 1 
         
             # string with the syntax DD.MM.YYYY,HH:MM:SS
             # The stop time within the measurement log until which the
@@ -1855,45 +3528,55 @@ def MeasureLog() :
                 +_YYYYMMDD+"_"+_HHMMSS+"_"+_file+"."+_ext
             
             DEVICE.open()
-            # Create directories
-            DEVICE.write("MMEM:MDIR \'" + _meas_results_folder + "\\"\
-                +_callsign+"\'",)
-            DEVICE.write("MMEM:MDIR \'" + _meas_results_folder + "\\"\
-                +_callsign+"\\"+_YYYYMMDD+"_"+_callsign+"_"+_MEASPT+"\'",)
-            DEVICE.write("MMEM:MDIR \'"+_FILEPATH+"\'",)
+            # Everything below goes to the ETL as one program message
+            export = SCPIBatch('Export measure log')
+            if _hardcopy_dest == 'HOST' :
+                # Export to a scratch file, then read it back. Delete the
+                # last one first, or MMEM:CAT? below would list it even if
+                # this export failed.
+                _INSTFILE = HOST_SCRATCH + "." + _ext
+                export.write("MMEM:DEL \'"+_INSTFILE+"\'")
+            else:
+                _INSTFILE = _FILEPATH+"\\"+_FILENAME
+                # Create directories
+                new_dirs = make_dirs(export, result_dirs(_YYYYMMDD))
             
             # export all available measurement values to a comma separated
             # values (.csv) file.
             # MMEMory:STORe:MLOG:DATA <StartTime>, <StopTime>, <ComprLev>,
             #   <FileName>
             # Compression level 0: one value is captured each second
-            DEVICE.write('MMEM:STOR:MLOG:DATA \"'+StartTime+'\", \"'\
-                +StopTime+'\", \"0\", \"'+_FILEPATH+'\\'+_FILENAME+'\"',)
+            export.write('MMEM:STOR:MLOG:DATA \"'+StartTime+'\", \"'\
+                +StopTime+'\", \"0\", \"'+_INSTFILE+'\"')
             logger.info('Capture stop time is ' + StopTime )
             # #######################################################
-            _null = '0'
-            try:
-                _null = DEVICE.query('*OPC?',)
-            except:
-                logger.debug('Operation Complete Query for Export to \
-                    CSV failed')
-                pass
 
+            # Once the export is complete, deactivate measurement log (the
+            # overall performance of R&S ETL is slightly affected if the
+            # measurement log is activated) and list the file. The ETL
+            # does not answer MMEM:CAT? for a file that does not exist.
+            export.write('*WAI').write('CONF:MLOG OFF')
+            export.query("MMEM:CAT? \'"+_INSTFILE+"\'")
             try:
-                dir_list = DEVICE.query("MMEM:CAT? \'"+_FILEPATH+"\\"\
-                    +_FILENAME+"\'")
-                logger.warning('Exported ' + _file +' to ' + \
-                    dir_list.replace('\n',''))
+                with METRICS.phase('MeasureLog.export') :
+                    dir_list = export.send(timeout=30)[0]
+                if _hardcopy_dest == 'HOST' :
+                    host_file = host_result_path(_FILENAME)
+                    site = site_metadata()
+                    # Once on the host, convert it to a column store
+                    fetch_file(_INSTFILE, host_file, _ext).add_done_callback(\
+                        lambda transfer : store_mlog(host_file, site, transfer))
+                else:
+                    dirs_created(new_dirs)
+                    logger.warning('Exported ' + _file +' to ' + \
+                        dir_list.replace('\n',''))
+                last_saved = _FILENAME
             except:
                 logger.debug("Failed to save \'"+_FILEPATH+"\\"+_FILENAME\
                     +"\'")
                 logger.warning('!!! Failed to save ' + _file +' to ' + \
                     _FILENAME + ' !!!')
                 pass
-            
-            # Deactivate measurement log. The overall performance of R&S
-            # ETL is slightly affected if the measurement log is activated.
-            DEVICE.write('CONF:MLOG OFF',)
             DEVICE.close()
 
         else:
@@ -1910,6 +3593,399 @@ def MeasureLog() :
     return 
 
 
+# ———————————————————————————————————————————————————
+#              SAMPLE DTV RESULTS
+# ———————————————————————————————————————————————————
+# Measure Log gives one value per second, and only after the CONF:MLOG
+# export at the end. sample_results() instead queries the DTV results
+# directly, SAMPLE_RATE times a second. The samples go into a RingBuffer
+# holding the last SAMPLE_BUFFER of them, and are appended as they come
+# to a CSV file in the host results tree (see host_result_path()):
+#   Time,Level,MER,Pilot,Sync
+# Time is host time in seconds since the epoch. A reading that could not
+# be read is blank in the file and NaN in the buffer.
+
+SAMPLE_RATE = 4          # Samples per second
+SAMPLE_BUFFER = 36000    # Samples kept in memory (2.5 h at 4 per second)
+SAMPLE_FLUSH = 1.0       # Seconds between writes to the file
+SAMPLE_READINGS = ('Level', 'MER', 'Pilot', 'Sync')
+
+sample_buffer = None  # RingBuffer of the last (or current) sampling run
+
+class RingBuffer :
+    # Fixed-size columns of doubles; once full, each new sample
+    # overwrites the oldest
+
+    def __init__(self, columns, size) :
+        self.columns = ('Time',) + tuple(columns)
+        self.size = size
+        self.data = {column : array.array('d', bytes(8 * size)) \
+            for column in self.columns}
+        self.count = 0  # Samples appended since the start
+
+    def __len__(self) :
+        return min(self.count, self.size)
+
+    def append(self, t, values) :
+        i = self.count % self.size
+        self.data['Time'][i] = t
+        for column in self.columns[1:] :
+            self.data[column][i] = values.get(column, math.nan)
+        self.count += 1
+
+    def column(self, name) :
+        # The samples of one column, oldest first
+        data = self.data[name]
+        if self.count <= self.size :
+            return data[:self.count]
+        i = self.count % self.size
+        return data[i:] + data[:i]
+
+    def latest(self) :
+        # {column: value} of the newest sample
+        i = (self.count - 1) % self.size
+        return {column : self.data[column][i] for column in self.columns}
+
+SAMPLE_COLUMNS = [('Time', '<f8'), ('Level', '<f8'), ('MER', '<f8'),
+    ('Pilot', '<f8'), ('Sync', '<i1')]
+SAMPLE_UNITS = {'Time': 's', 'Level': 'dBuV', 'MER': 'dB', 'Pilot': 'dB'}
+
+def site_metadata() :
+    # Site description kept with stored data (see fsData.py)
+    site = {'callsign': _callsign, 'measpt': _MEASPT,
+        'test': _testposition, 'channel': str(_channel)}
+    try:
+        site['frequency'] = float(_frequency)
+    except (TypeError, ValueError):
+        pass
+    try:
+        site['latitude'], site['longitude'] = float(_lat), float(_lon)
+    except (NameError, TypeError, ValueError):
+        pass
+    return site
+
+def open_sample_store(host_file) :
+    # Column store <samples file>.fsd next to the CSV file, or None if
+    # fsData.py is not available
+    try:
+        import fsData
+        return fsData.ColumnStore.create(fsData.store_path(host_file), \
+            SAMPLE_COLUMNS, site_metadata(), SAMPLE_UNITS)
+    except Exception as e:
+        logger.debug('No column store for ' + host_file + ': ' + str(e))
+        return None
+
+def store_mlog(host_file, site, transfer=None) :
+    # Convert a Measure Log CSV on the host to a column store and write
+    # its statistics (needs numpy). transfer is the Future from
+    # fetch_file(); nothing is done if it failed.
+    if transfer is not None and \
+        (transfer.exception() is not None or not transfer.result()) :
+        return
+    try:
+        import fsData
+        store = fsData.convert_mlog(host_file, site)
+        logger.info('Stored ' + str(len(store)) + ' rows in ' + store.path)
+        rows = fsData.stats(store.read(), store.meta['units'])
+        fsData.write_stats(fsData.stats_path(host_file), rows)
+        for row in rows :
+            if row['Samples'] :
+                logger.warning(row['Quantity'] + ' median ' + \
+                    str(round(row['Median'], 1)) + ', L10 ' + \
+                    str(round(row['L10'], 1)) + ', L90 ' + \
+                    str(round(row['L90'], 1)) + ' ' + row['Unit'])
+    except Exception as e:
+        logger.warning('!!! Could not convert ' + host_file + ': ' + \
+            str(e) + ' !!!')
+
+def sample_line(t, values) :
+    return ','.join(['%.3f' % t] + [('%g' % values[name]) if name in \
+        values else '' for name in SAMPLE_READINGS]) + '\n'
+
+def append_samples(store, rows) :
+    # Append rows to the column store; returns empty rows
+    if store is not None :
+        rows['Sync'] = [None if v is None else int(v) for v in rows['Sync']]
+        try:
+            store.append(rows)
+        except OSError as e:
+            logger.warning('!!! Could not write ' + store.path + ': ' + \
+                str(e) + ' !!!')
+    return {name : [] for name in rows}
+
+def sample_results(seconds, rate=SAMPLE_RATE) :
+    global _file, _ext, last_saved, sample_buffer
+    last_saved = None
+    if not rate > 0 :
+        raise ValueError('Sample rate must be more than 0, not ' + str(rate))
+    if not ping(ipaddr) :
+        logger.warning('No response from ' + ipaddr.replace('\n','') )
+        return
+    overview()  # The DTV results are measured in Overview
+    waitforlock()
+    _file = 'samples'
+    _ext = 'CSV'
+    now = datetime.datetime.now()
+    _FILENAME = _callsign+"_"+_MEASPT+"_"+_testposition+"_"+\
+        now.strftime('%Y%m%d')+"_"+now.strftime('%H%M%S')+"_"+_file+"."+_ext
+    # The host folder can be unreachable or read-only; log it and go
+    # back to the menu rather than end the session
+    host_file = _FILENAME
+    try:
+        host_file = host_result_path(_FILENAME)
+        f = open(host_file, 'w')
+    except OSError as e:
+        logger.warning('!!! Could not write ' + host_file + ': ' + str(e) + \
+            ' !!!')
+        _file = 'SetByUser'
+        _ext = 'PNG'
+        return
+    sample_buffer = RingBuffer(SAMPLE_READINGS, SAMPLE_BUFFER)
+    interval = 1.0 / rate
+    logger.info('Sampling ' + ', '.join(SAMPLE_READINGS) + ' ' + \
+        str(rate) + ' times a second for ' + str(seconds) + ' s to ' + \
+        host_file)
+    store = open_sample_store(host_file)
+    with f :
+        f.write(','.join(sample_buffer.columns) + '\n')
+        lines = []
+        rows = {name : [] for name, dtype in SAMPLE_COLUMNS}
+        started = time.perf_counter()
+        next_sample = last_flush = started
+        while time.perf_counter() - started < seconds :
+            t = time.time()
+            values = read_results(SAMPLE_READINGS)
+            sample_buffer.append(t, values)
+            lines.append(sample_line(t, values))
+            rows['Time'].append(t)
+            for name in SAMPLE_READINGS :
+                rows[name].append(values.get(name))
+            if time.perf_counter() - last_flush >= SAMPLE_FLUSH :
+                f.writelines(lines)
+                f.flush()
+                lines = []
+                rows = append_samples(store, rows)
+                last_flush = time.perf_counter()
+                print(datetime.datetime.now().strftime(FMT) + ' ' + \
+                    '  '.join(name + ' ' + ('%g' % values[name]) \
+                    for name in SAMPLE_READINGS if name in values) + \
+                    '   ', end='\r', )
+            next_sample += interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0 :
+                time.sleep(delay)
+            else:
+                next_sample = time.perf_counter()  # Behind; don't catch up
+        f.writelines(lines)
+        append_samples(store, rows)
+    print()  # End the line of live readings
+    elapsed = time.perf_counter() - started
+    logger.warning('Sampled ' + str(sample_buffer.count) + ' times in ' + \
+        str(round(elapsed, 1)) + ' s (' + \
+        str(round(sample_buffer.count / elapsed, 1)) + ' per second) to ' + \
+        host_file)
+    last_saved = _FILENAME
+    _file = 'SetByUser'
+    _ext = 'PNG'
+
+def SampleResults() :
+    # Menu choice: ask how long to sample
+    _input = ask('Sample ' + str(SAMPLE_RATE) + \
+        ' times a second for how many seconds? >> ')
+    try:
+        seconds = int(_input)
+    except ValueError:
+        return
+    sample_results(seconds)
+
+
+# ———————————————————————————————————————————————————
+#              SPECTRUM TRACE
+# ———————————————————————————————————————————————————
+# After the Spectrum screen shot the trace itself is read in binary:
+# FORM REAL,32 makes TRAC:DATA? return an IEEE 488.2 block of float32
+# levels (FORM:BORD SWAP = little-endian), about a fifth the size of the
+# ASCII list. The frequency axis comes from FREQ:STAR? and FREQ:STOP?.
+# The trace is stored next to the screen shot (<screen shot name>.fsd,
+# see fsData.py and data_result_path()), with the channel power and
+# shoulder attenuation computed from it.
+
+TRACE_NAME = 'TRACE1'
+
+def read_trace_block() :
+    # TRAC:DATA? as a REAL,32 block; the format must already be set.
+    # Returns the block bytes and sets the format back to ASCII.
+    with DEVICE.lock :
+        DEVICE.write('TRAC:DATA? ' + TRACE_NAME)
+        try:
+            data = DEVICE.read_bytes(read_block_length(), \
+                break_on_termchar=False)
+            read_block_end()
+        finally:
+            DEVICE.write('FORM ASC')
+    return data
+
+def read_spectrum_trace() :
+    # Returns (start Hz, stop Hz, RBW Hz, block bytes)
+    setup = SCPIBatch('Trace setup')
+    setup.write('FORM REAL,32').write('FORM:BORD SWAP')
+    setup.query('FREQ:STAR?').query('FREQ:STOP?').query('BAND:RES?')
+    start, stop, rbw = [float(reply) for reply in setup.send()]
+    return start, stop, rbw, read_trace_block()
+
+def data_result_path(filename) :
+    # Where data read after a screen shot is stored: next to the screen
+    # shot. In HOST mode that is the host results tree. In MMEM mode the
+    # ETL wrote the screen shot to _meas_results_folder, which is only
+    # used if this PC sees the same path (e.g. Z: is mapped here too).
+    # Returns None if there is nowhere to store it.
+    if _hardcopy_dest == 'HOST' :
+        return host_result_path(filename)
+    if not os.path.isdir(_meas_results_folder) :
+        return None
+    _YYYYMMDD = datetime.datetime.now().strftime('%Y%m%d')
+    folder = result_dirs(_YYYYMMDD)[-1]
+    os.makedirs(folder, exist_ok=True)
+    return folder + "\\" + filename
+
+def data_file_name(screenshot, measurement) :
+    # Host file name (without extension) for data read after a screen
+    # shot: the screen shot's name, or one made the same way
+    if screenshot :
+        return os.path.splitext(screenshot)[0]
+    now = datetime.datetime.now()
+    return _callsign+"_"+_MEASPT+"_"+_testposition+"_"+\
+        now.strftime('%Y%m%d')+"_"+now.strftime('%H%M%S')+"_"+measurement
+
+def save_spectrum_trace(screenshot) :
+    # CAPTURE_DATA for Spectrum; screenshot is its file name (or None)
+    try:
+        import fsData
+    except ImportError:
+        logger.debug('fsData.py not found; spectrum trace not saved')
+        return
+    name = data_file_name(screenshot, 'Spectrum')
+    path = data_result_path(name + fsData.STORE_EXT)
+    if path is None :
+        logger.debug(_meas_results_folder + ' not reachable from this PC; '\
+            'spectrum trace not saved')
+        return
+    try:
+        t0 = time.perf_counter()
+        start, stop, rbw, data = read_spectrum_trace()
+        elapsed = time.perf_counter() - t0
+        freq, level = fsData.trace_from_block(data, start, stop)
+        try:
+            center = float(_frequency)
+        except (TypeError, ValueError):
+            center = (start + stop) / 2
+        site = dict(site_metadata(), rbw=rbw)
+        store, metrics = fsData.save_trace(path, freq, level, center, rbw, \
+            site)
+    except Exception as e:
+        logger.warning('!!! Could not save the spectrum trace: ' + str(e) + \
+            ' !!!')
+        return
+    logger.info('Spectrum trace: ' + str(len(level)) + ' points, ' + \
+        str(len(data)) + ' bytes in ' + str(round(elapsed * 1000)) + \
+        ' ms, saved to ' + store.path)
+    if metrics :
+        logger.warning('Channel power ' + \
+            str(round(metrics['channel_power'], 1)) + ', shoulder ' + \
+            'attenuation lower ' + str(round(metrics['shoulder_lower'], 1)) +\
+            ' dB, upper ' + str(round(metrics['shoulder_upper'], 1)) + ' dB')
+
+
+
+# ———————————————————————————————————————————————————
+#              CONSTELLATION DATA
+# ———————————————————————————————————————————————————
+# After the Constellation screen shot the symbols themselves are read:
+# in the constellation measurement TRAC:DATA? returns I, Q pairs, again
+# as a REAL,32 block. They are stored next to the screen shot
+# (data_result_path(), <screen shot name>.fsd, float32 I and Q columns, 8 bytes a symbol)
+# with MER, EVM and the 8VSB slicer histograms computed on the host
+# (fsData.constellation_metrics()). After the MER screen shot the
+# instrument's own MER and EVM readouts are added to the same store,
+# so the two can be compared.
+
+MER_READINGS = ('MER', 'MERPeak', 'EVM', 'EVMPeak')
+
+last_constellation = None  # Store saved by the last Constellation capture
+
+def read_constellation() :
+    # Returns the block bytes
+    setup = SCPIBatch('Constellation setup')
+    setup.write('FORM REAL,32').write('FORM:BORD SWAP')
+    setup.send()
+    return read_trace_block()
+
+def save_constellation(screenshot) :
+    # CAPTURE_DATA for Constellation
+    global last_constellation
+    last_constellation = None
+    try:
+        import fsData
+    except ImportError:
+        logger.debug('fsData.py not found; constellation not saved')
+        return
+    name = data_file_name(screenshot, 'Constellation')
+    path = data_result_path(name + fsData.STORE_EXT)
+    if path is None :
+        logger.debug(_meas_results_folder + ' not reachable from this PC; '\
+            'constellation not saved')
+        return
+    try:
+        t0 = time.perf_counter()
+        data = read_constellation()
+        elapsed = time.perf_counter() - t0
+        i, q = fsData.symbols_from_block(data)
+        store, metrics = fsData.save_constellation(path, i, q, \
+            site_metadata())
+    except Exception as e:
+        logger.warning('!!! Could not save the constellation: ' + str(e) + \
+            ' !!!')
+        return
+    last_constellation = store
+    logger.info('Constellation: ' + str(len(i)) + ' symbols, ' + \
+        str(len(data)) + ' bytes in ' + str(round(elapsed * 1000)) + \
+        ' ms, saved to ' + store.path)
+    if metrics :
+        logger.warning('Constellation MER ' + str(round(metrics['mer'], 1)) + \
+            ' dB, EVM ' + str(round(metrics['evm'], 2)) + ' %, peak ' + \
+            str(round(metrics['evm_peak'], 2)) + ' %')
+
+def save_mer_readouts(screenshot) :
+    # CAPTURE_DATA for MER: the instrument's readouts, added to the
+    # constellation store of the same site and test position
+    readouts = read_results(MER_READINGS)
+    if not readouts :
+        logger.warning('!!! Could not read the MER readouts !!!')
+        return
+    logger.info('MER readouts: ' + ', '.join(name + ' ' + str(value) \
+        for name, value in readouts.items()))
+    site = site_metadata()
+    if last_constellation is None or any(last_constellation.site.get(key) \
+        != site[key] for key in ('callsign', 'measpt', 'test', 'channel')) :
+        return
+    try:
+        last_constellation.update_meta('readouts', **readouts)
+    except OSError as e:
+        logger.warning('!!! Could not write ' + last_constellation.path + \
+            ': ' + str(e) + ' !!!')
+        return
+    results = last_constellation.meta.get('results', {})
+    if 'MER' in readouts and 'mer' in results :
+        logger.info('MER: instrument ' + str(readouts['MER']) + \
+            ' dB, host ' + str(round(results['mer'], 2)) + ' dB')
+
+# Data saved after a screen shot, by measurement name:
+#   function(screen shot file name or None)
+CAPTURE_DATA = {'Spectrum': save_spectrum_trace,
+    'Constellation': save_constellation,
+    'MER': save_mer_readouts}
+
+
 # ———————————————————————————————————————————————————
 #              SET DEVICE CLOCK
 # ———————————————————————————————————————————————————
@@ -1946,11 +4022,10 @@ def SetETLClock() :
             logger.debug('Query for ETL date and time failed')
             pass
 
-        #ETLdatetime = str(datetime.datetime.strptime(ETLdate + ' ' + 
-        #   ETLtime,'%Y,%m,%d %H,%M,%S')) 
-        # This throws "raise ValueError("unconverted data remains: %s" %"
-        ETLdatetime = str(datetime.datetime.strptime(ETLdate + ' ' + \
-            ETLtime,'%Y,%m,%d\n %H,%M,%S\n')) 
+        # Replies used to end in '\n' ("unconverted data remains");
+        # strip them so either termination setting parses.
+        ETLdatetime = str(datetime.datetime.strptime(ETLdate.strip() + ' ' + \
+            ETLtime.strip(),'%Y,%m,%d %H,%M,%S')) 
         logger.info('ETL date and time: ' + ETLdatetime)
         tdelta = datetime.datetime.strptime(ETLdatetime,'%Y-%m-%d %X').\
             timestamp() - datetime.datetime.now().timestamp()
@@ -1961,15 +4036,8 @@ def SetETLClock() :
             logger.info('ETL date and time: ' + ETLdatetime + '   ' + \
                 timedatewarning ,)
 
-        # Operation complete query. Returns an ASCII "+1" when all
-        # pending overlapped operations have been completed
-        _null = DEVICE.query('*OPC?',)
-        try:
-            _null = DEVICE.query('*OPC?',)
-        except:
-            logger.debug\
-                ('Operation Complete Query for Set ETL Clock failed')
-            pass
+        # The SYST:DATE?/TIME? queries above were answered after the
+        # SYST:DATE/TIME settings, so no Operation Complete check here.
         DEVICE.close()
     #else:
         #_entryError = 'FAILED to connect to DEVICE'
@@ -1990,7 +4058,7 @@ def requestTruckHeading():
     message = "Truck Heading? ("+str(_truckheading)+") >> "
     while True:
         try:
-            _input = int(input(message))
+            _input = int(ask(message))
         except ValueError:
             message = message + """
                 MUST BE AN INTEGER >> """
@@ -2055,7 +4123,7 @@ def calcAzToTx():
 
 def requestTemperature():
     global _temperature
-    _input = input("Temperature? ("+_temperature+") >> ")
+    _input = ask("Temperature? ("+_temperature+") >> ")
     if _input != "" :
         _temperature =  _input
         section = 'UserEntered'
@@ -2066,7 +4134,7 @@ def requestTemperature():
 
 def requestWind():
     global _wind 
-    _input = input("Wind? ("+_wind+") >> ")
+    _input = ask("Wind? ("+_wind+") >> ")
     if _input != "" :
         _wind =  _input
         section = 'UserEntered'
@@ -2077,7 +4145,7 @@ def requestWind():
 
 def requestSkyCond():
     global _skycond 
-    _input = input("Sky Conditions? ("+_skycond+") >> ")
+    _input = ask("Sky Conditions? ("+_skycond+") >> ")
     if _input != "" :
         _skycond =  _input
         section = 'UserEntered'
@@ -2088,7 +4156,7 @@ def requestSkyCond():
 
 def requestPrecip():
     global _precip
-    _input = input("Precipitation? ("+_precip+") >> ")
+    _input = ask("Precipitation? ("+_precip+") >> ")
     if _input != "" :
         _precip =  _input
         section = 'UserEntered'
@@ -2099,7 +4167,7 @@ def requestPrecip():
 
 def requestTechName():
     global _techname
-    _input = input("Technician name? ("+_techname+") >> ")
+    _input = ask("Technician name? ("+_techname+") >> ")
     if _input != "" :
         _techname =  _input
         section = 'UserEntered'
@@ -2133,7 +4201,7 @@ def requestClutter():
           """ + _entryError ) + """
         Type a choice and press ENTER"""
 
-        choice = input (inputPrompt + ' >> ')
+        choice = ask (inputPrompt + ' >> ')
           
         _entryError = ''
         logger.debug('Clutter Category menu choice = ' + choice)
@@ -2180,7 +4248,7 @@ def requestClutter():
 
 def requestAntDirUp():
     global _antdirup
-    _input = input("Actual antenna direction — Mast up? ("+_antdirup+\
+    _input = ask("Actual antenna direction — Mast up? ("+_antdirup+\
         ") >> ")
     if _input != "" :
         _antdirup =  _input
@@ -2192,7 +4260,7 @@ def requestAntDirUp():
 
 def returnAntDirDown():
     global _antdirdown
-    _input = input("Actual antenna direction — Mast stowed? ("+\
+    _input = ask("Actual antenna direction — Mast stowed? ("+\
         _antdirdown+") >> ")
     if _input != "" :
         _antdirdown =  _input
@@ -2225,7 +4293,7 @@ def ChecklistMenu() :
 
     
         
-        choice = input (inputPrompt + ' >> ')
+        choice = ask (inputPrompt + ' >> ')
 
         _entryError = ''
         
@@ -2279,15 +4347,21 @@ def ChecklistMenu() :
 # ———————————————————————————————————————————————————
 
 def Checklist() :
-    from openpyxl import Workbook 
-    from openpyxl import load_workbook
+    # The checklist is written by fsData.write_checklist() from the
+    # template (parsed once, then kept in memory) to
+    # <_host_results_folder>\XXXX\20200416_XXXX_RxxxMxx\Site Info\
+    #   XXXX_RxxxMxx_20200416_101500_Checklist.xlsx
+    try:
+        import fsData
+    except ImportError:
+        logger.warning('!!! The checklist needs fsData.py !!!')
+        return
     global _etlIDN
     if not withoutConnection == 0 :
         _etlIDN = 'Not connected'
     global _checklist_template
 
-    workbook = Workbook()
-
+    template = _checklist_template
     if os.path.isfile(_checklist_template.replace('\\','\\\\')) != 1 : 
         # If file doesn't exist
         logger.info( 'Checklist template file ' + _checklist_template + \
@@ -2300,12 +4374,12 @@ def Checklist() :
                 _checklist_template + """ does not exist.
             Press ENTER to create a checklist without using a template or 
             type 1 then ENTER to specify a different template file."""
-            choice = input (inputPrompt + ' >> ')
+            choice = ask (inputPrompt + ' >> ')
             
             if choice == '1':
                 logger.debug('User chose to enter new template file.')
                 inputPrompt = 'Enter a new template file'
-                _checklist_template = input (inputPrompt + ' >> ')
+                _checklist_template = ask (inputPrompt + ' >> ')
                 logger.debug('User entered new template file ' + \
                     _checklist_template)
                 if os.path.isfile(_checklist_template.replace('\\','\\\\')) != 1 : # If file doesn't exist
@@ -2323,124 +4397,28 @@ def Checklist() :
                     logger.debug\
                         ('_checklist_template written to INI file is '+ \
                             _checklist_template)
-                    workbook = load_workbook\
-                        (filename=_checklist_template.replace('\\','\\\\'))
-            else:                    
-                # Select first available sheet
-                sheet = workbook.active
-                sheet.title = 'Sheet1'
-                
-                sheet["A1"] = "Station:"
-                sheet["A2"] = "TV Channel Number"
-                sheet["A3"] = "Radial:"
-                sheet["A4"] = "Measurement"
-                sheet["A5"] = "Lat:"
-                sheet["A6"] = "Lon:"
-                sheet["A7"] = "Site Elev (m)"
-                sheet["A8"] = "Heading to Tx (Calc):"
-                sheet["A9"] = 'Frequency (MHz):'  # Added '(MHz)'
-                sheet["B9"] = (float(_frequency)/1000000) 
-                # Convert from Hz to MHz
-                sheet["A10"] = "1/4 Wave"
-                sheet["A11"] = "Date:"
-                sheet["A12"] = "Time:"
-                sheet["A13"] = "MEASUREMENTS"
-                sheet["A14"] = "Enter Truck Heading:"
-                sheet["A15"] = "Confirm Freq:"
-                sheet["A16"] = "Confirm Ant. Length:"
-                sheet["A17"] = "Location A"
-                sheet["A18"] = "Location B"
-                sheet["A19"] = "Temperature"
-                sheet["A20"] = "Wind"
-                sheet["A21"] = "Sky Conditions"
-                sheet["A22"] = "Precip"
-                sheet["A23"] = "Technician"
-                sheet["C14"] = "Calculated Point AZ:"
-                sheet["D16"] = "Actual Antenna Dir."
-                sheet["C17"] = "Mast 30'"
-                sheet["C18"] = "Mast Stowed"     
-    else:
-        workbook = load_workbook(filename=_checklist_template.replace\
-            ('\\','\\\\'))
-        
-    # sheet
-    # Select first available sheet
-    sheet = workbook.active
-    # sheet.title = 'Sheet1'
-    
-    sheet["B1"] = _callsign
-    sheet["B2"] = int(_channel)
-    sheet["B3"] = _radial
-    sheet["B4"] = _dist
-    sheet["B5"] = _lat
-    sheet["B6"] = _lon
-    sheet["B7"] = _altitude
-    sheet["B8"] = _RevRadial
-    sheet["B11"] = datetime.datetime.now().strftime('%m/%d/%Y')
-    sheet["B12"] = datetime.datetime.now().strftime('%H:%M:%S')
-
-    
-    # Overwrite existing label in template:
-    sheet["C19"] = 'Clutter category'
-    sheet["C20"] = ''
-    sheet["C21"] = ''
-    
-    sheet["B14"] = _truckheading
-    sheet["B15"] = float(_frequency)/1000000  # Convert from Hz to MHz
-    sheet["B19"] = _temperature
-    sheet["B20"] = _wind
-    sheet["B21"] = _skycond
-    sheet["B22"] = _precip
-    sheet["B23"] = _techname
-    sheet["D14"] = _AzToTx
-    sheet["D17"] = _antdirup
-    sheet["D18"] = _antdirdown
-    sheet["D19"] = _clutter
-    sheet["A32"] = 'Test instrument:'
-    sheet["B32"] = _etlIDN
-
-    # Get today's date as YYYYMMDD:
-    _YYYYMMDD = datetime.datetime.now().strftime('%Y%m%d')
-    
-    # Time as HHMMSS:
-    _HHMMSS = datetime.datetime.now().strftime('%H%M%S')
-
-    # Output file
-    # C:\Shared\Measurement_results\XXXX\20200416_XXXX_RxxxMxx\Site Info\
-    #   XXXX_RxxxMxx_Checklist.xlsx
-
-    _FILEPATH = 'C:\\Shared\\Measurement_results\\'+_callsign+'\\'+\
-        _YYYYMMDD+'_'+_callsign+'_'+_MEASPT+'\\Site Info'
-    _FILENAME = _callsign+"_"+_MEASPT+"_"+_YYYYMMDD+"_"+_HHMMSS+\
-        "_Checklist.xlsx"
+                    template = _checklist_template
+            else:
+                template = None  # Labels only
 
-    # Create a directory, first check if it already exists   
-    if not os.path.exists('C:\\Shared\\Measurement_results\\'+_callsign):
-        os.makedirs('C:\\Shared\\Measurement_results\\'+_callsign)
-        
-    if not os.path.exists('C:\\Shared\\Measurement_results\\'+_callsign+\
-        '\\'+_YYYYMMDD+'_'+_callsign+'_'+_MEASPT):
-        os.makedirs('C:\\Shared\\Measurement_results\\'+_callsign+'\\'+\
-            _YYYYMMDD+'_'+_callsign+'_'+_MEASPT)
+    visit = {key : globals().get(key, '') for coordinate, key in \
+        fsData.CHECKLIST_FIELDS}
+    visit['_frequency'] = _frequency
+    visit['time'] = datetime.datetime.now()
 
-    if not os.path.exists(_FILEPATH):
-        os.makedirs(_FILEPATH)
-        
-    if not os.path.exists(_FILEPATH + '\\Photos' ):
-        os.makedirs(_FILEPATH + '\\Photos' )
-    
-    workbook.save( filename= _FILEPATH + "\\" + _FILENAME )
-    if os.path.isfile(_FILEPATH + "\\" + _FILENAME) == 1 : # If file exists
-        logger.warning('Exported checklist to ' + _FILENAME )
-    else:
-        logger.warning('FAILED to save ' + _FILENAME )
-    
+    try:
+        path = fsData.write_checklist(_host_results_folder, visit, \
+            template)
+    except (OSError, ValueError) as e:
+        logger.warning('FAILED to save the checklist: ' + str(e))
+        return
+    logger.warning('Exported checklist to ' + os.path.basename(path))
     return
 
 # ———————————————————————————————————————————————————
 #              DONE
 # ———————————————————————————————————————————————————
-def done() :
+def done(exit_code=0) :
     try:
         _lat
     except NameError:
@@ -2448,8 +4426,324 @@ def done() :
     else:
         logger.info('Latitude, Longitude: '+_lat.replace("\n","")+','+\
             _lon.replace("\n",""))
+    if wait_for_transfers() :
+        logger.warning('!!! Some files were not transferred to the host !!!')
+    logger.info('Connection to ETL: ' + DEVICE.stats())
+    logger.debug('Operation complete times: ' + opc_report())
+    logger.debug('Directory cache: ' + dir_cache_report())
+    SETTINGS.flush()
+    logger.debug('INI file: ' + SETTINGS.stats())
+    GPS_POLLER.stop()
+    GPS_TRACK.stop()
+    RECORDER.stop()
+    for trace in replay_traces.values() :
+        logger.info('Replay of ' + trace.path + ': ' + trace.stats())
+    if METRICS.enabled :
+        logger.info('Phases: ' + METRICS.report())
+        try:
+            logger.info('Metrics written to ' + \
+                ' and '.join(METRICS.export(LOG_PATH)))
+        except OSError as e:
+            logger.warning('!!! Could not write the metrics: ' + str(e) + \
+                ' !!!')
+    DEVICE.disconnect()
     logger.info('Quit')
-    sys.exit(0) 
+    sys.exit(exit_code) 
+
+
+# ———————————————————————————————————————————————————
+#              JOB FILE (HEADLESS)
+# ———————————————————————————————————————————————————
+# A job file as the third argument on the command line runs a capture
+# without the menu:
+#   python fsCapture.py info fsCapture.INI WBEN_R90M10.job
+# The job file has the same format as the INI file:
+#   [Job]
+#   _callsign = WBEN
+#   _channel = 8
+#   _radial = 90
+#   _dist = 10
+#   _testposition = A
+#   measurements = Overview, Spectrum, Constellation, MER, Eye, Echo
+#   measure_log_seconds = 60      (0 or missing: no Measure Log)
+#   sample_seconds = 60           (0 or missing: no sampling; see
+#   sample_rate = 4                sample_results())
+#   summary = WBEN_R90M10.json    (default: <job file>.json)
+# Missing station keys keep their values from the INI file; job values
+# are not saved to the INI file. The summary is JSON with one entry per
+# step. Nobody is at the keyboard, so anything that would ask the user
+# (e.g. no connection to the ETL) fails the job instead. The exit status
+# is 0 if every step saved its file, otherwise 1.
+
+JOB_KEYS = ['_callsign', '_channel', '_radial', '_dist', '_testposition',
+    '_truckheading', '_channel_table']
+
+_job_file = None
+
+class JobError(Exception) :
+    pass
+
+def ask(prompt='') :
+    # Every prompt to the operator goes through here. In a job there is
+    # no operator, so the job fails instead of waiting.
+    if _job_file is not None :
+        raise JobError('Operator input needed: ' + \
+            ' '.join(str(prompt).split())[:120])
+    operator_idle.set()  # The GPS poller may use the link meanwhile
+    try:
+        return input(prompt)
+    finally:
+        operator_idle.clear()
+
+def read_job(job_file) :
+    job = configparser.ConfigParser()
+    if not job.read(job_file) :
+        raise JobError('Could not read ' + job_file)
+    if not job.has_section('Job') :
+        if not any(section.startswith('Analyzer ') \
+            for section in job.sections()) :
+            raise JobError('No [Job] section in ' + job_file)
+        job.add_section('Job')
+    return job['Job']
+
+def run_step(summary, name, function, *args) :
+    # Run one step and add its result to the summary
+    global last_saved
+    logger.info('Job step: ' + name)
+    last_saved = None
+    t0 = time.perf_counter()
+    try:
+        function(*args)
+    except JobError :
+        raise
+    except Exception as e:
+        logger.warning('!!! Job step ' + name + ' failed: ' + str(e) + ' !!!')
+        last_saved = None
+    summary['steps'].append({'step': name, 'file': last_saved,
+        'seconds': round(time.perf_counter() - t0, 3)})
+
+def run_job(job_file) :
+    # Run the job and write its summary. Returns the exit status. Prompts
+    # fail the job (see ask()) until it is over, however it ends.
+    global _job_file, _mlog_seconds
+    _job_file = job_file
+    try:
+        return _run_job(job_file)
+    finally:
+        _job_file = None
+        _mlog_seconds = None
+
+def _run_job(job_file) :
+    global _MEASPT, _mlog_seconds
+    started = datetime.datetime.now()
+    t0 = time.perf_counter()
+    summary = {'job': os.path.abspath(job_file),
+        'started': started.strftime('%Y-%m-%d %H:%M:%S'), 'steps': []}
+    summary_file = os.path.splitext(job_file)[0] + '.json'
+    ok = False
+    try:
+        job = read_job(job_file)
+        summary_file = job.get('summary', summary_file)
+        setvars()
+        analyzers = [section for section in job.parser.sections() \
+            if section.startswith('Analyzer ')]
+        if analyzers :
+            summary['analyzers'] = run_analyzers(job, analyzers)
+            ok = all(result.get('ok') for result in \
+                summary['analyzers'].values())
+        else:
+            for key in JOB_KEYS :
+                if key in job :
+                    globals()[key] = job[key].strip()
+            _MEASPT = 'R' + str(_radial) + 'M' + str(_dist)
+            # Check the job's numbers before anything is measured
+            try:
+                sample_seconds = job.getint('sample_seconds', 0)
+                sample_rate = job.getfloat('sample_rate', SAMPLE_RATE)
+            except ValueError as e:
+                raise JobError('sample_seconds / sample_rate: ' + str(e))
+            if sample_seconds > 0 and not sample_rate > 0 :
+                raise JobError('sample_rate must be more than 0, not ' + \
+                    job.get('sample_rate'))
+            ip_ok()
+            meas_results_folder()
+            channel_table()
+            problem = check_channel(_channel)
+            if problem :
+                raise JobError('Channel ' + _channel + ': ' + problem)
+            summary.update({'callsign': _callsign, 'channel': _channel,
+                'measpt': _MEASPT, 'test': _testposition,
+                'etl': _etlIDN.strip(), 'ipaddr': str(ipaddr).strip()})
+            names = [n.strip() for n in job.get('measurements', \
+                ','.join(m[0] for m in CAPTURE_SEQUENCE)).split(',') \
+                if n.strip()]
+            for name in names :
+                run_step(summary, name, capture, name)
+            _mlog_seconds = job.getint('measure_log_seconds', 0)
+            if _mlog_seconds > 0 :
+                run_step(summary, 'Measure Log', MeasureLog)
+            if sample_seconds > 0 :
+                run_step(summary, 'Sample results', sample_results, \
+                    sample_seconds, sample_rate)
+            failed_transfers = wait_for_transfers()
+            ok = failed_transfers == 0 and \
+                all(step['file'] for step in summary['steps'])
+            if failed_transfers :
+                summary['failed_transfers'] = failed_transfers
+    except JobError as e:
+        logger.warning('!!! Job ' + job_file + ' failed: ' + str(e) + ' !!!')
+        summary['error'] = str(e)
+    summary['ok'] = ok
+    summary['seconds'] = round(time.perf_counter() - t0, 3)
+    summary['lock'] = lock_report()
+    summary['connection'] = DEVICE.stats()
+    try:
+        with open(summary_file, 'w') as f :
+            json.dump(summary, f, indent=2)
+        logger.warning('Job summary written to ' + summary_file)
+    except OSError as e:
+        logger.warning('!!! Could not write ' + summary_file + ': ' + \
+            str(e) + ' !!!')
+    return 0 if ok else 1
+
+
+# ———————————————————————————————————————————————————
+#              SEVERAL ANALYZERS
+# ———————————————————————————————————————————————————
+# A job file with [Analyzer <name>] sections drives several ETLs at the
+# same time. The script keeps its state in module globals, so each
+# analyzer gets its own fsCapture process with its own INI file, log
+# and results; this process starts them together and waits for all:
+#   [Job]
+#   _callsign = WBEN
+#   _radial = 90
+#   _dist = 10
+#   measure_log_seconds = 60
+#   [Analyzer ETL1]
+#   ipaddr = 192.168.1.50
+#   _channel = 8
+#   _testposition = A
+#   [Analyzer ETL2]
+#   ipaddr = 192.168.1.51
+#   _channel = 8
+#   _testposition = B
+# [Job] keys apply to every analyzer; an analyzer's own keys override
+# them. The INI file for <name> is a copy of this one, kept in the
+# folder <name> next to it, with the keys in ANALYZER_SETTINGS replaced.
+# The analyzers' console output is shown prefixed with their names and
+# their summaries are collected under 'analyzers' in this job's summary.
+
+ANALYZER_SETTINGS = {'ipaddr': 'DEFAULT',
+    '_meas_results_folder': 'Measurement_Results_Folder',
+    '_hardcopy_dest': 'Hardcopy',
+    '_host_results_folder': 'Hardcopy'}
+
+def analyzer_files(job, section) :
+    # Write the INI and job files for one analyzer; returns their paths
+    name = section.split(None, 1)[1].strip()
+    folder = os.path.join(LOG_PATH, re.sub(r'[\\/*?:"<>|\s]', '_', name))
+    os.makedirs(folder, exist_ok=True)
+    SETTINGS.flush()
+    ini = configparser.ConfigParser()
+    ini.read(INI_FILENAME)
+    settings = dict(job.items())
+    settings.update(job.parser[section].items())
+    child_job = configparser.ConfigParser()
+    child_job.add_section('Job')
+    for key, value in settings.items() :
+        if key in ANALYZER_SETTINGS :
+            if ANALYZER_SETTINGS[key] != 'DEFAULT' and \
+                not ini.has_section(ANALYZER_SETTINGS[key]) :
+                ini.add_section(ANALYZER_SETTINGS[key])
+            ini.set(ANALYZER_SETTINGS[key], key, value)
+        else:
+            child_job.set('Job', key, value)
+    child_job.set('Job', 'summary', os.path.join(folder, 'job.json'))
+    ini_file = os.path.join(folder, inibasename)
+    job_file = os.path.join(folder, 'job.job')
+    for path, parser in ((ini_file, ini), (job_file, child_job)) :
+        with open(path, 'w') as f :
+            parser.write(f)
+    return name, ini_file, job_file
+
+def run_analyzer(name, ini_file, job_file) :
+    # Run one analyzer's job in its own process; returns its summary
+    import subprocess
+    level = sys.argv[1] if len(sys.argv) > 1 else 'info'
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    # A summary left by an earlier run must not be taken for this one
+    summary_file = os.path.join(os.path.dirname(job_file), 'job.json')
+    try:
+        os.remove(summary_file)
+    except FileNotFoundError :
+        pass
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+        level, ini_file, job_file], stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, env=env,
+        encoding='utf-8', errors='replace')
+    for line in process.stdout :
+        print('[' + name + '] ' + line.rstrip())
+    status = process.wait()
+    try:
+        with open(summary_file) as f :
+            summary = json.load(f)
+    except (OSError, ValueError) :
+        return {'ok': False, 'error': 'No summary; exit status ' + \
+            str(status)}
+    if status != 0 and summary.get('ok') :
+        summary['ok'] = False
+        summary['error'] = 'Exit status ' + str(status)
+    return summary
+
+def run_analyzers(job, sections) :
+    # Run every [Analyzer <name>] at once; returns {name: summary}
+    import concurrent.futures
+    runs = [analyzer_files(job, section) for section in sections]
+    logger.warning('Starting ' + ', '.join(run[0] for run in runs))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(runs)) as \
+        pool :
+        futures = {run[0] : pool.submit(run_analyzer, *run) for run in runs}
+    results = {name : future.result() for name, future in futures.items()}
+    for name, result in results.items() :
+        logger.warning(name + ': ' + ('OK' if result.get('ok') else \
+            '!!! FAILED ' + result.get('error', '') + ' !!!') + \
+            ' in ' + str(result.get('seconds', '?')) + ' s')
+    return results
+
+
+# ———————————————————————————————————————————————————
+#              STARTUP TIME
+# ———————————————————————————————————————————————————
+# Time from launch (STARTUP_T0, just after the standard imports) to the
+# first main menu, split into phases by startup_mark(). Reported once,
+# when the menu is first shown; a warning if over STARTUP_BUDGET. Time
+# spent waiting for the user (e.g. an IP address prompt) is included.
+
+STARTUP_BUDGET = 1.0  # seconds
+startup_phases = []   # (phase, time.perf_counter() at its end)
+startup_reported = False
+
+def startup_mark(phase) :
+    if not startup_reported :
+        startup_phases.append((phase, time.perf_counter()))
+
+def startup_report() :
+    global startup_reported
+    startup_mark('menu')
+    startup_reported = True
+    total = startup_phases[-1][1] - STARTUP_T0
+    previous = STARTUP_T0
+    parts = []
+    for phase, t in startup_phases :
+        parts.append(phase + ' ' + str(round((t - previous) * 1000)))
+        previous = t
+    report = str(round(total * 1000)) + ' ms (budget ' + \
+        str(round(STARTUP_BUDGET * 1000)) + ' ms): ' + ', '.join(parts)
+    if total > STARTUP_BUDGET :
+        logger.warning('Time to menu ' + report)
+    else:
+        logger.info('Time to menu ' + report)
+    return report
 
 
 # ———————————————————————————————————————————————————
@@ -2457,20 +4751,29 @@ def done() :
 # ———————————————————————————————————————————————————
 
 def main() :
-    
+    startup_mark('import')
     start_logging()
+    startup_mark('logging')
+    if len(sys.argv) > 3 :
+        # Third argument is a job file: run it without the menu
+        done(run_job(sys.argv[3]))
     setvars()
+    startup_mark('settings')
     logger.debug('main() returned from setvars()')
     #checkcomputertime()
     logger.debug('main() returned from checkcomputertime()')
     ip_ok()
+    startup_mark('connect')
     logger.debug('main() returned from ip_ok()')
     meas_results_folder()
+    startup_mark('results folder')
     logger.debug('main() returned from meas_results_folder()')
     channel_table()
+    startup_mark('channel table')
     logger.debug('main() returned from channel_table()')
     menu()
 
-main()
+if __name__ == '__main__' :
+    main()
 
 
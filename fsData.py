@@ -0,0 +1,1310 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Host-side storage for fsCapture.py measurement data. Measure Log
+# exports (..._capture.CSV) and sampled DTV results are kept as typed
+# binary columns, so long drive logs load in milliseconds instead of
+# being re-parsed as text.
+
+# This script is:
+# C:\Shared\batch_files\fsData.py
+
+# Examples:
+#   python fsData.py convert Z:\Measurement_results\WBEN\*\*\*_capture.CSV
+#   python fsData.py info WBEN_R90M10_A_20200413_101500_capture.fsd
+#   python fsData.py channels TV-USA-ATSC.CHT
+#   python fsData.py near 40.1234 -75.6543 100 GPS_track\*.fsd
+#   python fsData.py checklists visits.csv --template Checklist.xlsx
+#   python fsData.py trace fsCapture_20200413_101500.fst
+
+# A column store is a folder <name>.fsd holding
+#   meta.json     — columns and their types, row count, units and the
+#                   site: callsign, MEASPT, test position, channel,
+#                   frequency, GPS position
+#   <column>.bin  — the values of one column, little-endian, back to back
+# Rows are appended by adding to every .bin file and then updating the row
+# count in meta.json (written to a temporary file and renamed). Bytes past
+# the row count, left by an interrupted append, are ignored and cut off
+# by the next append.
+
+'''
+MIT License
+
+Copyright (c) 2020 John Neuhaus, jneuhausATosborn-engDOTcom
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+import argparse
+import array
+import base64
+import csv
+import datetime
+import glob
+import gzip
+import io
+import json
+import logging
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+
+logger = logging.getLogger("fsData")
+
+STORE_EXT = '.fsd'
+STORE_FORMAT = 1
+
+# Column types: numpy dtype -> array typecode
+DTYPES = {'<f8': 'd', '<f4': 'f', '<i8': 'q', '<i4': 'i', '<i1': 'b'}
+
+# Column types of the Measure Log export; anything else is '<f8'
+MLOG_DTYPES = {'Sync': '<i1'}
+
+
+# ———————————————————————————————————————————————————
+#              COLUMN STORE
+# ———————————————————————————————————————————————————
+
+class ColumnStore :
+
+    def __init__(self, path) :
+        # Open an existing store; see create()
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f :
+            self.meta = json.load(f)
+        if self.meta.get('format') != STORE_FORMAT :
+            raise ValueError(path + ': unknown format ' + \
+                str(self.meta.get('format')))
+
+    @classmethod
+    def create(cls, path, columns, site=None, units=None) :
+        # columns: [(name, dtype)] in order. An existing store at path is
+        # replaced.
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path) :
+            if name.endswith('.bin') :
+                os.remove(os.path.join(path, name))
+        meta = {'format': STORE_FORMAT, 'rows': 0,
+            'columns': [[name, dtype] for name, dtype in columns],
+            'units': units or {}, 'site': site or {}}
+        for name, dtype in columns :
+            if dtype not in DTYPES :
+                raise ValueError('Unsupported column type ' + dtype)
+            open(os.path.join(path, name + '.bin'), 'wb').close()
+        write_json(os.path.join(path, 'meta.json'), meta)
+        return cls(path)
+
+    @classmethod
+    def open_or_create(cls, path, columns, site=None, units=None) :
+        if os.path.exists(os.path.join(path, 'meta.json')) :
+            return cls(path)
+        return cls.create(path, columns, site, units)
+
+    def __len__(self) :
+        return self.meta['rows']
+
+    @property
+    def columns(self) :
+        return [name for name, dtype in self.meta['columns']]
+
+    @property
+    def site(self) :
+        return self.meta['site']
+
+    def update_site(self, **site) :
+        self.update_meta('site', **site)
+
+    def update_meta(self, key, **values) :
+        # Add values to the dict meta[key], e.g. 'results' computed from
+        # the data
+        self.meta.setdefault(key, {}).update(values)
+        write_json(os.path.join(self.path, 'meta.json'), self.meta)
+
+    def append(self, rows) :
+        # rows: {column: sequence of values}, all the same length. A
+        # missing value (None, or a column not given) is stored as NaN, or
+        # as 0 in an integer column.
+        count = max((len(v) for v in rows.values()), default=0)
+        if not count :
+            return
+        for name, dtype in self.meta['columns'] :
+            typecode = DTYPES[dtype]
+            blank = math.nan if typecode in 'fd' else 0
+            values = rows.get(name, [blank] * count)
+            if len(values) != count :
+                raise ValueError('Column ' + name + ' has ' + \
+                    str(len(values)) + ' values, expected ' + str(count))
+            if hasattr(values, 'astype') :  # numpy array
+                data = values.astype(dtype)
+            else:
+                data = array.array(typecode, \
+                    (blank if v is None else v for v in values))
+                if sys.byteorder != 'little' :
+                    data.byteswap()
+            with open(os.path.join(self.path, name + '.bin'), 'r+b') as f :
+                f.truncate(self.meta['rows'] * data.itemsize)
+                f.seek(0, os.SEEK_END)
+                data.tofile(f)
+        self.meta['rows'] += count
+        write_json(os.path.join(self.path, 'meta.json'), self.meta)
+
+    def column(self, name) :
+        # The values of one column: a read-only numpy memmap if numpy is
+        # installed, otherwise an array.array
+        dtype = dict(self.meta['columns'])[name]
+        path = os.path.join(self.path, name + '.bin')
+        rows = self.meta['rows']
+        try:
+            import numpy
+        except ImportError:
+            data = array.array(DTYPES[dtype])
+            with open(path, 'rb') as f :
+                data.fromfile(f, rows)
+            if sys.byteorder != 'little' :
+                data.byteswap()
+            return data
+        if not rows :
+            return numpy.zeros(0, dtype=dtype)
+        return numpy.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    def read(self) :
+        # {column: values} of every column
+        return {name : self.column(name) for name in self.columns}
+
+def write_json(path, data) :
+    # Write to a temporary file and rename, so a reader never sees half
+    with open(path + '.tmp', 'w') as f :
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+def store_path(path) :
+    # <name>.CSV -> <name>.fsd
+    return os.path.splitext(path)[0] + STORE_EXT
+
+
+# ———————————————————————————————————————————————————
+#              MEASURE LOG EXPORT
+# ———————————————————————————————————————————————————
+# MMEM:STOR:MLOG:DATA writes a block of "key<sep>value" lines (Type,
+# Version, Channel, Frequency, ...), a blank line, a header row starting
+# with Date and one row per second. A German-locale ETL uses ';' between
+# fields and ',' as the decimal separator. Header cells carry the unit
+# after a '/', e.g. Level/dBuV.
+
+def sniff_separator(text) :
+    for line in text.splitlines() :
+        if line.startswith('Date') :
+            return ';' if line.count(';') > line.count(',') else ','
+    return ','
+
+def read_mlog(path) :
+    # Returns (info, columns, units, rows): info is the key/value block,
+    # columns the column names without units, rows the data as text
+    with open(path, newline='', encoding='latin-1') as f :
+        text = f.read()
+    sep = sniff_separator(text)
+    info, header, rows = {}, None, []
+    for cells in csv.reader(text.splitlines(), delimiter=sep) :
+        if header is None :
+            if cells and cells[0] == 'Date' :
+                header = cells
+            elif len(cells) >= 2 :
+                info[cells[0].strip()] = cells[1].strip()
+        elif cells :
+            rows.append(cells)
+    if header is None :
+        raise ValueError(path + ': no Date column header')
+    columns, units = [], {}
+    for cell in header :
+        name, _, unit = cell.partition('/')
+        columns.append(name.strip())
+        if unit :
+            units[name.strip()] = unit.strip()
+    info['decimal'] = ',' if sep == ';' else '.'
+    return info, columns, units, rows
+
+def mlog_number(text, decimal) :
+    text = text.strip()
+    if not text :
+        return None
+    try:
+        return float(text.replace(decimal, '.') if decimal != '.' else text)
+    except ValueError:
+        return None
+
+def parse_mlog(path) :
+    # numpy version of read_mlog(). The numeric columns are converted in
+    # one numpy.loadtxt() call and the dates and times as one character
+    # matrix. Returns (info, units, {column: ndarray}) with Date and Time
+    # combined into Time, seconds since the epoch (local time). Empty
+    # cells are NaN. Files that do not parse this way (ragged rows, odd
+    # dates) are read with mlog_columns() instead.
+    import numpy
+    with open(path, encoding='latin-1') as f :
+        text = f.read()
+    sep = sniff_separator(text)
+    decimal = ',' if sep == ';' else '.'
+    if text.startswith('Date') :
+        head, body = '', text
+    else:
+        head, found, body = text.partition('\nDate')
+        if not found :
+            raise ValueError(path + ': no Date column header')
+        body = 'Date' + body
+    header, _, body = body.partition('\n')
+    info = {}
+    for line in head.splitlines() :
+        key, _, value = line.partition(sep)
+        if value :
+            info[key.strip()] = value.strip()
+    info['decimal'] = decimal
+    columns, units = [], {}
+    for cell in header.strip().split(sep) :
+        name, _, unit = cell.partition('/')
+        columns.append(name.strip())
+        if unit :
+            units[name.strip()] = unit.strip()
+    lines = [line for line in body.splitlines() if line.strip()]
+    try:
+        data = {'Time': mlog_times(lines, sep)}
+        if len(columns) > 2 :
+            block = '\n'.join(lines)
+            if decimal != '.' :
+                block = block.replace(decimal, '.')
+            # Empty cells -> nan
+            block = re.sub(re.escape(sep) + r'(?=' + re.escape(sep) + \
+                r'|$)', sep + 'nan', block, flags=re.M)
+            values = numpy.loadtxt(io.StringIO(block), delimiter=sep, \
+                usecols=range(2, len(columns)), dtype=float, ndmin=2, \
+                comments=None)
+            for i, name in enumerate(columns[2:]) :
+                data[name] = values[:, i]
+    except ValueError:
+        info, units, data = mlog_columns(path)
+        data = {name : numpy.array(values, dtype=float) \
+            for name, values in data.items()}
+    return info, units, data
+
+def mlog_times(lines, sep) :
+    # Seconds since the epoch from rows starting DD.MM.YYYY<sep>HH:MM:SS.
+    # The characters are rearranged into YYYY-MM-DDTHH:MM:SS as one
+    # character matrix and converted by numpy in one step. Raises
+    # ValueError if a row does not start that way.
+    import numpy
+    rows = len(lines)
+    if not rows :
+        return numpy.zeros(0)
+    c = numpy.ascontiguousarray([line[:19] for line in lines], \
+        dtype='U19').view('U1').reshape(rows, 19)
+    if not ((c[:, 2] == '.') & (c[:, 5] == '.') & (c[:, 10] == sep) & \
+        (c[:, 13] == ':') & (c[:, 16] == ':')).all() :
+        raise ValueError('Unexpected date or time format')
+    dash = numpy.full((rows, 1), '-')
+    iso = numpy.concatenate([c[:, 6:10], dash, c[:, 3:5], dash, c[:, 0:2], \
+        numpy.full((rows, 1), 'T'), c[:, 11:19]], axis=1)
+    utc = numpy.ascontiguousarray(iso).view('U19').reshape(rows).astype(\
+        'datetime64[s]').astype('int64').astype(float)
+    # The ETL writes local time; use the UTC offset at the first row
+    first = datetime.datetime(1970, 1, 1) + \
+        datetime.timedelta(seconds=utc[0])
+    return utc + (first.timestamp() - utc[0])
+
+def mlog_time(date, time) :
+    try:
+        return datetime.datetime.strptime(date + ' ' + time, \
+            '%d.%m.%Y %H:%M:%S').timestamp()
+    except ValueError:
+        return math.nan
+
+def mlog_columns(path) :
+    # (info, units, {column: list}) from read_mlog(), one row at a time
+    info, columns, units, rows = read_mlog(path)
+    decimal = info['decimal']
+    data = {name : [] for name in ['Time'] + columns[2:]}
+    for row in rows :
+        if len(row) < 2 :
+            continue
+        data['Time'].append(mlog_time(row[0].strip(), row[1].strip()))
+        for i, name in enumerate(columns[2:], 2) :
+            value = mlog_number(row[i], decimal) if i < len(row) else None
+            data[name].append(math.nan if value is None else value)
+    return info, units, data
+
+def load_mlog(path) :
+    # (info, units, {column: values}) using parse_mlog() if numpy is
+    # installed, otherwise mlog_columns()
+    try:
+        import numpy
+    except ImportError:
+        return mlog_columns(path)
+    return parse_mlog(path)
+
+def convert_mlog(path, site=None) :
+    # Convert a Measure Log CSV to <name>.fsd next to it. Date and Time
+    # become one Time column (seconds since the epoch, local time).
+    # Returns the ColumnStore.
+    info, units, data = load_mlog(path)
+    decimal = info['decimal']
+    meta_site = site_from_filename(path)
+    if 'Channel' in info :
+        meta_site['channel'] = info['Channel']
+    if 'Frequency' in info :
+        meta_site['frequency'] = mlog_number(info['Frequency'], decimal)
+    meta_site.update(site or {})  # What the caller knows wins
+    dtypes = {name : MLOG_DTYPES.get(name, '<f8') for name in data}
+    dtypes['Time'] = '<f8'
+    store = ColumnStore.create(store_path(path),
+        [(name, dtypes[name]) for name in data], meta_site, units)
+    for name, values in data.items() :
+        if dtypes[name] != '<f8' :  # Integer column: NaN -> 0
+            data[name] = [0 if v != v else int(v) for v in values]
+    store.append(data)
+    gps = gps_position(store)
+    if gps :
+        store.update_site(latitude=gps[0], longitude=gps[1])
+    return store
+
+def gps_position(store) :
+    # Mean Latitude, Longitude of the rows that have a fix
+    if 'Latitude' not in store.columns or not len(store) :
+        return None
+    fixes = [(lat, lon) for lat, lon in zip(store.column('Latitude'), \
+        store.column('Longitude')) if lat == lat and lon == lon and \
+        (lat, lon) != (0, 0)]
+    if not fixes :
+        return None
+    return (sum(f[0] for f in fixes) / len(fixes), \
+        sum(f[1] for f in fixes) / len(fixes))
+
+def site_from_filename(path) :
+    # <callsign>_<MEASPT>_<test>_<YYYYMMDD>_<HHMMSS>_<file>.<ext>
+    parts = os.path.basename(path).split('_')
+    if len(parts) < 6 :
+        return {}
+    return {'callsign': parts[0], 'measpt': parts[1], 'test': parts[2]}
+
+
+# ———————————————————————————————————————————————————
+#              STATISTICS
+# ———————————————————————————————————————————————————
+# Per-capture statistics of the level and MER columns. Lxx is the value
+# exceeded xx % of the time, so L10 is the 90th percentile and L90 the
+# 10th. MER only means something while the demodulator is synchronized,
+# so it uses only the rows with Sync = 1 (all rows if there is no Sync
+# column). Written next to the capture as <name>_stats.CSV.
+
+STATS_COLUMNS = ('Level', 'MER')
+STATS_SYNCED_ONLY = ('MER',)
+EXCEEDED = (10, 50, 90)  # Lxx percentages
+STATS_FIELDS = ['Quantity', 'Unit', 'Samples', 'Mean', 'Median', 'Min',
+    'Max'] + ['L' + str(p) for p in EXCEEDED]
+
+def stats(data, units=None) :
+    # data: {column: array}. Returns one dict per STATS_COLUMNS column
+    # present, with the STATS_FIELDS keys.
+    import numpy
+    units = units or {}
+    synced = None
+    if 'Sync' in data :
+        synced = numpy.asarray(data['Sync']) == 1
+    results = []
+    for name in STATS_COLUMNS :
+        if name not in data :
+            continue
+        values = numpy.asarray(data[name], dtype=float)
+        if synced is not None and name in STATS_SYNCED_ONLY :
+            values = values[synced]
+        values = values[numpy.isfinite(values)]
+        row = {'Quantity': name, 'Unit': units.get(name, ''),
+            'Samples': len(values)}
+        if len(values) :
+            exceeded = numpy.percentile(values, [100 - p for p in EXCEEDED])
+            row.update({'Mean': values.mean(), 'Median': numpy.median(values),
+                'Min': values.min(), 'Max': values.max()})
+            row.update({'L' + str(p) : v for p, v in zip(EXCEEDED, exceeded)})
+        results.append(row)
+    return results
+
+def stats_path(path) :
+    # <name>.CSV -> <name>_stats.CSV
+    return os.path.splitext(path)[0] + '_stats.CSV'
+
+def write_stats(path, rows, site=None, extra_fields=()) :
+    # One line per quantity; numbers to 2 decimals
+    fields = list(extra_fields) + STATS_FIELDS
+    with open(path + '.tmp', 'w', newline='') as f :
+        writer = csv.DictWriter(f, fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows :
+            writer.writerow({k : ('%.2f' % v if isinstance(v, float) or \
+                hasattr(v, 'dtype') else v) for k, v in \
+                dict(site or {}, **row).items()})
+    os.replace(path + '.tmp', path)
+
+def mlog_stats(path) :
+    # Parse one Measure Log CSV and write <name>_stats.CSV. Returns the
+    # statistics rows.
+    info, units, data = parse_mlog(path)
+    rows = stats(data, units)
+    write_stats(stats_path(path), rows)
+    return rows
+
+
+# ———————————————————————————————————————————————————
+#              SPECTRUM TRACE
+# ———————————————————————————————————————————————————
+# Trace levels are in a logarithmic power unit (dBm or dBuV; the result
+# is in the same unit) at evenly spaced frequencies.
+#   Channel power — the trace integrated over the channel, corrected from
+#                   the resolution bandwidth to the bin spacing
+#   Flat top      — mean power within TOP_HALF_WIDTH of the centre, away
+#                   from the pilot and the band edges
+#   Shoulders     — mean power in a SHOULDER_WIDTH window centred
+#                   SHOULDER_OFFSET outside each channel edge; the
+#                   shoulder attenuation is flat top minus shoulder, dB
+
+CHANNEL_BANDWIDTH = 6e6  # Hz, US TV channel
+TOP_HALF_WIDTH = 2e6
+SHOULDER_OFFSET = 0.5e6
+SHOULDER_WIDTH = 0.5e6
+
+def power_mean(levels) :
+    # Mean of log levels, averaged as power
+    import numpy
+    if not len(levels) :
+        return math.nan
+    return 10 * numpy.log10(numpy.mean(10 ** (levels / 10)))
+
+def spectrum_metrics(freq, level, center, rbw, \
+    bandwidth=CHANNEL_BANDWIDTH) :
+    # {name: value} for a trace; see above
+    import numpy
+    freq = numpy.asarray(freq, dtype=float)
+    level = numpy.asarray(level, dtype=float)
+    offset = freq - center
+    spacing = (freq[-1] - freq[0]) / (len(freq) - 1) if len(freq) > 1 \
+        else rbw
+    in_band = numpy.abs(offset) <= bandwidth / 2
+    power = numpy.sum(10 ** (level[in_band] / 10)) * spacing / rbw
+    top = power_mean(level[numpy.abs(offset) <= TOP_HALF_WIDTH])
+    edge = bandwidth / 2 + SHOULDER_OFFSET
+    lower = power_mean(level[numpy.abs(offset + edge) <= SHOULDER_WIDTH / 2])
+    upper = power_mean(level[numpy.abs(offset - edge) <= SHOULDER_WIDTH / 2])
+    return {'channel_power': float(10 * numpy.log10(power)) if power > 0 \
+            else math.nan,
+        'flat_top': float(top),
+        'shoulder_lower': float(top - lower),
+        'shoulder_upper': float(top - upper),
+        'points': int(len(freq)), 'rbw': float(rbw)}
+
+def trace_from_block(data, start, stop) :
+    # REAL,32 trace block (little-endian float32) -> (frequencies, levels)
+    # as numpy arrays, without copying the levels; array.array and a list
+    # without numpy
+    try:
+        import numpy
+    except ImportError:
+        level = array.array('f')
+        level.frombytes(data[:len(data) - len(data) % 4])
+        if sys.byteorder != 'little' :
+            level.byteswap()
+        step = (stop - start) / max(len(level) - 1, 1)
+        return [start + i * step for i in range(len(level))], level
+    level = numpy.frombuffer(data, dtype='<f4', count=len(data) // 4)
+    return numpy.linspace(start, stop, len(level)), level
+
+def save_trace(path, freq, level, center, rbw, site=None, units=None) :
+    # Column store with Frequency (<f8) and Level (<f4) columns; with
+    # numpy, spectrum_metrics() are saved under 'results' in meta.json.
+    # Returns (store, metrics or None).
+    store = ColumnStore.create(path, [('Frequency', '<f8'), \
+        ('Level', '<f4')], site, units)
+    store.append({'Frequency': freq, 'Level': level})
+    try:
+        import numpy
+    except ImportError:
+        return store, None
+    metrics = spectrum_metrics(freq, level, center, rbw)
+    store.update_meta('results', **metrics)
+    return store, metrics
+
+
+# ———————————————————————————————————————————————————
+#              CONSTELLATION
+# ———————————————————————————————————————————————————
+# 8VSB carries data on I only, at the eight VSB_LEVELS. The symbols are
+# scaled to those levels (DC offset removed, then the least-squares gain
+# against the sliced levels, twice) and each one is sliced to the
+# nearest level. The error is the distance from that level, on I.
+#   MER       — symbol power over error power, dB
+#   EVM       — RMS error over RMS symbol level, %
+#   EVM peak  — largest error over the outermost level, %
+# Per level: symbol count, mean error and MER, and a histogram of the
+# I values sliced to it (HISTOGRAM_BINS bins across one decision
+# interval, -1 to +1 around the level).
+
+VSB_LEVELS = (-7, -5, -3, -1, 1, 3, 5, 7)
+HISTOGRAM_BINS = 40
+
+def slice_symbols(i) :
+    # Index into VSB_LEVELS of the nearest level of each (scaled) value
+    import numpy
+    return numpy.clip(numpy.round((i + 7) / 2), 0, 7).astype(int)
+
+def scale_symbols(i) :
+    import numpy
+    levels = numpy.array(VSB_LEVELS, dtype=float)
+    i = numpy.asarray(i, dtype=float)
+    i = i - i.mean()
+    # Equally likely levels have a mean magnitude of 4
+    i = i * (4 / max(numpy.abs(i).mean(), 1e-12))
+    for _ in range(2) :
+        ideal = levels[slice_symbols(i)]
+        i = i * (numpy.dot(ideal, ideal) / max(numpy.dot(i, ideal), 1e-12))
+    return i
+
+def constellation_metrics(i) :
+    # Returns (metrics, histogram): metrics as described above, the
+    # histogram as {'edges': [...], level: [counts]}
+    import numpy
+    levels = numpy.array(VSB_LEVELS, dtype=float)
+    i = scale_symbols(i)
+    sliced = slice_symbols(i)
+    error = i - levels[sliced]
+    ideal_power = numpy.mean(levels[sliced] ** 2)
+    error_power = numpy.mean(error ** 2)
+    ratio = lambda s, e : float(10 * numpy.log10(s / e)) if e > 0 \
+        else math.inf
+    metrics = {'symbols': int(len(i)),
+        'mer': ratio(ideal_power, error_power),
+        'evm': float(100 * numpy.sqrt(error_power / ideal_power)),
+        'evm_peak': float(100 * numpy.abs(error).max() / levels[-1])}
+    edges = numpy.linspace(-1, 1, HISTOGRAM_BINS + 1)
+    counts = numpy.bincount(sliced, minlength=len(levels))
+    # One histogram per level in one pass: bin index offset by level
+    bins = numpy.clip(numpy.searchsorted(edges, error, side='right') - 1, \
+        0, HISTOGRAM_BINS - 1)
+    histogram = numpy.bincount(sliced * HISTOGRAM_BINS + bins, \
+        minlength=len(levels) * HISTOGRAM_BINS).reshape(len(levels), -1)
+    error_sum = numpy.bincount(sliced, weights=error, minlength=len(levels))
+    error_power_sum = numpy.bincount(sliced, weights=error ** 2, \
+        minlength=len(levels))
+    per_level = {}
+    for n, level in enumerate(VSB_LEVELS) :
+        if counts[n] :
+            per_level[str(level)] = {'symbols': int(counts[n]),
+                'mean_error': float(error_sum[n] / counts[n]),
+                'mer': ratio(level ** 2, error_power_sum[n] / counts[n])}
+    metrics['levels'] = per_level
+    return metrics, dict({'edges': edges.tolist()}, \
+        **{str(level) : histogram[n].tolist() \
+        for n, level in enumerate(VSB_LEVELS)})
+
+def symbols_from_block(data) :
+    # REAL,32 constellation block (I, Q pairs of little-endian float32) ->
+    # (I, Q) as numpy arrays, views into data; array.array without numpy
+    try:
+        import numpy
+    except ImportError:
+        values = array.array('f')
+        values.frombytes(data[:len(data) - len(data) % 8])
+        if sys.byteorder != 'little' :
+            values.byteswap()
+        return values[0::2], values[1::2]
+    pairs = numpy.frombuffer(data, dtype='<f4', count=len(data) // 8 * 2)
+    return pairs[0::2], pairs[1::2]
+
+def save_constellation(path, i, q, site=None) :
+    # Column store with I and Q (<f4) columns; with numpy,
+    # constellation_metrics() are saved under 'results' and the slicer
+    # histograms under 'histogram' in meta.json. Returns (store, metrics
+    # or None).
+    store = ColumnStore.create(path, [('I', '<f4'), ('Q', '<f4')], site)
+    store.append({'I': i, 'Q': q})
+    try:
+        import numpy
+    except ImportError:
+        return store, None
+    metrics, histogram = constellation_metrics(i)
+    store.update_meta('results', **metrics)
+    store.update_meta('histogram', **histogram)
+    return store, metrics
+
+
+# ———————————————————————————————————————————————————
+#              CHANNEL TABLE
+# ———————————————————————————————————————————————————
+# An ETL channel table (C:\R_S\instr\catv\channel_tables\<name>.CHT)
+# is an MFC archive: a CPgEditChannelTable followed by CPgChannel
+# records. Each record holds
+#   '?' <int32 channel> <int32 1>
+#   <CString band: ff fe ff, length byte, UTF-16>
+#   '?' <int32 type, -1 for an unused slot> <int32>
+#   4 x (0x35 <double value> <double>): centre frequency, bandwidth,
+#   start and stop frequency, in Hz
+# The table is padded with unused slots, which are skipped.
+
+CHT_RECORD = re.compile(rb'\x3f(.{4})\x01\x00\x00\x00\xff\xfe\xff(.)', \
+    re.S)
+CHT_VALUES = ('centre', 'bandwidth', 'start', 'stop')
+
+class ChannelTable :
+    # Channel number -> centre, bandwidth, start and stop frequency (Hz),
+    # kept as one array of numbers and one of values, indexed by number
+
+    def __init__(self, name, channels) :
+        # channels: [(number, band, (centre, bandwidth, start, stop))]
+        self.name = name
+        channels = sorted(channels)
+        self.numbers = array.array('i', (c[0] for c in channels))
+        self.bands = [c[1] for c in channels]
+        self.values = array.array('d', \
+            (v for c in channels for v in c[2]))
+        self.index = {number : row for row, number in \
+            enumerate(self.numbers)}
+
+    def __len__(self) :
+        return len(self.numbers)
+
+    def __contains__(self, channel) :
+        try:
+            return channel_number(channel) in self.index
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self) :
+        return iter(self.numbers)
+
+    def lookup(self, channel) :
+        # {'channel', 'band', 'centre', ...}; KeyError if not in the table
+        row = self.index[channel_number(channel)]
+        values = self.values[4 * row : 4 * row + 4]
+        return dict(zip(CHT_VALUES, values), channel=self.numbers[row], \
+            band=self.bands[row])
+
+    def frequency(self, channel) :
+        return self.values[4 * self.index[channel_number(channel)]]
+
+    def bandwidth(self, channel) :
+        return self.values[4 * self.index[channel_number(channel)] + 1]
+
+    def describe(self) :
+        # e.g. '2-13 VHF, 14-36 UHF'
+        groups = []
+        for number, band in zip(self.numbers, self.bands) :
+            if groups and groups[-1][2] == band and \
+                groups[-1][1] == number - 1 :
+                groups[-1][1] = number
+            else:
+                groups.append([number, number, band])
+        return ', '.join((str(first) if first == last else \
+            str(first) + '-' + str(last)) + (' ' + band if band else '') \
+            for first, last, band in groups)
+
+def channel_number(channel) :
+    # '8', 8 or 8.0 -> 8
+    return int(float(channel))
+
+def parse_cht(data, name='') :
+    # .CHT bytes -> ChannelTable
+    channels = []
+    for match in CHT_RECORD.finditer(data) :
+        p = match.end()
+        length = match.group(2)[0]
+        band = data[p : p + 2 * length].decode('utf-16-le', 'replace')
+        p += 2 * length
+        if data[p : p + 1] != b'?' or \
+            struct.unpack_from('<i', data, p + 1)[0] == -1 :
+            continue
+        p += 9
+        values = []
+        while len(values) < len(CHT_VALUES) and data[p : p + 1] == b'\x35' :
+            values.append(struct.unpack_from('<d', data, p + 1)[0])
+            p += 17
+        if len(values) == len(CHT_VALUES) :
+            channels.append((struct.unpack('<i', match.group(1))[0], band, \
+                tuple(values)))
+    return ChannelTable(name, channels)
+
+def read_cht(path) :
+    with open(path, 'rb') as f :
+        data = f.read()
+    table = parse_cht(data, os.path.splitext(os.path.basename(path))[0])
+    if not len(table) :
+        raise ValueError(path + ': no channels found')
+    return table
+
+# ———————————————————————————————————————————————————
+#              GPS TRACK
+# ———————————————————————————————————————————————————
+# A GPS track is a column store of fixes (TRACK_COLUMNS), one per day.
+# Cell is the fix's geohash: latitude and longitude each quantized to
+# GEOHASH_BITS bits and interleaved, so nearby fixes share a cell. With
+# 16 bits a cell is about 300 m north-south and 600 m east-west at the
+# equator (460 m at 40 degrees). TrackIndex sorts the fixes of any
+# number of tracks by cell once; near() then looks up only the cells
+# that cover the circle and measures the distance to the fixes in them.
+# A circle covering more than TRACK_MAX_CELLS cells is answered by
+# comparing every fix with its bounding box instead.
+
+GEOHASH_BITS = 16
+TRACK_MAX_CELLS = 400
+EARTH_RADIUS = 6371008.8  # m, mean
+TRACK_COLUMNS = [('Time', '<f8'), ('Latitude', '<f8'), ('Longitude', '<f8'),
+    ('Altitude', '<f4'), ('Satellites', '<i1'), ('Cell', '<i8')]
+TRACK_UNITS = {'Time': 's since 1970 UTC', 'Latitude': 'deg',
+    'Longitude': 'deg', 'Altitude': 'm'}
+
+def spread_bits(x) :
+    # Move bit n of a 16-bit value to bit 2n; an int or a numpy array
+    x = (x | (x << 8)) & 0x00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F
+    x = (x | (x << 2)) & 0x33333333
+    return (x | (x << 1)) & 0x55555555
+
+def quantize(value, low, span) :
+    # low .. low + span -> 0 .. 2**GEOHASH_BITS - 1
+    top = (1 << GEOHASH_BITS) - 1
+    scaled = (value - low) / span * (1 << GEOHASH_BITS)
+    if hasattr(scaled, 'astype') :
+        import numpy
+        return numpy.clip(scaled, 0, top).astype('int64')
+    return min(max(int(scaled), 0), top)
+
+def geohash_cell(lat, lon) :
+    # Cell number: latitude on the odd bits, longitude on the even bits
+    return (spread_bits(quantize(lat, -90.0, 180.0)) << 1) | \
+        spread_bits(quantize(lon, -180.0, 360.0))
+
+def distance(lat, lon, lats, lons) :
+    # Great-circle distance in m from (lat, lon) to each of lats, lons
+    import numpy
+    p1, p2 = numpy.radians(lat), numpy.radians(lats)
+    dp, dl = p2 - p1, numpy.radians(lons - lon)
+    a = numpy.sin(dp / 2) ** 2 + \
+        numpy.cos(p1) * numpy.cos(p2) * numpy.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1)))
+
+def bounding_box(lat, lon, radius) :
+    # (south, north, west, east) of a circle, degrees
+    dlat = math.degrees(radius / EARTH_RADIUS)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+def open_track(path, site=None) :
+    return ColumnStore.open_or_create(path, TRACK_COLUMNS, site, TRACK_UNITS)
+
+class TrackIndex :
+
+    def __init__(self, stores) :
+        # stores: ColumnStores with TRACK_COLUMNS. The fixes are copied
+        # into memory in cell order.
+        import numpy
+        columns = [store.read() for store in stores if len(store)]
+        names = [name for name, dtype in TRACK_COLUMNS]
+        data = {name : numpy.concatenate([numpy.asarray(c[name]) \
+            for c in columns]) if columns else numpy.zeros(0) \
+            for name in names}
+        order = numpy.argsort(data['Cell'], kind='stable')
+        self.data = {name : values[order] for name, values in data.items()}
+
+    def __len__(self) :
+        return len(self.data['Cell'])
+
+    def cells(self, lat, lon, radius) :
+        # Cell numbers covering the circle, or None if there are more
+        # than TRACK_MAX_CELLS
+        import numpy
+        south, north, west, east = bounding_box(lat, lon, radius)
+        rows = numpy.arange(quantize(south, -90.0, 180.0), \
+            quantize(north, -90.0, 180.0) + 1, dtype='int64')
+        columns = numpy.arange(quantize(west, -180.0, 360.0), \
+            quantize(east, -180.0, 360.0) + 1, dtype='int64')
+        if len(rows) * len(columns) > TRACK_MAX_CELLS :
+            return None
+        return ((spread_bits(rows)[:, None] << 1) | \
+            spread_bits(columns)[None, :]).ravel()
+
+    def near(self, lat, lon, radius) :
+        # {column: values} of the fixes within radius m of (lat, lon), in
+        # time order
+        import numpy
+        cells = self.cells(lat, lon, radius)
+        if cells is None :
+            south, north, west, east = bounding_box(lat, lon, radius)
+            lats, lons = self.data['Latitude'], self.data['Longitude']
+            rows = numpy.nonzero((lats >= south) & (lats <= north) & \
+                (lons >= west) & (lons <= east))[0]
+        else:
+            first = numpy.searchsorted(self.data['Cell'], cells, 'left')
+            last = numpy.searchsorted(self.data['Cell'], cells, 'right')
+            rows = numpy.concatenate([numpy.arange(a, b) for a, b in \
+                zip(first, last) if b > a] or [numpy.zeros(0, dtype=int)])
+        rows = rows[distance(lat, lon, self.data['Latitude'][rows], \
+            self.data['Longitude'][rows]) <= radius]
+        rows = rows[numpy.argsort(self.data['Time'][rows], kind='stable')]
+        return {name : values[rows] for name, values in self.data.items()}
+
+
+# ———————————————————————————————————————————————————
+#              CHECKLIST
+# ———————————————————————————————————————————————————
+# The site checklist (fsCapture.py, SITE CHECKLIST menu) is the first
+# sheet of the template workbook with the visit's values in the cells of
+# CHECKLIST_FIELDS. A visit is a dict keyed like fsCapture's globals
+# (_callsign, _channel, ..., _frequency in Hz) plus 'time', a datetime.
+# The template is parsed once per process (checklist_template(), keyed
+# by path and modification time) and kept in memory; each checklist
+# sets the cells and saves the workbook, which takes about half as long
+# as loading the template again. openpyxl's write-only workbook was
+# slower still: it registers the style of every cell anew for each
+# file. Without a template the labels of CHECKLIST_LABELS are used.
+# "python fsData.py checklists" makes the checklists of many visits in
+# one pass, from CSV files with one visit per row (columns named like
+# the visit's keys, time as YYYY-MM-DD HH:MM:SS) or from earlier
+# checklists, e.g. after the template has changed. The visits are shared
+# among a pool of processes.
+
+CHECKLIST_FIELDS = [('B1', '_callsign'), ('B2', '_channel'),
+    ('B3', '_radial'), ('B4', '_dist'), ('B5', '_lat'), ('B6', '_lon'),
+    ('B7', '_altitude'), ('B8', '_RevRadial'), ('B14', '_truckheading'),
+    ('B19', '_temperature'), ('B20', '_wind'), ('B21', '_skycond'),
+    ('B22', '_precip'), ('B23', '_techname'), ('D14', '_AzToTx'),
+    ('D17', '_antdirup'), ('D18', '_antdirdown'), ('D19', '_clutter'),
+    ('B32', '_etlIDN')]
+# Date, time and frequency (MHz) cells, and labels written over the
+# template's
+CHECKLIST_DATE, CHECKLIST_TIME, CHECKLIST_MHZ = 'B11', 'B12', 'B15'
+CHECKLIST_OVERRIDES = {'C19': 'Clutter category', 'C20': '', 'C21': '',
+    'A32': 'Test instrument:'}
+CHECKLIST_LABELS = {'A1': 'Station:', 'A2': 'TV Channel Number',
+    'A3': 'Radial:', 'A4': 'Measurement', 'A5': 'Lat:', 'A6': 'Lon:',
+    'A7': 'Site Elev (m)', 'A8': 'Heading to Tx (Calc):',
+    'A9': 'Frequency (MHz):', 'A10': '1/4 Wave', 'A11': 'Date:',
+    'A12': 'Time:', 'A13': 'MEASUREMENTS', 'A14': 'Enter Truck Heading:',
+    'A15': 'Confirm Freq:', 'A16': 'Confirm Ant. Length:',
+    'A17': 'Location A', 'A18': 'Location B', 'A19': 'Temperature',
+    'A20': 'Wind', 'A21': 'Sky Conditions', 'A22': 'Precip',
+    'A23': 'Technician', 'C14': 'Calculated Point AZ:',
+    'D16': 'Actual Antenna Dir.', 'C17': "Mast 30'", 'C18': 'Mast Stowed'}
+class ChecklistTemplate :
+
+    def __init__(self, path=None) :
+        # path: template workbook, or None for CHECKLIST_LABELS
+        from openpyxl import Workbook, load_workbook
+        self.path = path
+        if path is None :
+            self.workbook = Workbook()
+            self.workbook.active.title = 'Sheet1'
+            for coordinate, label in CHECKLIST_LABELS.items() :
+                self.workbook.active[coordinate] = label
+        else:
+            self.workbook = load_workbook(filename=path)
+        self.sheet = self.workbook.active
+
+    def write(self, path, values) :
+        # Save the template with values ({coordinate: value}) to path.
+        # Every checklist sets the same cells, so none of the previous
+        # checklist's values are left in the workbook.
+        for coordinate, value in values.items() :
+            self.sheet[coordinate] = value
+        self.workbook.save(path)
+
+TEMPLATES = {}  # (path, modification time) -> ChecklistTemplate
+
+def checklist_template(path=None) :
+    key = (path, os.path.getmtime(path) if path else 0)
+    if key not in TEMPLATES :
+        TEMPLATES[key] = ChecklistTemplate(path)
+    return TEMPLATES[key]
+
+def checklist_cells(visit) :
+    # {coordinate: value} of a visit
+    values = dict(CHECKLIST_OVERRIDES)
+    for coordinate, key in CHECKLIST_FIELDS :
+        values[coordinate] = visit.get(key, '')
+    values['B2'] = int(visit['_channel'])
+    values[CHECKLIST_DATE] = visit['time'].strftime('%m/%d/%Y')
+    values[CHECKLIST_TIME] = visit['time'].strftime('%H:%M:%S')
+    values[CHECKLIST_MHZ] = float(visit.get('_frequency') or 0) / 1e6
+    return values
+
+def checklist_path(folder, visit) :
+    # <folder>\XXXX\20200416_XXXX_RxxxMxx\Site Info\
+    #   XXXX_RxxxMxx_20200416_101500_Checklist.xlsx
+    callsign = visit['_callsign']
+    measpt = 'R' + str(visit['_radial']) + 'M' + str(visit['_dist'])
+    day = visit['time'].strftime('%Y%m%d')
+    return os.path.join(folder, callsign, day + '_' + callsign + '_' + \
+        measpt, 'Site Info', callsign + '_' + measpt + '_' + day + '_' + \
+        visit['time'].strftime('%H%M%S') + '_Checklist.xlsx')
+
+def write_checklist(folder, visit, template=None) :
+    # Checklist of a visit under folder (with an empty Photos folder next
+    # to it); returns its path
+    path = checklist_path(folder, visit)
+    os.makedirs(os.path.join(os.path.dirname(path), 'Photos'), exist_ok=True)
+    values = checklist_cells(visit)
+    if template is None :
+        values['B9'] = values[CHECKLIST_MHZ]
+    checklist_template(template).write(path, values)
+    return path
+
+def read_checklist(path) :
+    # The visit of an earlier checklist
+    from openpyxl import load_workbook
+    from openpyxl.utils.cell import coordinate_to_tuple
+    workbook = load_workbook(filename=path, read_only=True)
+    # Looking cells up one by one rereads the sheet each time
+    rows = list(workbook.active.iter_rows(max_row=40, values_only=True))
+    workbook.close()
+    def cell(coordinate) :
+        r, c = coordinate_to_tuple(coordinate)
+        return rows[r - 1][c - 1] if r <= len(rows) and \
+            c <= len(rows[r - 1]) else None
+    visit = {key : cell(coordinate) for coordinate, key in CHECKLIST_FIELDS}
+    visit['time'] = datetime.datetime.strptime(str(cell(CHECKLIST_DATE)) + \
+        ' ' + str(cell(CHECKLIST_TIME)), '%m/%d/%Y %H:%M:%S')
+    visit['_frequency'] = '%.0f' % (float(cell(CHECKLIST_MHZ) or 0) * 1e6)
+    return {key : '' if value is None else value \
+        for key, value in visit.items()}
+
+def read_visits(path) :
+    # Visits of a CSV file, one per row
+    with open(path, newline='') as f :
+        for row in csv.DictReader(f) :
+            row['time'] = datetime.datetime.strptime(row['time'], \
+                '%Y-%m-%d %H:%M:%S') if row.get('time') else \
+                datetime.datetime.now()
+            yield row
+
+def checklist_job(folder, template, source) :
+    # One checklist of the bulk run: source is a visit or the path of an
+    # earlier checklist. Returns (path, error).
+    try:
+        visit = read_checklist(source) if isinstance(source, str) \
+            else source
+        return write_checklist(folder, visit, template), ''
+    except Exception as e:
+        return '', (source if isinstance(source, str) else \
+            visit.get('_callsign', '?')) + ': ' + str(e)
+
+def write_checklists(folder, sources, template=None, jobs=None) :
+    # Checklists of many visits (see checklist_job()) in jobs processes;
+    # yields (path, error) in the order of sources
+    import concurrent.futures
+    import functools
+    sources = list(sources)
+    jobs = min(jobs or os.cpu_count() or 1, len(sources))
+    job = functools.partial(checklist_job, folder, template)
+    if jobs <= 1 :
+        yield from map(job, sources)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, \
+        initializer=checklist_template, initargs=(template,)) as pool :
+        yield from pool.map(job, sources, \
+            chunksize=max(1, len(sources) // (jobs * 4)))
+
+
+# ———————————————————————————————————————————————————
+#              SCPI TRACE
+# ———————————————————————————————————————————————————
+# With [Trace] _trace = on in its INI file, fsCapture.py records every
+# call it makes on the VISA link to fsCapture_<YYYYMMDD>_<HHMMSS>.fst
+# in its log folder; a 'REPLAY::<trace file>' IP address plays the
+# trace back instead of talking to an ETL. A trace is gzip-compressed
+# JSON, one object per line. The first line is the header (format,
+# resource, start time, ...), then one line per call:
+#   t   start, seconds after the header's start
+#   d   duration in seconds
+#   th  name of the thread that made the call
+#   m   method: write, query, read, read_bytes or clear
+#   a   the command, the byte count of read_bytes, or null
+#   r   the reply (bytes as {"b64": ...}); write returns the bytes sent
+#   e   error instead of a reply: "timeout", "visa:<status code>" or
+#       "link:<message>" (the link went away)
+# The file is flushed every TRACE_FLUSH seconds, so a session that ends
+# abruptly keeps all but the last few calls.
+
+TRACE_EXT = '.fst'
+TRACE_FORMAT = 1
+TRACE_FLUSH = 2.0  # s
+
+def trace_reply(value) :
+    # A reply as it is stored in a trace
+    if isinstance(value, (bytes, bytearray)) :
+        return {'b64': base64.b64encode(value).decode('ascii')}
+    return value
+
+def trace_value(value) :
+    # The reply of a trace record
+    if isinstance(value, dict) and 'b64' in value :
+        return base64.b64decode(value['b64'])
+    return value
+
+class TraceWriter :
+
+    def __init__(self, path, header) :
+        self.path = path
+        self.count = 0
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.file.write(json.dumps(dict(header, format=TRACE_FORMAT)) + '\n')
+        self.flushed = time.monotonic()
+
+    def write(self, record) :
+        line = json.dumps(record, separators=(',', ':'),
+            default=str) + '\n'
+        with self.lock :
+            self.file.write(line)
+            self.count += 1
+            if time.monotonic() - self.flushed > TRACE_FLUSH :
+                self.file.flush()
+                self.flushed = time.monotonic()
+
+    def close(self) :
+        with self.lock :
+            self.file.close()
+
+def read_trace(path) :
+    # (header, [record]). A file cut off by a crash is read up to the
+    # last complete line.
+    header, records = None, []
+    with gzip.open(path, 'rt', encoding='utf-8') as f :
+        try:
+            for line in f :
+                if not line.endswith('\n') :
+                    break
+                if header is None :
+                    header = json.loads(line)
+                else:
+                    records.append(json.loads(line))
+        except (EOFError, zlib.error) :
+            pass
+    if header is None or header.get('format') != TRACE_FORMAT :
+        raise ValueError(path + ': not an fsCapture trace')
+    return header, records
+
+def trace_headers(record) :
+    # 'INST CATV;*WAI;:FREQ:CHAN 8' -> 'INST;*WAI;FREQ:CHAN'
+    if record['m'] not in ('write', 'query') :
+        return '(' + record['m'] + ')'
+    return ';'.join(c.strip().lstrip(':').split(' ')[0] \
+        for c in record['a'].split(';') if c.strip())
+
+
+# ———————————————————————————————————————————————————
+#              MAIN
+# ———————————————————————————————————————————————————
+
+def expand(patterns) :
+    for pattern in patterns :
+        yield from sorted(glob.glob(pattern)) or [pattern]
+
+def cmd_convert(args) :
+    for path in expand(args.files) :
+        try:
+            store = convert_mlog(path)
+            print(store.path + ': ' + str(len(store)) + ' rows')
+        except (OSError, ValueError) as e:
+            print('!!! ' + path + ': ' + str(e) + ' !!!')
+
+def cmd_stats(args) :
+    # Statistics for each file; --summary collects them in one CSV
+    t0 = time.perf_counter()
+    summary, files = [], 0
+    for path in expand(args.files) :
+        try:
+            rows = mlog_stats(path)
+        except (OSError, ValueError) as e:
+            print('!!! ' + path + ': ' + str(e) + ' !!!')
+            continue
+        files += 1
+        site = dict(site_from_filename(path), file=os.path.basename(path))
+        summary.extend(dict(site, **row) for row in rows)
+        if not args.quiet :
+            print(path + ': ' + '; '.join(row['Quantity'] + ' median ' + \
+                ('%.2f' % row['Median'] if 'Median' in row else '-') + \
+                ' ' + row['Unit'] for row in rows))
+    if args.summary :
+        write_stats(args.summary, summary,
+            extra_fields=['file', 'callsign', 'measpt', 'test'])
+    print('%d file(s) in %.2f s' % (files, time.perf_counter() - t0))
+
+def cmd_info(args) :
+    for path in expand(args.stores) :
+        store = ColumnStore(path)
+        print(store.path + ': ' + str(len(store)) + ' rows')
+        print('   site: ' + json.dumps(store.site))
+        for name, dtype in store.meta['columns'] :
+            unit = store.meta['units'].get(name, '')
+            print('   %-12s %-4s %s' % (name, dtype, unit))
+        if 'results' in store.meta :
+            print('   results: ' + json.dumps(store.meta['results']))
+
+def cmd_channels(args) :
+    for path in args.tables :
+        table = read_cht(path)
+        print(table.name + ': ' + str(len(table)) + ' channels, ' + \
+            table.describe())
+        for number in table :
+            channel = table.lookup(number)
+            print('   %4d  %-4s %10.3f MHz  %6.3f MHz' % (number, \
+                channel['band'], channel['centre'] / 1e6, \
+                channel['bandwidth'] / 1e6))
+
+def cmd_near(args) :
+    t0 = time.perf_counter()
+    index = TrackIndex([ColumnStore(path) for path in expand(args.tracks)])
+    t1 = time.perf_counter()
+    fixes = index.near(args.latitude, args.longitude, args.radius)
+    t2 = time.perf_counter()
+    print('%d of %d fixes within %g m (index %.0f ms, query %.1f ms)' % \
+        (len(fixes['Time']), len(index), args.radius, (t1 - t0) * 1000, \
+        (t2 - t1) * 1000))
+    if args.csv :
+        names = [name for name, dtype in TRACK_COLUMNS]
+        with open(args.csv, 'w', newline='') as f :
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(fixes[name].tolist() for name in names)))
+    elif len(fixes['Time']) :
+        first, last = fixes['Time'][0], fixes['Time'][-1]
+        print('   ' + datetime.datetime.fromtimestamp(first).isoformat(' ', \
+            'seconds') + ' to ' + datetime.datetime.fromtimestamp(last).\
+            isoformat(' ', 'seconds'))
+
+def cmd_checklists(args) :
+    t0 = time.perf_counter()
+    sources = []
+    for path in expand(args.visits) :
+        if path.lower().endswith('.csv') :
+            sources.extend(read_visits(path))
+        else:
+            sources.append(path)
+    made = 0
+    for path, error in write_checklists(args.out, sources, args.template, \
+        args.jobs) :
+        if error :
+            print('!!! ' + error + ' !!!')
+        else:
+            made += 1
+            if not args.quiet :
+                print(path)
+    print('%d of %d checklist(s) in %.2f s' % (made, len(sources), \
+        time.perf_counter() - t0))
+
+def cmd_trace(args) :
+    # Where a recorded session spent its time: on the link, by command
+    # and by thread, and the longest gaps between calls of the main
+    # thread (the script's own work, waits and the operator)
+    header, records = read_trace(args.trace)
+    if not records :
+        print(args.trace + ': no calls')
+        return
+    length = max(r['t'] + r['d'] for r in records)
+    busy = sum(r['d'] for r in records)
+    print('%s: %s, %s, %d calls' % (args.trace, header.get('resource', ''), \
+        header.get('start', ''), len(records)))
+    print('   %.1f s session, %.1f s on the link (%.0f %%), %d errors' % \
+        (length, busy, 100 * busy / length if length else 0, \
+        sum(1 for r in records if r.get('e'))))
+    threads = {}
+    for r in records :
+        threads[r['th']] = threads.get(r['th'], 0) + r['d']
+    print('   by thread: ' + ', '.join('%s %.1f s' % kv for kv in \
+        sorted(threads.items(), key=lambda kv : -kv[1])))
+    commands = {}
+    for r in records :
+        key = trace_headers(r)
+        count, total, longest = commands.get(key, (0, 0.0, 0.0))
+        commands[key] = (count + 1, total + r['d'], max(longest, r['d']))
+    print('   %6s %9s %9s  command' % ('calls', 'total s', 'max ms'))
+    for key, (count, total, longest) in sorted(commands.items(), \
+        key=lambda kv : -kv[1][1])[:args.top] :
+        print('   %6d %9.2f %9.0f  %s' % (count, total, longest * 1000, key))
+    main = [r for r in records if r['th'] == 'MainThread']
+    gaps = sorted(((b['t'] - a['t'] - a['d'], a, b) for a, b in \
+        zip(main, main[1:])), key=lambda g : -g[0])[:args.top]
+    print('   longest gaps between calls of the main thread:')
+    for gap, before, after in gaps :
+        print('   %8.1f s at %7.1f s  after %s, before %s' % (gap, \
+            before['t'] + before['d'], trace_headers(before), \
+            trace_headers(after)))
+
+def arg_parser() :
+    parser = argparse.ArgumentParser(
+        description='fsCapture measurement data tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert',
+        help='convert Measure Log CSV files to column stores')
+    convert.add_argument('files', nargs='+')
+    convert.set_defaults(run=cmd_convert)
+    statistics = commands.add_parser('stats',
+        help='level and MER statistics of Measure Log CSV files')
+    statistics.add_argument('files', nargs='+')
+    statistics.add_argument('--summary',
+        help='also write all results to this CSV')
+    statistics.add_argument('--quiet', action='store_true')
+    statistics.set_defaults(run=cmd_stats)
+    info = commands.add_parser('info', help='describe column stores')
+    info.add_argument('stores', nargs='+')
+    info.set_defaults(run=cmd_info)
+    channels = commands.add_parser('channels',
+        help='list the channels of ETL channel tables (.CHT)')
+    channels.add_argument('tables', nargs='+')
+    channels.set_defaults(run=cmd_channels)
+    near = commands.add_parser('near',
+        help='GPS fixes of tracks within a distance of a point')
+    near.add_argument('latitude', type=float)
+    near.add_argument('longitude', type=float)
+    near.add_argument('radius', type=float, help='m')
+    near.add_argument('tracks', nargs='+')
+    near.add_argument('--csv', help='write the fixes to this file')
+    near.set_defaults(run=cmd_near)
+    checklists = commands.add_parser('checklists',
+        help='site checklists of many visits (CSV files or checklists)')
+    checklists.add_argument('visits', nargs='+')
+    checklists.add_argument('--template', help='template workbook')
+    checklists.add_argument('--out', default='.',
+        help='results folder (default: the current folder)')
+    checklists.add_argument('--jobs', type=int,
+        help='processes (default: one per CPU)')
+    checklists.add_argument('--quiet', action='store_true')
+    checklists.set_defaults(run=cmd_checklists)
+    trace = commands.add_parser('trace',
+        help='where a session recorded by fsCapture spent its time')
+    trace.add_argument('trace')
+    trace.add_argument('--top', type=int, default=10,
+        help='commands and gaps to list')
+    trace.set_defaults(run=cmd_trace)
+    return parser
+
+def main() :
+    args = arg_parser().parse_args()
+    args.run(args)
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,458 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Campaign report over a Measurement_results tree written by fsCapture.py:
+# one CSV per call sign with a line per measurement point and test
+# position — screen shots and the ones missing, level and MER statistics
+# of the Measure Log captures, loss of lock and the site checklist.
+
+# This script is:
+# C:\Shared\batch_files\fsReport.py
+
+# Examples:
+#   python fsReport.py Z:\Measurement_results
+#   python fsReport.py Z:\Measurement_results --callsign WBEN --out C:\Reports
+#   python fsReport.py Z:\Measurement_results --locktimes fsCapture_locktimes.csv
+
+# The tree is
+#   <root>\<callsign>\<YYYYMMDD>_<callsign>_<MEASPT>\<test>\
+#       <callsign>_<MEASPT>_<test>_<YYYYMMDD>_<HHMMSS>_<measurement>.PNG
+#       <callsign>_<MEASPT>_<test>_<YYYYMMDD>_<HHMMSS>_capture.CSV
+#   <root>\<callsign>\<YYYYMMDD>_<callsign>_<MEASPT>\Site Info\
+#       <callsign>_<MEASPT>_<YYYYMMDD>_<HHMMSS>_Checklist.xlsx
+# A point is a date, MEASPT and test position of a call sign. The
+# folders are listed by SCAN_THREADS threads at once (a share such as Z:
+# is slow to answer one listing at a time), the captures and checklists
+# are parsed in a pool of processes, and what was parsed is kept in
+# CACHE_FILE so that the next report parses only new or changed files.
+# The report is written to <callsign>_campaign.CSV in each call sign's
+# folder, or in --out.
+
+'''
+MIT License
+
+Copyright (c) 2020 John Neuhaus, jneuhausATosborn-engDOTcom
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import re
+import time
+
+import fsData
+
+# Screen shots of every point: the measurements of fsCapture.py's
+# CAPTURE_SEQUENCE
+SCREENSHOTS = ['Overview', 'Spectrum', 'Constellation', 'MER', 'Eye', 'Echo']
+SCREENSHOT_EXTS = ('.PNG', '.BMP', '.JPG', '.GIF', '.WMF')
+SCAN_THREADS = 16
+CACHE_FILE = 'fsReport_cache.json'
+REPORT_SUFFIX = '_campaign.CSV'
+HIST_STEP = 0.1  # dB; resolution of the pooled statistics of a point
+
+# <callsign>_<MEASPT>_<test>_<YYYYMMDD>_<HHMMSS>_<name>.<ext>
+RESULT_NAME = re.compile(r'^([^_]+)_([^_]+)_([^_]+)_(\d{8})_(\d{6})_'
+    r'(.+)\.([^.]+)$')
+# <callsign>_<MEASPT>_<YYYYMMDD>_<HHMMSS>_Checklist.xlsx
+CHECKLIST_NAME = re.compile(r'^([^_]+)_([^_]+)_(\d{8})_(\d{6})_'
+    r'Checklist\.xlsx$', re.I)
+
+
+# ———————————————————————————————————————————————————
+#              SCAN
+# ———————————————————————————————————————————————————
+
+def list_dir(path) :
+    # (subfolders, [(path, size, modification time)]) of one folder.
+    # Column stores (.fsd folders) are data, not folders to look into.
+    folders, files = [], []
+    try:
+        with os.scandir(path) as entries :
+            for entry in entries :
+                if entry.is_dir(follow_symlinks=False) :
+                    if not entry.name.endswith(fsData.STORE_EXT) :
+                        folders.append(entry.path)
+                elif entry.is_file() :
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+    except OSError as e:
+        print('!!! ' + path + ': ' + str(e) + ' !!!')
+    return folders, files
+
+def scan(roots, threads=SCAN_THREADS) :
+    # Every file under roots. Each folder listed is handed to the pool
+    # as soon as its parent has been listed.
+    files = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool :
+        pending = {pool.submit(list_dir, root) for root in roots}
+        while pending :
+            done, pending = concurrent.futures.wait(pending, \
+                return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done :
+                folders, found = future.result()
+                files.extend(found)
+                pending.update(pool.submit(list_dir, folder) \
+                    for folder in folders)
+    return files
+
+def classify(path) :
+    # (kind, callsign, date, measpt, test, name) of a result file, or
+    # None. kind is 'screenshot', 'capture' or 'checklist'.
+    name = os.path.basename(path)
+    m = CHECKLIST_NAME.match(name)
+    if m :
+        callsign, measpt, date = m.group(1, 2, 3)
+        return 'checklist', callsign, date, measpt, '', 'Checklist'
+    m = RESULT_NAME.match(name)
+    if not m :
+        return None
+    callsign, measpt, test, date, hhmmss, what, ext = m.groups()
+    if what == 'capture' and ext.upper() == 'CSV' :
+        return 'capture', callsign, date, measpt, test, what
+    if '.' + ext.upper() in SCREENSHOT_EXTS :
+        return 'screenshot', callsign, date, measpt, test, what
+    return None
+
+
+# ———————————————————————————————————————————————————
+#              PARSE
+# ———————————————————————————————————————————————————
+# Runs in the worker processes. Each capture is reduced to histograms of
+# its level and MER (HIST_STEP wide bins, only the bins that occur) with
+# the exact sum, minimum and maximum, so that the captures of a point
+# can be pooled without sending their rows back.
+
+def histogram(values) :
+    import numpy
+    bins, counts = numpy.unique(numpy.round(values / HIST_STEP).\
+        astype('int64'), return_counts=True)
+    return {'bins': bins.tolist(), 'counts': counts.tolist(),
+        'sum': float(values.sum()), 'min': float(values.min()),
+        'max': float(values.max())}
+
+def load_capture(path) :
+    # (units, {column: values}): the column store of "fsData.py convert"
+    # if it is newer than the CSV, otherwise the CSV
+    store = fsData.store_path(path)
+    if os.path.isdir(store) and \
+        os.path.getmtime(store) >= os.path.getmtime(path) :
+        store = fsData.ColumnStore(store)
+        return store.meta['units'], store.read()
+    info, units, data = fsData.load_mlog(path)
+    return units, data
+
+def parse_capture(path) :
+    import numpy
+    units, data = load_capture(path)
+    result = {'rows': len(data['Time']), 'units': units}
+    synced = None
+    if 'Sync' in data :
+        synced = numpy.asarray(data['Sync']) == 1
+        result['unsynced'] = int((~synced).sum())
+        result['drops'] = int((synced[:-1] & ~synced[1:]).sum())
+    for name in fsData.STATS_COLUMNS :
+        if name not in data :
+            continue
+        values = numpy.asarray(data[name], dtype=float)
+        if synced is not None and name in fsData.STATS_SYNCED_ONLY :
+            values = values[synced]
+        values = values[numpy.isfinite(values)]
+        if len(values) :
+            result[name] = histogram(values)
+    return result
+
+def parse_checklist(path) :
+    visit = fsData.read_checklist(path)
+    return {'time': visit['time'].isoformat(' '),
+        'technician': str(visit['_techname']),
+        'latitude': str(visit['_lat']).strip(),
+        'longitude': str(visit['_lon']).strip()}
+
+PARSERS = {'capture': parse_capture, 'checklist': parse_checklist}
+
+def parse_file(job) :
+    # job: (kind, path). Returns (path, result, error).
+    kind, path = job
+    try:
+        return path, PARSERS[kind](path), ''
+    except Exception as e:
+        return path, None, str(e)
+
+def parse_files(jobs, processes=None) :
+    # Yields parse_file() of each job, in processes worker processes
+    jobs = list(jobs)
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    if processes <= 1 :
+        yield from map(parse_file, jobs)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as \
+        pool :
+        yield from pool.map(parse_file, jobs, \
+            chunksize=max(1, len(jobs) // (processes * 8)))
+
+def load_cache(path) :
+    # path -> [size, modification time, parse_file() result]
+    try:
+        with open(path) as f :
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(path, cache) :
+    # Compact: with indents the file takes longer to write than the
+    # report does
+    with open(path + '.tmp', 'w') as f :
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+
+
+# ———————————————————————————————————————————————————
+#              POINTS
+# ———————————————————————————————————————————————————
+
+REPORT_FIELDS = ['Date', 'MeasPt', 'Test', 'Screenshots', 'Missing',
+    'Captures', 'Samples'] + [name + ' ' + field \
+    for name in fsData.STATS_COLUMNS \
+    for field in ['Unit', 'Mean', 'Median', 'Min', 'Max'] + \
+    ['L' + str(p) for p in fsData.EXCEEDED]] + \
+    ['Unsynced', 'Lock losses', 'Lock timeouts', 'Checklist', 'Technician',
+    'Latitude', 'Longitude', 'Errors']
+
+class Point :
+
+    def __init__(self, date, measpt, test) :
+        self.date, self.measpt, self.test = date, measpt, test
+        self.screenshots = set()
+        self.captures = []   # parse_capture() results
+        self.checklist = None
+        self.timeouts = 0
+        self.errors = 0
+
+    def pooled(self, name) :
+        # fsData.stats() fields of one quantity over all captures
+        import numpy
+        parts = [c[name] for c in self.captures if name in c]
+        if not parts :
+            return {}
+        bins = numpy.concatenate([p['bins'] for p in parts])
+        counts = numpy.concatenate([p['counts'] for p in parts])
+        order = numpy.argsort(bins, kind='stable')
+        bins, cumulative = bins[order], numpy.cumsum(counts[order])
+        total = cumulative[-1]
+        def percentile(p) :
+            i = numpy.searchsorted(cumulative, p / 100 * total)
+            return float(bins[min(i, len(bins) - 1)] * HIST_STEP)
+        row = {'Unit': next((c['units'].get(name, '') \
+            for c in self.captures if name in c), ''),
+            'Mean': sum(p['sum'] for p in parts) / total,
+            'Median': percentile(50),
+            'Min': min(p['min'] for p in parts),
+            'Max': max(p['max'] for p in parts)}
+        row.update({'L' + str(p) : percentile(100 - p) \
+            for p in fsData.EXCEEDED})
+        return {name + ' ' + field : value for field, value in row.items()}
+
+    def row(self, expected) :
+        missing = [name for name in expected if name not in self.screenshots]
+        row = {'Date': self.date, 'MeasPt': self.measpt, 'Test': self.test,
+            'Screenshots': len(self.screenshots),
+            'Missing': ' '.join(missing),
+            'Captures': len(self.captures),
+            'Samples': sum(c['rows'] for c in self.captures),
+            'Unsynced': sum(c.get('unsynced', 0) for c in self.captures),
+            'Lock losses': sum(c.get('drops', 0) for c in self.captures),
+            'Lock timeouts': self.timeouts,
+            'Checklist': 'yes' if self.checklist else 'no',
+            'Errors': self.errors}
+        for name in fsData.STATS_COLUMNS :
+            row.update(self.pooled(name))
+        if self.checklist :
+            row.update({'Technician': self.checklist['technician'],
+                'Latitude': self.checklist['latitude'],
+                'Longitude': self.checklist['longitude']})
+        return row
+
+def measpt_order(measpt) :
+    # By radial, then distance: R90M5 before R90M10
+    numbers = [float(n) for n in re.findall(r'[\d.]+', measpt) \
+        if n.strip('.')]
+    return numbers, measpt
+
+def read_lock_timeouts(path) :
+    # (callsign, date, measpt, test) -> demodulator lock timeouts, from
+    # fsCapture.py's LOCK_STATS_FILE
+    timeouts = {}
+    with open(path, newline='') as f :
+        for row in csv.DictReader(f) :
+            if row.get('Locked') == '0' :
+                key = (row['Callsign'], row['Time'][:10].replace('-', ''), \
+                    row['MeasPt'], row['Test'])
+                timeouts[key] = timeouts.get(key, 0) + 1
+    return timeouts
+
+
+# ———————————————————————————————————————————————————
+#              REPORT
+# ———————————————————————————————————————————————————
+
+def write_report(path, rows) :
+    # One line per point; numbers to 2 decimals
+    with open(path + '.tmp', 'w', newline='') as f :
+        writer = csv.DictWriter(f, REPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows :
+            writer.writerow({k : ('%.2f' % v if isinstance(v, float) \
+                else v) for k, v in row.items()})
+    os.replace(path + '.tmp', path)
+
+def campaign(root, callsigns=None, out=None, expected=SCREENSHOTS, \
+    locktimes=None, processes=None, threads=SCAN_THREADS, use_cache=True) :
+    # Writes the report of each call sign; returns
+    # {callsign: (report path, [rows])}
+    t0 = time.perf_counter()
+    roots = [os.path.join(root, c) for c in callsigns] if callsigns \
+        else [root]
+    files = scan(roots, threads)
+    t1 = time.perf_counter()
+    print('%d file(s) in %.2f s' % (len(files), t1 - t0))
+
+    cache_path = os.path.join(out or root, CACHE_FILE)
+    cached = load_cache(cache_path) if use_cache else {}
+    cache, results, jobs, found = {}, {}, [], []
+    for path, size, mtime in files :
+        kind = classify(path)
+        if kind is None :
+            continue
+        found.append((path, kind))
+        if kind[0] in PARSERS :
+            entry = cached.get(path)
+            if entry and entry[0] == size and entry[1] == mtime :
+                results[path] = entry[2]
+                cache[path] = entry
+            else:
+                jobs.append(((kind[0], path), size, mtime))
+    for (path, result, error), (job, size, mtime) in \
+        zip(parse_files([job for job, size, mtime in jobs], processes), jobs) :
+        if error :
+            print('!!! ' + path + ': ' + error + ' !!!')
+            results[path] = None
+        else:
+            results[path] = result
+            cache[path] = [size, mtime, result]
+    t2 = time.perf_counter()
+    print('%d capture(s) and checklist(s) parsed in %.2f s, %d from %s' % \
+        (len(jobs), t2 - t1, len(results) - len(jobs), CACHE_FILE))
+
+    timeouts = read_lock_timeouts(locktimes) if locktimes else {}
+    points, checklists = {}, {}
+    for path, (kind, callsign, date, measpt, test, name) in found :
+        if kind == 'checklist' :
+            # The latest checklist of a visit goes with all its tests
+            result = results.get(path)
+            key = (callsign, date, measpt)
+            if result and (key not in checklists or \
+                result['time'] > checklists[key]['time']) :
+                checklists[key] = result
+            continue
+        point = points.get((callsign, date, measpt, test))
+        if point is None :
+            point = points[(callsign, date, measpt, test)] = \
+                Point(date, measpt, test)
+        if kind == 'screenshot' :
+            point.screenshots.add(name)
+        elif results.get(path) is None :
+            point.errors += 1
+        else:
+            point.captures.append(results[path])
+    visits = {}
+    for key, point in points.items() :
+        visits.setdefault(key[:3], []).append(point)
+    for (callsign, date, measpt), checklist in checklists.items() :
+        tests = visits.get((callsign, date, measpt))
+        if not tests :  # Checklist only: nothing was measured
+            tests = [points.setdefault((callsign, date, measpt, ''), \
+                Point(date, measpt, ''))]
+        for point in tests :
+            point.checklist = checklist
+    for key, count in timeouts.items() :
+        if key in points :
+            points[key].timeouts = count
+
+    reports, by_callsign = {}, {}
+    for key, point in points.items() :
+        by_callsign.setdefault(key[0], []).append(point)
+    for callsign in sorted(by_callsign) :
+        ordered = sorted(by_callsign[callsign], key=lambda p : \
+            (p.date, measpt_order(p.measpt), p.test))
+        rows = [p.row(expected) for p in ordered]
+        folder = out or os.path.join(root, callsign)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, callsign + REPORT_SUFFIX)
+        write_report(path, rows)
+        reports[callsign] = (path, rows)
+    if use_cache and (jobs or len(cache) != len(cached)) :
+        try:
+            save_cache(cache_path, cache)
+        except OSError as e:
+            print('!!! Could not write ' + cache_path + ': ' + str(e) + \
+                ' !!!')
+    print('Reports written in %.2f s' % (time.perf_counter() - t2))
+    return reports
+
+
+# ———————————————————————————————————————————————————
+#              MAIN
+# ———————————————————————————————————————————————————
+
+def arg_parser() :
+    parser = argparse.ArgumentParser(
+        description='Campaign report of a Measurement_results tree')
+    parser.add_argument('root', help='Measurement_results folder')
+    parser.add_argument('--callsign', nargs='+',
+        help='only these call signs (default: all)')
+    parser.add_argument('--out',
+        help='folder for the reports (default: each call sign\'s folder)')
+    parser.add_argument('--expect', nargs='+', default=SCREENSHOTS,
+        help='screen shots every point should have')
+    parser.add_argument('--locktimes',
+        help='fsCapture_locktimes.csv, for demodulator lock timeouts')
+    parser.add_argument('--jobs', type=int,
+        help='processes parsing files (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=SCAN_THREADS,
+        help='folders listed at once')
+    parser.add_argument('--no-cache', action='store_true',
+        help='parse every file again')
+    return parser
+
+def main() :
+    args = arg_parser().parse_args()
+    reports = campaign(args.root, args.callsign, args.out, args.expect,
+        args.locktimes, args.jobs, args.threads, not args.no_cache)
+    for callsign, (path, rows) in reports.items() :
+        missing = sum(len(row['Missing'].split()) for row in rows)
+        print('%s: %d point(s), %d screen shot(s) missing, %d lock '
+            'loss(es) -> %s' % (callsign, len(rows), missing,
+            sum(row['Lock losses'] for row in rows), path))
+
+if __name__ == '__main__' :
+    main()
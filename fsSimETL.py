@@ -0,0 +1,616 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Simulated Rohde & Schwarz ETL for running fsCapture.py without an
+# analyzer. Speaks the subset of SCPI that fsCapture.py uses over a raw
+# TCP socket (the same protocol as port 5025 on a real ETL).
+
+# This script is:
+# C:\Shared\batch_files\fsSimETL.py
+
+# Start it from a CMD prompt:
+#   python fsSimETL.py --port 5025 --latency 0.01 --lock-delay 1.5
+# and point fsCapture.py at it by setting the IP address to
+#   TCPIP::127.0.0.1::5025::SOCKET
+
+'''
+MIT License
+
+Copyright (c) 2020 John Neuhaus, jneuhausATosborn-engDOTcom
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+'''
+
+import argparse
+import datetime
+import logging
+import math
+import os
+import random
+import re
+import socketserver
+import struct
+import threading
+import time
+
+logger = logging.getLogger("fsSimETL")
+
+IDN = 'Rohde&Schwarz,ETL,2112.0004K03/101234,3.40 SIM'
+
+CHANNEL_TABLE_FOLDER = 'C:\\R_S\\instr\\catv\\channel_tables'
+
+# A 1x1 pixel PNG, written for every hardcopy
+PNG_1X1 = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010802000000907753'
+    'de0000000c4944415408d763f8ffff3f0005fe02fea7d6a1c70000000049454e'
+    '44ae426082')
+
+# ATSC channel 2-36 centre frequencies in Hz
+def atsc_frequency(channel) :
+    if channel <= 4 :
+        return 57e6 + (channel - 2) * 6e6
+    if channel <= 6 :
+        return 79e6 + (channel - 5) * 6e6
+    if channel <= 13 :
+        return 177e6 + (channel - 7) * 6e6
+    return 473e6 + (channel - 14) * 6e6
+
+
+def channel_table_data(name) :
+    # The .CHT file shipped next to this script, or an empty file
+    try:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+            name + '.CHT'), 'rb') as f :
+            return f.read()
+    except OSError:
+        return b''
+
+
+# ———————————————————————————————————————————————————
+#              SCPI PARSING
+# ———————————————————————————————————————————————————
+
+def split_message(message) :
+    # Split a program message on ';' outside of quoted strings
+    parts, current, quote = [], '', ''
+    for ch in message :
+        if quote :
+            if ch == quote :
+                quote = ''
+        elif ch in '"\'' :
+            quote = ch
+        elif ch == ';' :
+            parts.append(current.strip())
+            current = ''
+            continue
+        current += ch
+    if current.strip() :
+        parts.append(current.strip())
+    return parts
+
+def mnemonic_matches(token, pattern) :
+    # 'SATellites?' matches SAT?, SATE? ... SATELLITES?. Numeric suffixes
+    # (CALC1, TRAC2) are ignored.
+    if token.endswith('?') != pattern.endswith('?') :
+        return False
+    token = re.sub(r'\d+$', '', token.rstrip('?').upper())
+    pattern = pattern.rstrip('?')
+    short = ''.join(c for c in pattern if c.isupper() or c == '*')
+    return token.startswith(short) and pattern.upper().startswith(token)
+
+def header_matches(header, pattern) :
+    tokens = header.lstrip(':').split(':')
+    patterns = pattern.split(':')
+    if len(tokens) != len(patterns) :
+        return False
+    return all(mnemonic_matches(t, p) for t, p in zip(tokens, patterns))
+
+def unquote(text) :
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'' :
+        return text[1:-1]
+    return text
+
+def split_args(args) :
+    return [unquote(a) for a in \
+        re.findall(r'\s*("[^"]*"|\'[^\']*\'|[^,]+)', args)]
+
+
+# ———————————————————————————————————————————————————
+#              INSTRUMENT STATE
+# ———————————————————————————————————————————————————
+
+class SimulatedETL :
+
+    def __init__(self, latency=0.0, lock_delay=1.0, tune_delay=0.2, \
+        hcopy_delay=0.3, command_latency=None, gps=True, csv_locale='us', \
+        settle_time=1.0, speed=0.0) :
+        self.latency = latency              # Seconds added to every message
+        self.command_latency = command_latency or {}  # {'HCOP': 0.5, ...}
+        self.lock_delay = lock_delay        # Seconds to sync; < 0 = never
+        self.tune_delay = tune_delay        # Pending-operation time of a tune
+        self.hcopy_delay = hcopy_delay      # Pending-operation time of HCOP
+        self.csv_locale = csv_locale
+        self.settle_time = settle_time      # Seconds after sync readings jitter
+        self.lock = threading.Lock()
+        self.clock_offset = 0.0             # ETL clock minus host clock
+        self.busy_until = 0.0               # Overlapped operations pending
+        self.lock_at = 0.0                  # Demodulator syncs at this time
+        self.opc_armed = False              # *OPC received, ESR bit 0 pending
+        self.esr = 0
+        self.errors = []
+        self.mode = 'SAN'
+        self.channel_table = ''
+        self.channel = 8
+        self.measurement = 'OVER'
+        self.mlog = False
+        self.mlog_started = None
+        self.gps = 1 if gps else 0
+        self.latitude = 40.123456
+        self.longitude = -75.654321
+        self.altitude = 123.4
+        self.satellites = 9
+        self.speed = speed                  # m/s; the truck drives east
+        self.started = self.now()
+        self.hcopy_name = ''
+        self.data_format = 'ASC'            # FORM: ASC or REAL,32
+        self.byte_order = 'SWAP'            # FORM:BORD; SWAP = little-endian
+        self.span = 10e6
+        self.points = 1001
+        self.rbw = 30e3
+        self.symbols = 4096                 # Constellation points
+        self.mer_db = 28.5
+        self.files = {}                     # Upper-case path -> bytes
+        self.dirs = set()                   # Upper-case paths
+        self.commands = {}                  # Header -> count, for reports
+        self.add_file(CHANNEL_TABLE_FOLDER + '\\TV-USA-ATSC.CHT', \
+            channel_table_data('TV-USA-ATSC'))
+        self.mkdir('Z:\\Measurement_results')
+
+    # Files and folders
+    def mkdir(self, path) :
+        path = path.rstrip('\\')
+        parts = path.split('\\')
+        for i in range(1, len(parts) + 1) :
+            self.dirs.add('\\'.join(parts[:i]).upper())
+
+    def add_file(self, path, data) :
+        self.mkdir(path.rsplit('\\', 1)[0])
+        self.files[path.upper()] = (path.rsplit('\\', 1)[-1], data)
+
+    # Timing
+    def now(self) :
+        return time.monotonic()
+
+    def etl_datetime(self) :
+        return datetime.datetime.now() + \
+            datetime.timedelta(seconds=self.clock_offset)
+
+    def start_operation(self, seconds) :
+        self.busy_until = max(self.busy_until, self.now()) + seconds
+
+    def retune(self) :
+        self.start_operation(self.tune_delay)
+        if self.lock_delay < 0 :
+            self.lock_at = float('inf')
+        else:
+            self.lock_at = self.now() + self.lock_delay
+
+    def wait_pending(self) :
+        delay = self.busy_until - self.now()
+        if delay > 0 :
+            time.sleep(delay)
+
+    def update_esr(self) :
+        if self.opc_armed and self.now() >= self.busy_until :
+            self.esr |= 1
+            self.opc_armed = False
+
+    def position(self) :
+        # (latitude, longitude) after driving east since the start
+        east = self.speed * (self.now() - self.started)
+        return self.latitude, self.longitude + math.degrees(east / \
+            (6371008.8 * math.cos(math.radians(self.latitude))))
+
+    def synced(self) :
+        return 1 if self.now() >= self.lock_at else 0
+
+    def reading(self, value, spread) :
+        # Readings jump around until settle_time after sync, then steady
+        if self.now() - self.lock_at < self.settle_time :
+            return value + random.uniform(-3 * spread, 3 * spread)
+        return value + random.uniform(-0.05, 0.05)
+
+    # Command dispatch
+    def handle_message(self, message) :
+        # latency is the network round trip, paid once per program
+        # message however many commands it chains with ';'. The
+        # command_latency of each command is added to it.
+        responses = []
+        if self.latency > 0 :
+            time.sleep(self.latency)
+        for command in split_message(message) :
+            header, _, args = command.partition(' ')
+            key = header.upper().lstrip(':')
+            self.commands[key] = self.commands.get(key, 0) + 1
+            delay = 0.0
+            for prefix, seconds in self.command_latency.items() :
+                if key.startswith(prefix.upper()) :
+                    delay += seconds
+            if delay > 0 :
+                time.sleep(delay)
+            with self.lock :
+                try:
+                    result = self.handle_command(header, args.strip())
+                except Exception as e:
+                    logger.warning('Error in ' + command + ': ' + str(e))
+                    self.errors.append('-200,"Execution error"')
+                    self.esr |= 16
+                    result = None
+            if result is not None :
+                responses.append(result)
+        return responses
+
+    def handle_command(self, header, args) :
+        h = header
+        m = lambda pattern : header_matches(h, pattern)
+        # IEEE 488.2 common commands
+        if m('*IDN?') :
+            return IDN
+        if m('*OPC?') :
+            self.wait_pending()
+            return '1'
+        if m('*OPC') :
+            self.opc_armed = True
+            return None
+        if m('*WAI') :
+            self.wait_pending()
+            return None
+        if m('*ESR?') :
+            self.update_esr()
+            esr, self.esr = self.esr, 0
+            return str(esr)
+        if m('*ESE') or m('*SRE') :
+            return None
+        if m('*CLS') :
+            self.esr, self.errors = 0, []
+            return None
+        if m('*RST') :
+            self.__init__(self.latency, self.lock_delay, self.tune_delay, \
+                self.hcopy_delay, self.command_latency, self.gps == 1, \
+                self.csv_locale, self.settle_time, self.speed)
+            return None
+        if m('SYSTem:ERRor?') or m('SYSTem:ERRor:NEXT?') :
+            return self.errors.pop(0) if self.errors else '0,"No error"'
+        # Date and time
+        if m('SYSTem:DATE?') :
+            d = self.etl_datetime()
+            return str(d.year) + ',' + str(d.month) + ',' + str(d.day)
+        if m('SYSTem:TIME?') :
+            d = self.etl_datetime()
+            return str(d.hour) + ',' + str(d.minute) + ',' + str(d.second)
+        if m('SYSTem:DATE') or m('SYSTem:TIME') :
+            d = self.etl_datetime()
+            values = [int(re.sub(r'\D', '', v) or 0) \
+                for v in args.split(',')]
+            if m('SYSTem:DATE') :
+                d = d.replace(year=values[0], month=values[1], day=values[2])
+            else:
+                d = d.replace(hour=values[0], minute=values[1], \
+                    second=values[2])
+            self.clock_offset = (d - datetime.datetime.now()).total_seconds()
+            return None
+        # GPS
+        if m('SYSTem:POSition:GPS:CONNected?') :
+            return str(self.gps)
+        if m('SYSTem:POSition:LATitude?') :
+            return '%.6f' % self.position()[0]
+        if m('SYSTem:POSition:LONGitude?') :
+            return '%.6f' % self.position()[1]
+        if m('SYSTem:POSition:ALTitude?') :
+            return '%.1f' % self.altitude
+        if m('SYSTem:POSition:GPS:SATellites?') :
+            return str(self.satellites)
+        # Mode, channel table and tuning
+        if m('INSTrument') or m('INSTrument:SELect') :
+            self.mode = args.upper()
+            self.retune()
+            return None
+        if m('CONFigure:TV:CTABle:SELect') :
+            name = unquote(args)
+            if (CHANNEL_TABLE_FOLDER + '\\' + name + '.CHT').upper() \
+                not in self.files :
+                self.errors.append('-222,"Data out of range"')
+            self.channel_table = name
+            return None
+        if m('FREQuency:CHANnel') or m('SENSe:FREQuency:CHANnel') :
+            self.channel = int(float(args))
+            self.retune()
+            return None
+        if m('FREQuency:CHANnel?') :
+            return str(self.channel)
+        if m('FREQuency:CENTer?') or m('SENSe:FREQuency:CENTer?') :
+            return '%.0f' % atsc_frequency(self.channel)
+        if m('SENSe:POWer:ACHannel:PRESet:RLEVel:AUTO') :
+            self.start_operation(self.tune_delay)
+            return None
+        # Measurements
+        if m('CONFigure:DTV:MEASurement') :
+            self.measurement = args.upper()
+            self.start_operation(self.tune_delay)
+            return None
+        if m('CONFigure:DTV:MEASurement?') :
+            return self.measurement
+        if m('CONFigure:DTV:MEASurement:SATTenuation') :
+            return None
+        # Spectrum trace
+        if m('FORMat') or m('FORMat:DATA') :
+            self.data_format = args.replace(' ', '').upper()
+            return None
+        if m('FORMat:BORDer') :
+            self.byte_order = args.strip().upper()
+            return None
+        if m('FREQuency:STARt?') or m('SENSe:FREQuency:STARt?') :
+            return '%.0f' % (atsc_frequency(self.channel) - self.span / 2)
+        if m('FREQuency:STOP?') or m('SENSe:FREQuency:STOP?') :
+            return '%.0f' % (atsc_frequency(self.channel) + self.span / 2)
+        if m('FREQuency:SPAN?') or m('SENSe:FREQuency:SPAN?') :
+            return '%.0f' % self.span
+        if m('SWEep:POINts?') or m('SENSe:SWEep:POINts?') :
+            return str(self.points)
+        if m('BANDwidth:RESolution?') or m('SENSe:BANDwidth:RESolution?') :
+            return '%.0f' % self.rbw
+        if m('TRACe:DATA?') or m('TRACe:DATA:VALues?') :
+            # I, Q pairs in the constellation measurement
+            levels = self.constellation() if self.measurement == 'CONS' \
+                else self.spectrum_trace()
+            if self.data_format.startswith('REAL') :
+                data = struct.pack(('<' if self.byte_order == 'SWAP' \
+                    else '>') + str(len(levels)) + 'f', *levels)
+                length = str(len(data))
+                return ('#' + str(len(length)) + length).encode('ascii') + \
+                    data
+            return ','.join('%.2f' % level for level in levels)
+        if m('CALCulate:DTV:RESult:DEModulation:SYNC?') :
+            return str(self.synced())
+        if m('CALCulate:DTV:RESult:LEVel?') :
+            return '%.2f' % self.reading(62.0, 1.0)
+        if m('CALCulate:DTV:RESult:MERRor:RMS?') :
+            return '%.2f' % self.reading(28.5, 1.0)
+        if m('CALCulate:DTV:RESult:MERRor:PEAK?') :
+            return '%.2f' % self.reading(19.0, 1.0)
+        if m('CALCulate:DTV:RESult:EVM:RMS?') :
+            return '%.2f' % self.reading(3.76, 0.1)
+        if m('CALCulate:DTV:RESult:EVM:PEAK?') :
+            return '%.2f' % self.reading(11.2, 0.3)
+        if m('CALCulate:DTV:RESult:PILot?') :
+            return '%.2f' % self.reading(11.3, 0.5)
+        if m('DISPlay:MEASurement:OVERview:GPS:STATe') :
+            return None
+        # Measurement log
+        if m('CONFigure:MLOG') :
+            self.mlog = args.upper() in ('ON', '1')
+            self.mlog_started = datetime.datetime.now() if self.mlog \
+                else None
+            return None
+        if m('MMEMory:STORe:MLOG:DATA') :
+            start, stop, _compression, name = split_args(args)
+            self.add_file(name, self.mlog_csv(start, stop))
+            self.start_operation(self.hcopy_delay)
+            return None
+        # Mass memory
+        if m('MMEMory:MDIRectory') :
+            self.mkdir(unquote(args))
+            return None
+        if m('MMEMory:NAME') :
+            self.hcopy_name = unquote(args)
+            return None
+        if m('MMEMory:DELete') :
+            path = unquote(args)
+            if self.files.pop(path.upper(), None) is None :
+                self.errors.append('-256,"File name not found"')
+            return None
+        if m('MMEMory:DATA?') :
+            path = unquote(args)
+            if path.upper() not in self.files :
+                self.errors.append('-256,"File name not found"')
+                return None
+            data = self.files[path.upper()][1]
+            length = str(len(data))
+            # IEEE 488.2 definite length block
+            return ('#' + str(len(length)) + length).encode('ascii') + data
+        if m('MMEMory:CATalog?') :
+            path = unquote(args).rstrip('\\')
+            if path.upper() in self.files :
+                return '\'' + self.files[path.upper()][0] + '\''
+            if path.upper() in self.dirs :
+                names = [f[0] for p, f in self.files.items() \
+                    if p.rsplit('\\', 1)[0] == path.upper()]
+                return '0,0,' + ','.join('\'' + n + '\'' for n in names)
+            return None  # The ETL does not answer; the client times out
+        # Hardcopy
+        if m('HCOPy:CMAP:DEFault') or \
+            m('HCOPy:DEVice:LANGuage') or m('HCOPy:DEVice:COLor') or \
+            m('HCOPy:DESTination') or m('HCOPy:ITEM:WINDow:TEXT') :
+            return None
+        if m('HCOPy') or m('HCOPy:IMMediate') :
+            if self.hcopy_name :
+                self.add_file(self.hcopy_name, PNG_1X1)
+            self.start_operation(self.hcopy_delay)
+            return None
+        if header.endswith('?') :
+            logger.warning('Unknown query ' + header)
+            self.errors.append('-113,"Undefined header"')
+            return None
+        logger.debug('Ignored ' + header + ' ' + args)
+        return None
+
+    def spectrum_trace(self) :
+        # dBm across the span: ATSC flat top with a pilot near the lower
+        # edge, steep skirts, shoulders about 50 dB down, noise floor
+        levels = []
+        for i in range(self.points) :
+            f = (i / (self.points - 1) - 0.5) * self.span / 1e6  # MHz
+            if abs(f) <= 2.69 :
+                level = -30.0 + random.gauss(0, 0.4)
+                if abs(f + 2.38) < 0.03 :
+                    level += 6.0  # Pilot
+            elif abs(f) <= 3.0 :
+                level = -30.0 - (abs(f) - 2.69) / 0.31 * 50.0
+            else:
+                level = max(-80.0 - (abs(f) - 3.0) * 15.0, -95.0) + \
+                    random.gauss(0, 0.8)
+            levels.append(level)
+        return levels
+
+    def constellation(self) :
+        # 8VSB symbols as I, Q pairs: I at the eight levels plus noise for
+        # an MER of about mer_db, Q spread evenly (it carries no data)
+        sigma = math.sqrt(21.0 / 10 ** (self.mer_db / 10))
+        values = []
+        for _ in range(self.symbols) :
+            values.append(random.choice((-7, -5, -3, -1, 1, 3, 5, 7)) + \
+                random.gauss(0, sigma))
+            values.append(random.uniform(-8.0, 8.0))
+        return values
+
+    def mlog_csv(self, start, stop) :
+        # Measurement log export: metadata block, then one row per second
+        fmt = '%d.%m.%Y,%H:%M:%S'
+        t0 = datetime.datetime.strptime(start, fmt)
+        t1 = datetime.datetime.strptime(stop, fmt)
+        sep, dec = (';', ',') if self.csv_locale == 'de' else (',', '.')
+        number = lambda x : ('%.2f' % x).replace('.', dec)
+        lines = ['Type' + sep + 'ETL', 'Version' + sep + IDN.split(',')[3],
+            'Channel' + sep + str(self.channel),
+            'Frequency' + sep + '%.0f' % atsc_frequency(self.channel), '',
+            sep.join(['Date', 'Time', 'Latitude', 'Longitude', 'Sync',
+                'Level/dBuV', 'MER/dB', 'Pilot/dB'])]
+        t, i = t0, 0
+        while t <= t1 :
+            lines.append(sep.join([t.strftime('%d.%m.%Y'),
+                t.strftime('%H:%M:%S'), number(self.latitude),
+                number(self.longitude), str(self.synced()),
+                number(62.0 + (i % 7) * 0.3), number(28.5 + (i % 5) * 0.1),
+                number(11.3)]))
+            t += datetime.timedelta(seconds=1)
+            i += 1
+        return ('\r\n'.join(lines) + '\r\n').encode('ascii')
+
+
+# ———————————————————————————————————————————————————
+#              TCP SERVER
+# ———————————————————————————————————————————————————
+
+class SCPIHandler(socketserver.StreamRequestHandler) :
+
+    def handle(self) :
+        instrument = self.server.instrument
+        logger.info('Connection from ' + str(self.client_address))
+        while True :
+            line = self.rfile.readline()
+            if not line :
+                break
+            message = line.decode('latin-1').strip()
+            if not message :
+                continue
+            logger.debug('<< ' + message)
+            responses = instrument.handle_message(message)
+            if responses :
+                reply = b';'.join(r if isinstance(r, bytes) \
+                    else r.encode('latin-1') for r in responses)
+                logger.debug('>> ' + repr(reply[:80]))
+                self.wfile.write(reply + b'\n')
+        logger.info('Closed ' + str(self.client_address))
+
+class ETLServer(socketserver.ThreadingTCPServer) :
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, instrument) :
+        self.instrument = instrument
+        super().__init__(address, SCPIHandler)
+
+    @property
+    def resource_name(self) :
+        host, port = self.server_address[:2]
+        return 'TCPIP::' + host + '::' + str(port) + '::SOCKET'
+
+def start_server(instrument, host='127.0.0.1', port=0) :
+    # Serve in a background thread; port 0 picks a free port
+    server = ETLServer((host, port), instrument)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ———————————————————————————————————————————————————
+#              MAIN
+# ———————————————————————————————————————————————————
+
+def parse_command_latency(values) :
+    # --cmd-latency HCOP=0.5 --cmd-latency MMEM:STOR=1
+    result = {}
+    for value in values or [] :
+        header, _, seconds = value.partition('=')
+        result[header.upper()] = float(seconds)
+    return result
+
+def arg_parser() :
+    parser = argparse.ArgumentParser(description='Simulated R&S ETL')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5025)
+    parser.add_argument('--latency', type=float, default=0.0,
+        help='seconds added to every program message (round trip)')
+    parser.add_argument('--cmd-latency', action='append', metavar='HDR=SEC',
+        help='extra seconds for commands starting with HDR')
+    parser.add_argument('--lock-delay', type=float, default=1.0,
+        help='seconds for the demodulator to sync after tuning; '
+        'negative = never')
+    parser.add_argument('--tune-delay', type=float, default=0.2)
+    parser.add_argument('--hcopy-delay', type=float, default=0.3)
+    parser.add_argument('--settle-time', type=float, default=1.0,
+        help='seconds after sync until level and MER readings are steady')
+    parser.add_argument('--no-gps', action='store_true')
+    parser.add_argument('--speed', type=float, default=0.0,
+        help='m/s the simulated truck drives east')
+    parser.add_argument('--csv-locale', choices=['us', 'de'], default='us')
+    parser.add_argument('--debug', action='store_true')
+    return parser
+
+def instrument_from_args(args) :
+    return SimulatedETL(latency=args.latency, lock_delay=args.lock_delay,
+        tune_delay=args.tune_delay, hcopy_delay=args.hcopy_delay,
+        command_latency=parse_command_latency(args.cmd_latency),
+        gps=not args.no_gps, csv_locale=args.csv_locale,
+        settle_time=args.settle_time, speed=args.speed)
+
+def main() :
+    args = arg_parser().parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
+        format='%(asctime)s - %(name)s - %(message)s')
+    server = ETLServer((args.host, args.port), instrument_from_args(args))
+    logger.warning('Simulated ETL at ' + server.resource_name)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == '__main__' :
+    main()